@@ -1,21 +1,26 @@
-"""Utility to persist benchmark results as JSON and Elasticsearch."""
+"""Utility to persist benchmark results as JSONL and Elasticsearch."""
 
 from __future__ import annotations
 
-import json
 import logging
 import os
 from dataclasses import asdict, dataclass
 from pathlib import Path
 import sys
-from typing import List, Optional
+from typing import Optional
 
 PROJECT_ROOT = Path(__file__).resolve().parents[1]
 PROCESSING_PATH = PROJECT_ROOT / "processing-python"
 if str(PROCESSING_PATH) not in sys.path:
     sys.path.insert(0, str(PROCESSING_PATH))
 
-from models.elasticsearch_client import ElasticsearchClient, ElasticsearchError, get_default_elasticsearch_client
+from models.elasticsearch_client import (
+    BulkIndexer,
+    ElasticsearchClient,
+    bulk_indexer_for,
+    get_default_elasticsearch_client,
+)
+from models.record_sink import RecordSink, record_sink_for
 
 logger = logging.getLogger(__name__)
 
@@ -36,36 +41,34 @@ class BenchmarkResult:
 
 
 class ResultWriter:
-    """Stores benchmark outputs per document."""
+    """Stores benchmark outputs per document, appended to `output_path` as JSONL across runs."""
 
     def __init__(
         self,
         output_path: str,
         es_client: Optional[ElasticsearchClient] = None,
         index_name: Optional[str] = None,
+        sink: Optional[RecordSink] = None,
     ) -> None:
-        self.output_path = Path(output_path)
-        self.records: List[BenchmarkResult] = []
+        self.sink = sink or record_sink_for(output_path)
+        self.output_path = self.sink.path
         self.es_client = es_client or get_default_elasticsearch_client()
+        self.es_indexer: Optional[BulkIndexer] = bulk_indexer_for(self.es_client) if self.es_client else None
         self.index_name = index_name or os.getenv("ELASTICSEARCH_INDEX_BENCHMARKS", "benchmark-results")
 
     def add(self, result: BenchmarkResult) -> None:
-        self.records.append(result)
+        self.sink.write(self._result_payload(result))
         self._index_result(result)
 
     def flush(self) -> None:
-        self.output_path.parent.mkdir(parents=True, exist_ok=True)
-        payload = [self._result_payload(record) for record in self.records]
-        with self.output_path.open("w", encoding="utf-8") as handle:
-            json.dump(payload, handle, indent=2, ensure_ascii=False)
+        self.sink.flush()
+
+    def close(self) -> None:
+        self.sink.close()
 
     def _result_payload(self, result: BenchmarkResult) -> dict:
         return asdict(result) | {"duration_ms": result.duration_ms()}
 
     def _index_result(self, result: BenchmarkResult) -> None:
-        if not self.es_client:
-            return
-        try:
-            self.es_client.index_document(self.index_name, self._result_payload(result))
-        except ElasticsearchError as exc:
-            logger.warning("Failed to index benchmark result: %s", exc)
+        if self.es_indexer:
+            self.es_indexer.submit(self.index_name, self._result_payload(result))
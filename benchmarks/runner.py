@@ -8,6 +8,7 @@ from pathlib import Path
 from typing import Iterable, List, Protocol
 
 from benchmarks.result_writer import BenchmarkResult, ResultWriter
+from context.token_estimator import estimate_tokens
 
 
 class ModelEndpoint(Protocol):
@@ -51,7 +52,7 @@ class BenchmarkRunner:
                 document_id=request.document_id,
                 started_at=started,
                 finished_at=finished,
-                input_tokens=self._estimate_tokens(raw_text),
+                input_tokens=self._estimate_tokens(raw_text, request.model_id),
                 output_tokens=output_tokens,
                 error=error,
             )
@@ -70,6 +71,6 @@ class BenchmarkRunner:
         return output
 
     @staticmethod
-    def _estimate_tokens(text: str) -> int:
-        # Same heuristic as preprocessing: 4 characters per token.
-        return max(1, len(text) // 4)
+    def _estimate_tokens(text: str, model_id: str) -> int:
+        # Shared estimator registry, so benchmarks and preprocessing agree per model.
+        return max(1, estimate_tokens(text, model_id))
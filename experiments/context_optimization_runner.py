@@ -19,6 +19,12 @@ from router.task_types import TaskType  # type: ignore
 
 def load_sections() -> list:
     return [
+        {
+            "title": "Company History",
+            "paragraphs": [
+                "The company was founded as a regional wholesaler and expanded through a series of acquisitions. " * 24,
+            ],
+        },
         {
             "title": "Management Discussion",
             "paragraphs": [
@@ -26,6 +32,13 @@ def load_sections() -> list:
                 "Operating expenses were flat compared to Q3.",
             ],
         },
+        {
+            "title": "Financial Results",
+            "paragraphs": [
+                "Net income rose to 48 million while EBITDA margin improved by two points.",
+                "Operating income and cash flow from operations both exceeded guidance.",
+            ],
+        },
         {
             "title": "Risk Factors",
             "paragraphs": [
@@ -35,22 +48,40 @@ def load_sections() -> list:
     ]
 
 
+def run_configuration(selector: SectionSelector, sections: list, token_before: int) -> dict:
+    report = selector.select_with_report(sections, TaskType.EXTRACTION)
+    token_after = report.selected_tokens
+    covered_titles = {item.section.title for item in report.selected}
+    return {
+        "token_after": token_after,
+        "tokens_saved": token_before - token_after,
+        "budget_utilization": token_after / report.available_tokens if report.available_tokens else 0.0,
+        "section_coverage": len(covered_titles) / len(sections) if sections else 0.0,
+        "selected_sections": [item.section.title for item in report.selected],
+        "selection_reasons": [item.reason for item in report.selected],
+        "skipped_reasons": [item.reason for item in report.skipped],
+    }
+
+
 def run_experiment(output_path: str) -> None:
-    budget = Budget(max_input_tokens=2000, max_output_tokens=512, safety_margin=0.1)
-    selector = SectionSelector(budget=budget)
+    budget = Budget(max_input_tokens=600, max_output_tokens=512, safety_margin=0.1)
     sections = load_sections()
 
     normalized = [type("Section", (), section) for section in sections]
     token_before = estimate_tokens("\n".join("\n".join(section["paragraphs"]) for section in sections))
 
-    selection = selector.select(normalized, TaskType.EXTRACTION)
-    token_after = sum(item.token_estimate for item in selection)
+    configurations = {
+        "sequential": SectionSelector(budget=budget, strategy="sequential"),
+        "knapsack": SectionSelector(budget=budget, strategy="knapsack"),
+        "knapsack_split": SectionSelector(budget=budget, strategy="knapsack", split_oversized=True, chunk_tokens=128),
+    }
 
     results = {
         "token_before": token_before,
-        "token_after": token_after,
-        "selected_sections": [item.section.title for item in selection],
-        "selection_reasons": [item.reason for item in selection],
+        "budget_tokens": budget.remaining_input(0),
+        "strategies": {
+            name: run_configuration(selector, normalized, token_before) for name, selector in configurations.items()
+        },
     }
 
     Path(output_path).write_text(json.dumps(results, indent=2), encoding="utf-8")
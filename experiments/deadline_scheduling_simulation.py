@@ -0,0 +1,180 @@
+"""Simulate deadline misses for TaskQueue scheduling modes under Poisson arrivals.
+
+A discrete-event simulation on a virtual clock: tasks arrive at a fixed
+rate, a pool of workers pops one task at a time and holds it for the
+profiled latency of its model and task type times a log-normal jitter.
+Every scheduler sees the same arrival trace. Lateness is completion minus
+deadline, so its p99 is the deadline-miss tail; dropped tasks count as
+misses but have no lateness.
+"""
+
+from __future__ import annotations
+
+import heapq
+import json
+import math
+import random
+import sys
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, List, Tuple
+
+PROJECT_ROOT = Path(__file__).resolve().parents[1]
+PROCESSING_PATH = PROJECT_ROOT / "processing-python"
+for path in (PROJECT_ROOT, PROCESSING_PATH):
+    if str(path) not in sys.path:
+        sys.path.insert(0, str(path))
+
+from batching.task import LlmTask  # type: ignore
+from batching.task_queue import TaskQueue  # type: ignore
+from benchmarks.model_profile import ModelProfile, TaskProfile  # type: ignore
+from router.task_types import TaskType  # type: ignore
+
+EPOCH = 1_700_000_000.0
+
+PROFILES = {
+    "local-llm-small": ModelProfile(
+        model_id="local-llm-small",
+        tasks={
+            "classification": TaskProfile(latency_ms=300),
+            "extraction": TaskProfile(latency_ms=2300),
+        },
+    ),
+    "local-llm-large": ModelProfile(
+        model_id="local-llm-large",
+        tasks={
+            "summarization": TaskProfile(latency_ms=4000),
+            "extraction": TaskProfile(latency_ms=2000),
+        },
+    ),
+}
+
+# (priority class, share of arrivals, deadline slack range in seconds)
+CLASSES = [(0, 0.15, (4.0, 12.0)), (1, 0.35, (15.0, 60.0)), (2, 0.50, (60.0, 300.0))]
+WORKLOAD = [
+    (TaskType.CLASSIFICATION, "local-llm-small", 0.3),
+    (TaskType.EXTRACTION, "local-llm-small", 0.3),
+    (TaskType.EXTRACTION, "local-llm-large", 0.25),
+    (TaskType.SUMMARIZATION, "local-llm-large", 0.15),
+]
+
+SCHEDULERS = {
+    "priority_fifo": dict(scheduling="priority"),
+    "deadline_edf": dict(scheduling="deadline"),
+    "deadline_edf_aging": dict(scheduling="deadline", aging_s=120.0),
+    "deadline_edf_drop": dict(scheduling="deadline", deadline_policy="drop"),
+    "deadline_edf_aging_drop": dict(scheduling="deadline", aging_s=120.0, deadline_policy="drop"),
+    "deadline_edf_escalate": dict(scheduling="deadline", deadline_policy="escalate"),
+}
+
+
+def mean_service_s() -> float:
+    return sum(share * PROFILES[model].tasks[task.value].latency_ms / 1000 for task, model, share in WORKLOAD)
+
+
+def make_trace(count: int, utilization: float, workers: int, seed: int) -> List[Tuple[float, dict, float]]:
+    """Arrival time, task fields and actual service time for each task."""
+    rng = random.Random(seed)
+    rate = utilization * workers / mean_service_s()
+    now = EPOCH
+    trace = []
+    for index in range(count):
+        now += rng.expovariate(rate)
+        priority, _, (low, high) = rng.choices(CLASSES, weights=[share for _, share, _ in CLASSES])[0]
+        task_type, model, _ = rng.choices(WORKLOAD, weights=[share for _, _, share in WORKLOAD])[0]
+        profiled = PROFILES[model].tasks[task_type.value].latency_ms / 1000
+        service = profiled * rng.lognormvariate(-0.045, 0.3)
+        fields = dict(
+            priority=priority,
+            deadline=datetime.fromtimestamp(now + rng.uniform(low, high)),
+            task_id=f"task-{index}",
+            task_type=task_type,
+            target_model=model,
+            token_estimate=rng.randint(500, 4000),
+        )
+        trace.append((now, fields, service))
+    return trace
+
+
+def percentile(values: List[float], fraction: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, math.ceil(fraction * len(ordered)) - 1)]
+
+
+def simulate(trace: List[Tuple[float, dict, float]], workers: int, scheduler: dict) -> Dict[str, object]:
+    clock = [EPOCH]
+    queue = TaskQueue(latency_profiles=PROFILES, clock=lambda: clock[0], **scheduler)
+    services = {fields["task_id"]: (arrival, service) for arrival, fields, service in trace}
+    busy: List[float] = []
+    idle = workers
+    lateness: Dict[int, List[float]] = {priority: [] for priority, _, _ in CLASSES}
+    waits: Dict[int, List[float]] = {priority: [] for priority, _, _ in CLASSES}
+    misses = {priority: 0 for priority, _, _ in CLASSES}
+    dropped_by_class = {priority: 0 for priority, _, _ in CLASSES}
+
+    def on_miss(task: LlmTask, policy: str) -> None:
+        if policy == "drop":
+            dropped_by_class[task.priority] += 1
+            misses[task.priority] += 1
+
+    queue.on_deadline_miss = on_miss
+    index = 0
+    while index < len(trace) or busy:
+        next_arrival = trace[index][0] if index < len(trace) else math.inf
+        if busy and busy[0] < next_arrival:
+            clock[0] = heapq.heappop(busy)
+            idle += 1
+        else:
+            clock[0] = next_arrival
+            queue.add_task(LlmTask(**trace[index][1]))
+            index += 1
+        while idle and len(queue):
+            batch = queue.pop_next_batch(1)
+            if not batch:
+                break
+            task = batch[0]
+            arrival, service = services[task.task_id]
+            finished = clock[0] + service
+            heapq.heappush(busy, finished)
+            idle -= 1
+            late = finished - task.deadline.timestamp()
+            lateness[task.priority].append(max(0.0, late))
+            waits[task.priority].append(clock[0] - arrival)
+            if late > 0:
+                misses[task.priority] += 1
+
+    all_lateness = [value for values in lateness.values() for value in values]
+    total_misses = sum(misses.values())
+    return {
+        "deadline_miss_rate": total_misses / len(trace),
+        "p50_lateness_s": percentile(all_lateness, 0.50),
+        "p99_lateness_s": percentile(all_lateness, 0.99),
+        "dropped": queue.dropped,
+        "escalated": queue.escalated,
+        "promoted": queue.promoted,
+        "per_class": {
+            str(priority): {
+                "deadline_miss_rate": misses[priority] / max(1, len(lateness[priority]) + dropped_by_class[priority]),
+                "p99_lateness_s": percentile(lateness[priority], 0.99),
+                "p99_wait_s": percentile(waits[priority], 0.99),
+                "dropped": dropped_by_class[priority],
+            }
+            for priority, _, _ in CLASSES
+        },
+    }
+
+
+def run_experiment(output_path: str, tasks: int = 20_000, workers: int = 4, seed: int = 3) -> None:
+    results: Dict[str, object] = {"tasks": tasks, "workers": workers, "loads": {}}
+    for utilization in (0.8, 0.95, 1.05, 1.2):
+        trace = make_trace(tasks, utilization, workers, seed)
+        results["loads"][f"utilization_{utilization}"] = {
+            name: simulate(trace, workers, scheduler) for name, scheduler in SCHEDULERS.items()
+        }
+    Path(output_path).write_text(json.dumps(results, indent=2), encoding="utf-8")
+
+
+if __name__ == "__main__":
+    run_experiment("experiments/deadline_scheduling_results.json")
@@ -0,0 +1,75 @@
+"""Benchmark comparing the bs4 and lxml HtmlExtractor backends on saved pages.
+
+The default corpus (`fixtures/html_corpus`) holds small hand-made pages in
+the shapes the collector stores: press releases, filing excerpts with
+tables, news pages with banners and sidebars, pre-HTML5 markup with
+unclosed tags, a Dutch annual report and a long report page that spans
+several parser feeds. Pass another directory to benchmark real crawls.
+"""
+
+from __future__ import annotations
+
+import json
+import sys
+import time
+from pathlib import Path
+from typing import Dict, List
+
+PROJECT_ROOT = Path(__file__).resolve().parents[1]
+PROCESSING_PATH = PROJECT_ROOT / "processing-python"
+if str(PROCESSING_PATH) not in sys.path:
+    sys.path.insert(0, str(PROCESSING_PATH))
+
+from preprocessing.html_extractor import HtmlExtractor  # type: ignore
+
+
+def load_pages(corpus_dir: str) -> Dict[str, str]:
+    pages = {}
+    root = Path(corpus_dir)
+    for path in sorted(root.glob("**/*.htm*")):
+        pages[path.relative_to(root).as_posix()] = path.read_text(encoding="utf-8", errors="replace")
+    return pages
+
+
+def run_experiment(corpus_dir: str, output_path: str, repeats: int = 3) -> None:
+    pages = load_pages(corpus_dir)
+    total_bytes = sum(len(html) for html in pages.values())
+    timings: Dict[str, float] = {}
+    outputs: Dict[str, Dict[str, list]] = {}
+    finished_by: Dict[str, str] = {}
+
+    for backend in HtmlExtractor.BACKENDS:
+        extractor = HtmlExtractor(backend=backend)
+        best = float("inf")
+        for _ in range(repeats):
+            started = time.perf_counter()
+            outputs[backend] = {}
+            for path, html in pages.items():
+                outputs[backend][path] = extractor.extract(html)
+                if backend == "lxml":
+                    finished_by[path] = extractor.last_backend or backend
+            best = min(best, time.perf_counter() - started)
+        timings[backend] = best
+
+    mismatches: List[str] = [path for path in pages if outputs["bs4"][path] != outputs["lxml"][path]]
+    results = {
+        "pages": len(pages),
+        "total_chars": total_bytes,
+        "sections_per_page": {path: len(sections) for path, sections in outputs["lxml"].items()},
+        "seconds": timings,
+        "pages_per_second": {
+            backend: (len(pages) / seconds if seconds else 0.0) for backend, seconds in timings.items()
+        },
+        "speedup": timings["bs4"] / timings["lxml"] if timings.get("lxml") else None,
+        "identical_output": not mismatches,
+        "mismatched_pages": mismatches,
+        # Pages where lxml's parse disagreed with the explicit markup and bs4 produced the sections.
+        "lxml_fell_back_to_bs4": [path for path, backend in finished_by.items() if backend != "lxml"],
+    }
+
+    Path(output_path).write_text(json.dumps(results, indent=2), encoding="utf-8")
+
+
+if __name__ == "__main__":
+    corpus = sys.argv[1] if len(sys.argv) > 1 else "experiments/fixtures/html_corpus"
+    run_experiment(corpus, "experiments/html_backend_benchmark_results.json")
@@ -0,0 +1,129 @@
+"""Benchmark per-request latency of urllib versus the pooled OpenRouter transport.
+
+Both clients talk to a local stub of the chat completions endpoint, so the
+numbers isolate connection setup and HTTP overhead from model latency. The
+stub speaks plain HTTP; against the real API the pooled transport also skips
+the TLS handshake, which makes the saving larger.
+"""
+
+from __future__ import annotations
+
+import gzip
+import json
+import statistics
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Callable, Dict, List
+from urllib import request
+
+PROJECT_ROOT = Path(__file__).resolve().parents[1]
+PROCESSING_PATH = PROJECT_ROOT / "processing-python"
+if str(PROCESSING_PATH) not in sys.path:
+    sys.path.insert(0, str(PROCESSING_PATH))
+
+from models.openrouter_client import OpenRouterClient  # type: ignore
+
+STUB_RESPONSE = {
+    "model": "stub/model",
+    "choices": [{"message": {"role": "assistant", "content": json.dumps({"entities": ["revenue"] * 50})}, "finish_reason": "stop"}],
+    "usage": {"prompt_tokens": 120, "completion_tokens": 80, "total_tokens": 200},
+}
+
+
+class StubCompletionHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    disable_nagle_algorithm = True
+
+    def do_POST(self) -> None:  # noqa: N802 - http.server naming
+        body = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        if self.headers.get("Content-Encoding") == "gzip":
+            body = gzip.decompress(body)
+        json.loads(body)
+        payload = json.dumps(STUB_RESPONSE).encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        if "gzip" in self.headers.get("Accept-Encoding", ""):
+            payload = gzip.compress(payload)
+            self.send_header("Content-Encoding", "gzip")
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def log_message(self, format: str, *args: object) -> None:  # noqa: A002 - signature from base class
+        return
+
+
+def start_stub_server() -> ThreadingHTTPServer:
+    server = ThreadingHTTPServer(("127.0.0.1", 0), StubCompletionHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def time_calls(call: Callable[[], object], count: int) -> List[float]:
+    latencies = []
+    for _ in range(count):
+        started = time.perf_counter()
+        call()
+        latencies.append((time.perf_counter() - started) * 1000)
+    return latencies
+
+
+def summarize(latencies: List[float]) -> Dict[str, float]:
+    ordered = sorted(latencies)
+    return {
+        "mean_ms": statistics.mean(ordered),
+        "p50_ms": ordered[len(ordered) // 2],
+        "p95_ms": ordered[int(len(ordered) * 0.95) - 1],
+    }
+
+
+def run_experiment(output_path: str, requests_per_client: int = 500) -> None:
+    server = start_stub_server()
+    base_url = f"http://127.0.0.1:{server.server_address[1]}/api/v1"
+    messages = [{"role": "user", "content": "Extract the financial entities. " * 40}]
+    payload = json.dumps({"model": "stub/model", "messages": messages, "temperature": 0.0}).encode("utf-8")
+
+    def urllib_call() -> object:
+        req = request.Request(
+            f"{base_url}/chat/completions",
+            data=payload,
+            method="POST",
+            headers={"Content-Type": "application/json"},
+        )
+        with request.urlopen(req, timeout=10) as response:
+            return json.loads(response.read())
+
+    pooled = OpenRouterClient(api_key="stub", base_url=base_url)
+    pooled_gzip = OpenRouterClient(api_key="stub", base_url=base_url, gzip_requests=True)
+
+    try:
+        results = {
+            "requests_per_client": requests_per_client,
+            "urllib_per_request": summarize(time_calls(urllib_call, requests_per_client)),
+            "pooled_keep_alive": summarize(
+                time_calls(lambda: pooled.chat_completion(model="stub/model", messages=messages), requests_per_client)
+            ),
+            "pooled_keep_alive_gzip": summarize(
+                time_calls(lambda: pooled_gzip.chat_completion(model="stub/model", messages=messages), requests_per_client)
+            ),
+            "connections_opened": {
+                "pooled_keep_alive": pooled.transport.connections_opened,
+                "pooled_keep_alive_gzip": pooled_gzip.transport.connections_opened,
+            },
+        }
+    finally:
+        pooled.close()
+        pooled_gzip.close()
+        server.shutdown()
+
+    results["mean_ms_saved_per_request"] = (
+        results["urllib_per_request"]["mean_ms"] - results["pooled_keep_alive"]["mean_ms"]
+    )
+    Path(output_path).write_text(json.dumps(results, indent=2), encoding="utf-8")
+
+
+if __name__ == "__main__":
+    run_experiment("experiments/http_transport_benchmark_results.json")
@@ -0,0 +1,145 @@
+"""Replay recorded nvidia-smi snapshots through memory-model-driven batch planning.
+
+Memory cost models are fitted from a BatchLogger history (JSON array or
+JSONL sink). Each snapshot in `fixtures/nvidia_smi` (`<name>.gpus.csv` and
+`<name>.apps.csv`, captured with the queries GpuMonitor runs) is then used
+to plan the same synthetic workload with the fitted models (once with the
+default packer and once padding-aware, whose caps apply to padded tokens)
+and with the old rule that halves the caps when GPU 0 is low on memory.
+Legacy batches are checked against the fitted model on GPU 0, where they
+would have run.
+"""
+
+from __future__ import annotations
+
+import json
+import random
+import sys
+from pathlib import Path
+from typing import Dict, List
+
+PROJECT_ROOT = Path(__file__).resolve().parents[1]
+PROCESSING_PATH = PROJECT_ROOT / "processing-python"
+if str(PROCESSING_PATH) not in sys.path:
+    sys.path.insert(0, str(PROCESSING_PATH))
+
+from batching.batch_planner import BatchPlanner  # type: ignore
+from batching.gpu_monitor import GpuMonitor  # type: ignore
+from batching.memory_model import MemoryCostModel, fit_memory_models  # type: ignore
+from batching.task import LlmTask  # type: ignore
+from models.record_sink import iter_records  # type: ignore
+
+FIXTURE_DIR = PROJECT_ROOT / "experiments" / "fixtures" / "nvidia_smi"
+HISTORY_PATH = PROJECT_ROOT / "experiments" / "batching_sample_results.json"
+MODELS = ("local-llm-small", "local-llm-large")
+
+
+def load_history(path: Path) -> List[dict]:
+    if path.suffix == ".json":
+        return json.loads(path.read_text(encoding="utf-8"))
+    return list(iter_records(str(path)))
+
+
+def load_snapshots(fixture_dir: Path) -> Dict[str, GpuMonitor]:
+    snapshots = {}
+    for gpus in sorted(fixture_dir.glob("*.gpus.csv")):
+        name = gpus.name[: -len(".gpus.csv")]
+        apps = gpus.with_name(f"{name}.apps.csv")
+        snapshots[name] = GpuMonitor.from_recorded(
+            gpus.read_text(encoding="utf-8"),
+            apps.read_text(encoding="utf-8") if apps.exists() else "",
+        )
+    return snapshots
+
+
+def make_tasks(count: int, seed: int) -> List[LlmTask]:
+    rng = random.Random(seed)
+    return [
+        LlmTask(
+            priority=1,
+            task_id=f"task-{index}",
+            target_model=rng.choice(MODELS),
+            token_estimate=int(rng.lognormvariate(7.8, 0.5)),
+        )
+        for index in range(count)
+    ]
+
+
+def run_experiment(
+    output_path: str,
+    task_count: int = 200,
+    max_batch_size: int = 16,
+    max_tokens_per_batch: int = 32_000,
+    min_free_memory_mb: int = 8_000,
+    seed: int = 9,
+) -> None:
+    memory_models: Dict[str, MemoryCostModel] = fit_memory_models(load_history(HISTORY_PATH))
+    tasks = make_tasks(task_count, seed)
+    results: Dict[str, object] = {
+        "memory_models": {
+            model_id: {
+                "kv_mb_per_token": model.kv_mb_per_token,
+                "successes": model.successes,
+                "failures": model.failures,
+            }
+            for model_id, model in memory_models.items()
+        },
+        "snapshots": {},
+    }
+
+    for name, monitor in load_snapshots(FIXTURE_DIR).items():
+        gpus = monitor.sample()
+        modelled = BatchPlanner(gpu_monitor=monitor, memory_models=memory_models).plan(
+            tasks, max_batch_size, max_tokens_per_batch
+        )
+        padded = BatchPlanner(gpu_monitor=monitor, memory_models=memory_models, packing="padding-aware").plan(
+            tasks, max_batch_size, max_tokens_per_batch
+        )
+        legacy = BatchPlanner(gpu_monitor=monitor).plan(
+            tasks, max_batch_size, max_tokens_per_batch, min_free_memory_mb=min_free_memory_mb
+        )
+        legacy_over = [
+            plan
+            for plan in legacy
+            if plan.model_id in memory_models
+            and plan.total_tokens > memory_models[plan.model_id].max_tokens_on(gpus[0])
+        ]
+        results["snapshots"][name] = {
+            "gpus": {
+                str(gpu.index): {"name": gpu.name, "free_memory_mb": gpu.free_memory_mb, "processes": len(gpu.processes)}
+                for gpu in gpus
+            },
+            "token_caps": {
+                model_id: {str(gpu.index): model.max_tokens_on(gpu) for gpu in gpus}
+                for model_id, model in memory_models.items()
+            },
+            "memory_model": {
+                "batches": len(modelled),
+                "batches_per_gpu": {
+                    str(gpu.index): sum(1 for plan in modelled if plan.gpu_index == gpu.index) for gpu in gpus
+                },
+                "tokens_per_gpu": {
+                    str(gpu.index): sum(plan.total_tokens for plan in modelled if plan.gpu_index == gpu.index)
+                    for gpu in gpus
+                },
+                "over_predicted_memory": sum(1 for plan in modelled if "exceeds" in plan.reason),
+            },
+            "memory_model_padding_aware": {
+                "batches": len(padded),
+                "padded_tokens_per_gpu": {
+                    str(gpu.index): sum(plan.padded_tokens for plan in padded if plan.gpu_index == gpu.index)
+                    for gpu in gpus
+                },
+                "over_predicted_memory": sum(1 for plan in padded if "exceeds" in plan.reason),
+            },
+            "legacy_halving": {
+                "batches": len(legacy),
+                "over_predicted_memory_on_gpu0": len(legacy_over),
+            },
+        }
+
+    Path(output_path).write_text(json.dumps(results, indent=2), encoding="utf-8")
+
+
+if __name__ == "__main__":
+    run_experiment("experiments/memory_model_replay_results.json")
@@ -84,4 +84,4 @@ def run_experiment(output_path: str) -> None:
 
 
 if __name__ == "__main__":
-    run_experiment("experiments/router_decision_samples.json")
+    run_experiment("experiments/router_decision_log.jsonl")
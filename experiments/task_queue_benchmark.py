@@ -0,0 +1,143 @@
+"""Benchmark typed pops, model drains and cancellation on a large TaskQueue.
+
+The workload is skewed like a filing backlog: most queued tasks are
+extraction, so pulling a batch of another type used to pop and re-push
+almost the whole heap. `LegacyTaskQueue` is the previous single-heap
+implementation, kept here for comparison. Its `group_for_batching` is
+quadratic, so it is only timed on a smaller queue.
+"""
+
+from __future__ import annotations
+
+import heapq
+import json
+import random
+import sys
+import time
+from collections import defaultdict
+from pathlib import Path
+from typing import Callable, Dict, List, Optional
+
+PROJECT_ROOT = Path(__file__).resolve().parents[1]
+PROCESSING_PATH = PROJECT_ROOT / "processing-python"
+if str(PROCESSING_PATH) not in sys.path:
+    sys.path.insert(0, str(PROCESSING_PATH))
+
+from batching.task import LlmTask  # type: ignore
+from batching.task_queue import TaskQueue  # type: ignore
+from router.task_types import TaskType  # type: ignore
+
+TYPE_WEIGHTS = {
+    TaskType.EXTRACTION: 0.94,
+    TaskType.CLASSIFICATION: 0.03,
+    TaskType.SUMMARIZATION: 0.02,
+    TaskType.RAG: 0.01,
+}
+MODELS = ("local-llm-small", "local-llm-large", "openrouter/gpt-4o-mini")
+
+
+class LegacyTaskQueue:
+    def __init__(self) -> None:
+        self._heap: List[LlmTask] = []
+
+    def add_task(self, task: LlmTask) -> None:
+        heapq.heappush(self._heap, task)
+
+    def pop_next_batch(self, batch_size: int, task_type: Optional[TaskType] = None) -> List[LlmTask]:
+        batch: List[LlmTask] = []
+        buffer: List[LlmTask] = []
+        while self._heap and len(batch) < batch_size:
+            candidate = heapq.heappop(self._heap)
+            if task_type and candidate.task_type != task_type:
+                buffer.append(candidate)
+                continue
+            batch.append(candidate)
+        for task in buffer:
+            heapq.heappush(self._heap, task)
+        return batch
+
+    def group_for_batching(self, max_tokens: int) -> Dict[str, List[LlmTask]]:
+        grouped: Dict[str, List[LlmTask]] = defaultdict(list)
+        temp_heap = list(self._heap)
+        heapq.heapify(temp_heap)
+        while temp_heap:
+            task = heapq.heappop(temp_heap)
+            key = task.target_model or "unspecified"
+            current_tokens = sum(t.token_estimate for t in grouped[key])
+            if current_tokens + task.token_estimate <= max_tokens:
+                grouped[key].append(task)
+        return grouped
+
+
+def make_tasks(count: int, seed: int = 7) -> List[LlmTask]:
+    rng = random.Random(seed)
+    types = rng.choices(list(TYPE_WEIGHTS), weights=list(TYPE_WEIGHTS.values()), k=count)
+    return [
+        LlmTask(
+            priority=rng.randint(0, 9),
+            task_id=f"task-{index}",
+            task_type=task_type,
+            target_model=rng.choice(MODELS),
+            token_estimate=rng.randint(200, 6000),
+        )
+        for index, task_type in enumerate(types)
+    ]
+
+
+def timed(call: Callable[[], object], repeats: int = 1) -> float:
+    """Mean milliseconds per call."""
+    started = time.perf_counter()
+    for _ in range(repeats):
+        call()
+    return (time.perf_counter() - started) * 1000 / repeats
+
+
+def run_experiment(output_path: str, queued_tasks: int = 1_000_000, legacy_group_tasks: int = 5_000) -> None:
+    tasks = make_tasks(queued_tasks)
+
+    queue = TaskQueue()
+    load_ms = timed(lambda: [queue.add_task(task) for task in tasks])
+    legacy = LegacyTaskQueue()
+    legacy_load_ms = timed(lambda: [legacy.add_task(task) for task in tasks])
+
+    rng = random.Random(11)
+    cancel_ids = [f"task-{index}" for index in rng.sample(range(queued_tasks), 1000)]
+
+    results = {
+        "queued_tasks": queued_tasks,
+        "type_mix": {task_type.value: weight for task_type, weight in TYPE_WEIGHTS.items()},
+        "load_ms": {"indexed": load_ms, "legacy": legacy_load_ms},
+        "typed_pop_32_rag_ms": {
+            "indexed": timed(lambda: queue.pop_next_batch(32, task_type=TaskType.RAG), repeats=50),
+            "legacy": timed(lambda: legacy.pop_next_batch(32, task_type=TaskType.RAG), repeats=3),
+        },
+        "untyped_pop_32_ms": {
+            "indexed": timed(lambda: queue.pop_next_batch(32), repeats=50),
+            "legacy": timed(lambda: legacy.pop_next_batch(32), repeats=50),
+        },
+        "drain_model_32k_tokens_ms": {
+            "indexed": timed(lambda: queue.drain_model("local-llm-small", 32_000), repeats=50),
+        },
+        "group_for_batching_32k_tokens_ms": {
+            "indexed": timed(lambda: queue.group_for_batching(32_000), repeats=20),
+        },
+        "cancel_ms": {"indexed": timed(lambda: [queue.cancel(task_id) for task_id in cancel_ids]) / len(cancel_ids)},
+    }
+
+    small = make_tasks(legacy_group_tasks)
+    small_queue, small_legacy = TaskQueue(), LegacyTaskQueue()
+    for task in small:
+        small_queue.add_task(task)
+        small_legacy.add_task(task)
+    results["group_for_batching_small_queue_ms"] = {
+        "queued_tasks": legacy_group_tasks,
+        "indexed": timed(lambda: small_queue.group_for_batching(32_000), repeats=20),
+        "legacy": timed(lambda: small_legacy.group_for_batching(32_000)),
+    }
+    results["pending_tokens_after_run"] = queue.pending_tokens()
+
+    Path(output_path).write_text(json.dumps(results, indent=2), encoding="utf-8")
+
+
+if __name__ == "__main__":
+    run_experiment("experiments/task_queue_benchmark_results.json")
@@ -2,17 +2,21 @@
 
 from __future__ import annotations
 
-import json
 import logging
 import os
 from dataclasses import asdict, dataclass
-from pathlib import Path
 from typing import List, Optional
 
 from batching.batch_planner import BatchPlan
 from batching.executor import BatchResult
 from batching.gpu_monitor import GpuStatus
-from models.elasticsearch_client import ElasticsearchClient, ElasticsearchError, get_default_elasticsearch_client
+from models.elasticsearch_client import (
+    BulkIndexer,
+    ElasticsearchClient,
+    bulk_indexer_for,
+    get_default_elasticsearch_client,
+)
+from models.record_sink import RecordSink, record_sink_for
 
 logger = logging.getLogger(__name__)
 
@@ -27,24 +31,31 @@ class BatchLog:
     success: bool
     error: str | None
     reason: str
+    fill_ratio: float | None = None
+    padding_waste: float = 0.0
+    gpu_index: int | None = None
 
 
 class BatchLogger:
-    """Collects batch metrics for later analysis."""
+    """Collects batch metrics for later analysis, appended to `output_path` as JSONL across runs."""
 
     def __init__(
         self,
         output_path: str,
         es_client: Optional[ElasticsearchClient] = None,
         index_name: Optional[str] = None,
+        sink: Optional[RecordSink] = None,
     ) -> None:
-        self.output_path = Path(output_path)
-        self.records: List[BatchLog] = []
+        self.sink = sink or record_sink_for(output_path)
+        self.output_path = self.sink.path
         self.es_client = es_client or get_default_elasticsearch_client()
+        self.es_indexer: Optional[BulkIndexer] = bulk_indexer_for(self.es_client) if self.es_client else None
         self.index_name = index_name or os.getenv("ELASTICSEARCH_INDEX_BATCH", "batch-events")
 
     def record(self, plan: BatchPlan, result: BatchResult, gpu_status: List[GpuStatus]) -> None:
-        gpu_free = gpu_status[0].free_memory_mb if gpu_status else None
+        # Free memory of the GPU the batch was placed on, which is what memory models are fitted against.
+        gpu = next((status for status in gpu_status if status.index == plan.gpu_index), gpu_status[0] if gpu_status else None)
+        gpu_free = gpu.free_memory_mb if gpu else None
         actual_tokens = sum(task.token_estimate for task in plan.tasks)
         record = BatchLog(
             model_id=plan.model_id,
@@ -55,20 +66,19 @@ class BatchLogger:
             success=result.success,
             error=result.error,
             reason=plan.reason,
+            fill_ratio=plan.fill_ratio,
+            padding_waste=plan.padding_waste,
+            gpu_index=gpu.index if gpu else None,
         )
-        self.records.append(record)
+        self.sink.write(asdict(record))
         self._index_record(record)
 
     def flush(self) -> None:
-        self.output_path.parent.mkdir(parents=True, exist_ok=True)
-        payload = [asdict(record) for record in self.records]
-        with self.output_path.open("w", encoding="utf-8") as handle:
-            json.dump(payload, handle, indent=2, ensure_ascii=False)
+        self.sink.flush()
+
+    def close(self) -> None:
+        self.sink.close()
 
     def _index_record(self, record: BatchLog) -> None:
-        if not self.es_client:
-            return
-        try:
-            self.es_client.index_document(self.index_name, asdict(record))
-        except ElasticsearchError as exc:
-            logger.warning("Failed to index batch log: %s", exc)
+        if self.es_indexer:
+            self.es_indexer.submit(self.index_name, asdict(record))
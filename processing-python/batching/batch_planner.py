@@ -3,10 +3,13 @@
 from __future__ import annotations
 
 from dataclasses import dataclass
-from typing import Dict, List, Optional
+from typing import Dict, List, Mapping, Optional, Tuple, Union
 
 from batching.gpu_monitor import GpuMonitor
+from batching.memory_model import MemoryCostModel
+from batching.packing import PackingStrategy, packing_strategy
 from batching.task import LlmTask
+from context.token_budget import TokenBudgetManager
 
 
 @dataclass
@@ -15,13 +18,43 @@ class BatchPlan:
     tasks: List[LlmTask]
     total_tokens: int
     reason: str
+    prefix_hash: Optional[str] = None
+    token_capacity: Optional[int] = None
+    gpu_index: Optional[int] = None
+
+    @property
+    def fill_ratio(self) -> Optional[float]:
+        """Share of the batch token cap the tasks use."""
+        if not self.token_capacity:
+            return None
+        return self.total_tokens / self.token_capacity
+
+    @property
+    def padded_tokens(self) -> int:
+        """Tokens processed when every prompt is padded to the longest one, as local servers do."""
+        return max((task.token_estimate for task in self.tasks), default=0) * len(self.tasks)
+
+    @property
+    def padding_waste(self) -> float:
+        """Share of the padded batch that is padding."""
+        padded = self.padded_tokens
+        return (padded - self.total_tokens) / padded if padded else 0.0
 
 
 class BatchPlanner:
     """Creates adaptive batches taking GPU status and token limits into account."""
 
-    def __init__(self, gpu_monitor: Optional[GpuMonitor] = None) -> None:
+    def __init__(
+        self,
+        gpu_monitor: Optional[GpuMonitor] = None,
+        budget_manager: Optional[TokenBudgetManager] = None,
+        packing: Union[str, PackingStrategy] = "first-fit-decreasing",
+        memory_models: Optional[Mapping[str, MemoryCostModel]] = None,
+    ) -> None:
         self.gpu_monitor = gpu_monitor or GpuMonitor()
+        self.budget_manager = budget_manager
+        self.packing = packing_strategy(packing) if isinstance(packing, str) else packing
+        self.memory_models = dict(memory_models or {})
 
     def plan(
         self,
@@ -29,56 +62,96 @@ class BatchPlanner:
         max_batch_size: int,
         max_tokens_per_batch: int,
         min_free_memory_mb: int = 0,
+        group_by_prefix: bool = False,
     ) -> List[BatchPlan]:
+        """Plan batches per model; with `group_by_prefix`, tasks sharing a prompt prefix hash
+        are batched together so prompt caches on the serving side get reused.
+
+        Models with a memory cost model have their tasks spread over the
+        GPUs in proportion to the batch size predicted to fit on each, and
+        each GPU's share is packed with that GPU's token cap
+        (`BatchPlan.gpu_index`). Other models keep the old heuristic of
+        halving both caps when the first GPU has less than
+        `min_free_memory_mb` free."""
         gpu_status = self.gpu_monitor.sample()
-        if gpu_status and gpu_status[0].free_memory_mb < min_free_memory_mb:
-            max_batch_size = max(1, max_batch_size // 2)
-            max_tokens_per_batch = max(512, max_tokens_per_batch // 2)
+        low_memory = bool(gpu_status) and gpu_status[0].free_memory_mb < min_free_memory_mb
 
-        grouped = self._group_by_model(tasks)
+        grouped = self._group_by_model(tasks, group_by_prefix)
         plans: List[BatchPlan] = []
-
-        for model_id, bucket in grouped.items():
-            bucket.sort(key=lambda task: task.token_estimate, reverse=True)
-            current_batch: List[LlmTask] = []
-            token_count = 0
-
-            for task in bucket:
-                if (
-                    len(current_batch) >= max_batch_size
-                    or token_count + task.token_estimate > max_tokens_per_batch
-                ):
-                    if current_batch:
-                        plans.append(
-                            BatchPlan(
-                                model_id=model_id,
-                                tasks=current_batch,
-                                total_tokens=token_count,
-                                reason="Batch closed due to size or token limit",
-                            )
-                        )
-                    current_batch = []
-                    token_count = 0
-
-                current_batch.append(task)
-                token_count += task.token_estimate
-
-            if current_batch:
-                plans.append(
-                    BatchPlan(
+        gpu_load: Dict[int, int] = {gpu.index: 0 for gpu in gpu_status}
+
+        for (model_id, prefix_hash), bucket in grouped.items():
+            memory_model = self.memory_models.get(model_id) if gpu_status else None
+            model_batch_size, model_batch_tokens = max_batch_size, max_tokens_per_batch
+            if low_memory and not memory_model:
+                model_batch_size = max(1, model_batch_size // 2)
+                model_batch_tokens = max(512, model_batch_tokens // 2)
+            model_batch_size, model_batch_tokens = self._rate_limited_caps(model_id, model_batch_size, model_batch_tokens)
+
+            if not memory_model:
+                shares = [(None, bucket, model_batch_tokens)]
+            else:
+                gpu_caps = {gpu.index: min(model_batch_tokens, memory_model.max_tokens_on(gpu)) for gpu in gpu_status}
+                shares = [
+                    (gpu_index, share, max(1, gpu_caps[gpu_index]))
+                    for gpu_index, share in self._spread(bucket, gpu_caps, gpu_load).items()
+                ]
+
+            for gpu_index, share, token_cap in shares:
+                for batch in self.packing.pack(share, model_batch_size, token_cap):
+                    plan = BatchPlan(
                         model_id=model_id,
-                        tasks=current_batch,
-                        total_tokens=token_count,
-                        reason="Batch finalization",
+                        tasks=batch,
+                        total_tokens=sum(task.token_estimate for task in batch),
+                        reason=f"Packed with {self.packing.name}",
+                        prefix_hash=prefix_hash,
+                        token_capacity=token_cap,
+                        gpu_index=gpu_index,
                     )
-                )
+                    # Servers that pad batches hold the padded tokens in memory.
+                    needed = plan.padded_tokens if self.packing.pads_batches else plan.total_tokens
+                    if gpu_index is not None and needed > token_cap:
+                        plan.reason += "; exceeds predicted GPU memory"
+                    plans.append(plan)
 
         return plans
 
     @staticmethod
-    def _group_by_model(tasks: List[LlmTask]) -> Dict[str, List[LlmTask]]:
-        grouped: Dict[str, List[LlmTask]] = {}
+    def _spread(tasks: List[LlmTask], gpu_caps: Dict[int, int], gpu_load: Dict[int, int]) -> Dict[int, List[LlmTask]]:
+        # Largest task first onto the GPU it fits on with the lowest load relative to its cap;
+        # tasks too large for every GPU go to the one with the most room.
+        shares: Dict[int, List[LlmTask]] = {}
+        roomiest = max(gpu_caps, key=lambda index: gpu_caps[index])
+        for task in sorted(tasks, key=lambda task: task.token_estimate, reverse=True):
+            fitting = [index for index, cap in gpu_caps.items() if cap and cap >= task.token_estimate]
+            target = (
+                min(fitting, key=lambda index: (gpu_load[index] + task.token_estimate) / gpu_caps[index])
+                if fitting
+                else roomiest
+            )
+            shares.setdefault(target, []).append(task)
+            gpu_load[target] += task.token_estimate
+        return shares
+
+    def _rate_limited_caps(self, model_id: str, max_batch_size: int, max_tokens_per_batch: int) -> Tuple[int, int]:
+        # A batch larger than the provider window could never be submitted, so
+        # batches are capped at the model's requests and tokens per window.
+        limit = self.budget_manager.get_rate_limit(model_id) if self.budget_manager else None
+        if limit is None:
+            return max_batch_size, max_tokens_per_batch
+        if limit.requests_per_minute is not None:
+            max_batch_size = max(1, min(max_batch_size, limit.requests_per_minute))
+        if limit.tokens_per_minute is not None:
+            max_tokens_per_batch = max(1, min(max_tokens_per_batch, limit.tokens_per_minute))
+        return max_batch_size, max_tokens_per_batch
+
+    @staticmethod
+    def _group_by_model(
+        tasks: List[LlmTask], group_by_prefix: bool = False
+    ) -> Dict[Tuple[str, Optional[str]], List[LlmTask]]:
+        grouped: Dict[Tuple[str, Optional[str]], List[LlmTask]] = {}
         for task in tasks:
-            key = task.target_model or task.constraints.preferred_model or "unspecified"
+            model_id = task.target_model or task.constraints.preferred_model or "unspecified"
+            key = (model_id, task.prefix_hash if group_by_prefix else None)
             grouped.setdefault(key, []).append(task)
         return grouped
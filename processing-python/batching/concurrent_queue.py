@@ -0,0 +1,214 @@
+"""Blocking and asyncio front ends for sharing a TaskQueue between workers."""
+
+from __future__ import annotations
+
+import asyncio
+import queue
+import threading
+import time
+from concurrent.futures import Executor
+from typing import Iterable, List, Optional
+
+from batching.task import LlmTask
+from batching.task_queue import TaskQueue, model_key
+from router.task_types import TaskType
+
+
+class ConcurrentTaskQueue:
+    """Thread-safe TaskQueue with bounded capacity and linger-based batching.
+
+    `add_task` blocks while `capacity` tasks are queued (raising
+    `queue.Full` after `timeout`), so fast producers are slowed down to the
+    pace of inference instead of growing the queue without bound.
+    `get_batch` waits for the first task and then lingers for up to
+    `linger_s` while the batch fills, returning early once `max_tasks` tasks
+    or `max_tokens` tokens for the head task's model are queued; batches
+    always hold a single model. Scheduling order is that of the wrapped
+    `TaskQueue`.
+    """
+
+    def __init__(
+        self,
+        capacity: int = 10_000,
+        linger_s: float = 0.05,
+        task_queue: Optional[TaskQueue] = None,
+    ) -> None:
+        if capacity <= 0:
+            raise ValueError("capacity must be positive")
+        self.capacity = capacity
+        self.linger_s = linger_s
+        self._queue = task_queue or TaskQueue()
+        self._lock = threading.Lock()
+        self._not_empty = threading.Condition(self._lock)
+        self._not_full = threading.Condition(self._lock)
+        self._closed = False
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._queue)
+
+    @property
+    def closed(self) -> bool:
+        return self._closed
+
+    def add_task(
+        self,
+        task: LlmTask,
+        block: bool = True,
+        timeout: Optional[float] = None,
+        abandoned: Optional[threading.Event] = None,
+    ) -> None:
+        """Queue `task`; if `abandoned` is set (see `abandon`) while waiting for room, give up without queuing it."""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._not_full:
+            while len(self._queue) >= self.capacity and not self._closed:
+                if abandoned is not None and abandoned.is_set():
+                    return
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if not block or (remaining is not None and remaining <= 0):
+                    raise queue.Full
+                self._not_full.wait(remaining)
+            if self._closed:
+                raise RuntimeError("TaskQueue is closed")
+            self._queue.add_task(task)
+            # Consumers may be waiting on different models, so wake them all.
+            self._not_empty.notify_all()
+
+    def put_back(self, tasks: Iterable[LlmTask]) -> None:
+        """Requeue tasks taken by a consumer that could not run them, ignoring capacity."""
+        with self._lock:
+            for task in tasks:
+                self._queue.add_task(task)
+            self._not_empty.notify_all()
+
+    def cancel(self, task_id: str) -> Optional[LlmTask]:
+        with self._lock:
+            task = self._queue.cancel(task_id)
+            if task is not None:
+                self._not_full.notify()
+            return task
+
+    def get_batch(
+        self,
+        max_tasks: int,
+        max_tokens: Optional[int] = None,
+        timeout: Optional[float] = None,
+        linger_s: Optional[float] = None,
+        task_type: Optional[TaskType] = None,
+        model: Optional[str] = None,
+        abandoned: Optional[threading.Event] = None,
+    ) -> List[LlmTask]:
+        """Next batch, or [] if nothing arrived within `timeout`, the queue was closed and drained,
+        or `abandoned` was set (see `abandon`) before a batch was taken."""
+        linger = self.linger_s if linger_s is None else linger_s
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._not_empty:
+            while True:
+                if abandoned is not None and abandoned.is_set():
+                    return []
+                head = self._queue.peek(task_type, model)
+                if head is None:
+                    if self._closed:
+                        return []
+                    remaining = None if deadline is None else deadline - time.monotonic()
+                    if remaining is not None and remaining <= 0:
+                        return []
+                    self._not_empty.wait(remaining)
+                    continue
+                batch_model = model or model_key(head)
+                if not self._closed and not self._filled(max_tasks, max_tokens, task_type, batch_model):
+                    # Linger from the moment a task is available, not from the call.
+                    linger_until = time.monotonic() + linger
+                    while True:
+                        remaining = linger_until - time.monotonic()
+                        if remaining <= 0 or not self._not_empty.wait(remaining):
+                            break
+                        if self._closed or self._filled(max_tasks, max_tokens, task_type, batch_model):
+                            break
+                        if abandoned is not None and abandoned.is_set():
+                            return []
+                batch = self._queue.pop_next_batch(max_tasks, task_type, batch_model, max_tokens)
+                if batch:
+                    self._not_full.notify_all()
+                    return batch
+
+    def abandon(self, abandoned: threading.Event) -> None:
+        """Set `abandoned` and wake the waiters, so calls given that event return promptly."""
+        with self._lock:
+            abandoned.set()
+            self._not_empty.notify_all()
+            self._not_full.notify_all()
+
+    def close(self) -> None:
+        """Reject new tasks and wake every waiter; consumers drain what is left."""
+        with self._lock:
+            self._closed = True
+            self._not_empty.notify_all()
+            self._not_full.notify_all()
+
+    def _filled(self, max_tasks: int, max_tokens: Optional[int], task_type: Optional[TaskType], model: str) -> bool:
+        if self._queue.pending_count(task_type, model) >= max_tasks:
+            return True
+        return max_tokens is not None and self._queue.pending_tokens(task_type, model) >= max_tokens
+
+
+class AsyncTaskQueue:
+    """Asyncio facade over a ConcurrentTaskQueue shared with thread-based workers.
+
+    Blocking calls run on `executor` (the loop's default executor if None).
+    Cancelling a call abandons the blocking call, so the worker thread
+    returns promptly instead of staying parked on the queue: `get_batch`
+    puts back a batch the worker had already taken, and `add_task`
+    withdraws the task unless it was already queued.
+    """
+
+    def __init__(self, concurrent_queue: ConcurrentTaskQueue, executor: Optional[Executor] = None) -> None:
+        self.queue = concurrent_queue
+        self._executor = executor
+
+    async def add_task(self, task: LlmTask, timeout: Optional[float] = None) -> None:
+        loop = asyncio.get_running_loop()
+        abandoned = threading.Event()
+        future = loop.run_in_executor(
+            self._executor, lambda: self.queue.add_task(task, timeout=timeout, abandoned=abandoned)
+        )
+        try:
+            await asyncio.shield(future)
+        except asyncio.CancelledError:
+            self.abandon(abandoned)
+            raise
+
+    async def get_batch(
+        self,
+        max_tasks: int,
+        max_tokens: Optional[int] = None,
+        timeout: Optional[float] = None,
+        linger_s: Optional[float] = None,
+        task_type: Optional[TaskType] = None,
+        model: Optional[str] = None,
+    ) -> List[LlmTask]:
+        loop = asyncio.get_running_loop()
+        abandoned = threading.Event()
+        future = loop.run_in_executor(
+            self._executor,
+            lambda: self.queue.get_batch(max_tasks, max_tokens, timeout, linger_s, task_type, model, abandoned),
+        )
+        try:
+            return await asyncio.shield(future)
+        except asyncio.CancelledError:
+            self.abandon(abandoned)
+            future.add_done_callback(self._put_back)
+            raise
+
+    def cancel(self, task_id: str) -> Optional[LlmTask]:
+        return self.queue.cancel(task_id)
+
+    def abandon(self, abandoned: threading.Event) -> None:
+        self.queue.abandon(abandoned)
+
+    def close(self) -> None:
+        self.queue.close()
+
+    def _put_back(self, future: "asyncio.Future[List[LlmTask]]") -> None:
+        if not future.cancelled() and future.exception() is None and future.result():
+            self.queue.put_back(future.result())
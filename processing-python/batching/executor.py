@@ -3,11 +3,14 @@
 from __future__ import annotations
 
 import logging
+import time
 from dataclasses import dataclass
-from typing import Callable, List, Optional
+from typing import Any, Callable, List, Optional
 
 from batching.batch_planner import BatchPlan
 from batching.task import LlmTask
+from context.token_budget import TokenBudgetManager
+from models.openrouter_client import CompletionUsage
 
 logger = logging.getLogger(__name__)
 
@@ -26,27 +29,69 @@ class BatchResult:
 class BatchExecutor:
     """Executes planned batches and applies fallback strategies upon failure."""
 
-    def __init__(self, inference_fn: Callable[[BatchPlan], None], fallback_fn: Optional[Callable[[List[LlmTask]], None]] = None) -> None:
+    def __init__(
+        self,
+        inference_fn: Callable[[BatchPlan], Any],
+        fallback_fn: Optional[Callable[[List[LlmTask]], None]] = None,
+        budget_manager: Optional[TokenBudgetManager] = None,
+        sleep: Callable[[float], None] = time.sleep,
+        expected_output_tokens: int = 256,
+    ) -> None:
+        """`inference_fn` may return the CompletionUsage (or a list of them) of the batch;
+        with a `budget_manager`, submissions are paced by the model's rate limit and
+        the ledger is corrected with that usage.
+
+        Reservations cover the prompt tokens plus an output allowance per task:
+        `constraints.max_tokens` when set, otherwise `expected_output_tokens`."""
         self.inference_fn = inference_fn
         self.fallback_fn = fallback_fn
+        self.budget_manager = budget_manager
+        self.sleep = sleep
+        self.expected_output_tokens = expected_output_tokens
 
     def execute(self, plans: List[BatchPlan]) -> List[BatchResult]:
         results: List[BatchResult] = []
         for plan in plans:
             try:
-                self.inference_fn(plan)
+                self._run(plan)
                 results.append(BatchResult(plan=plan, success=True))
             except ExecutionError as exc:
                 results.append(BatchResult(plan=plan, success=False, error=str(exc)))
                 fallback_plans = self._fallback(plan, str(exc))
                 for fallback_plan in fallback_plans:
                     try:
-                        self.inference_fn(fallback_plan)
+                        self._run(fallback_plan)
                         results.append(BatchResult(plan=fallback_plan, success=True))
                     except ExecutionError as fallback_exc:
                         results.append(BatchResult(plan=fallback_plan, success=False, error=str(fallback_exc)))
         return results
 
+    def _run(self, plan: BatchPlan) -> None:
+        if not self.budget_manager:
+            self.inference_fn(plan)
+            return
+        tokens = plan.total_tokens + self._output_allowance(plan)
+        reservation = self.budget_manager.reserve(plan.model_id, tokens, requests=len(plan.tasks), sleep=self.sleep)
+        if reservation is None:
+            raise ExecutionError(f"Batch of {tokens} tokens exceeds the rate limit of {plan.model_id}")
+        try:
+            usage = self.inference_fn(plan)
+        except Exception:
+            # A failed batch (and its fallback splits) must not stay charged to the window.
+            self.budget_manager.release(reservation)
+            raise
+        if isinstance(usage, list) and usage and all(isinstance(item, CompletionUsage) for item in usage):
+            usage = CompletionUsage(
+                input_tokens=sum(item.input_tokens for item in usage),
+                output_tokens=sum(item.output_tokens for item in usage),
+                total_tokens=sum(item.total_tokens for item in usage),
+            )
+        # Without reported usage the reservation stands as the charge.
+        self.budget_manager.commit(reservation, usage if isinstance(usage, CompletionUsage) else None)
+
+    def _output_allowance(self, plan: BatchPlan) -> int:
+        return sum(task.constraints.max_tokens or self.expected_output_tokens for task in plan.tasks)
+
     def _fallback(self, plan: BatchPlan, reason: str) -> List[BatchPlan]:
         logger.warning("Batch failed: %s", reason)
         if "OOM" in reason.upper():
@@ -60,6 +105,6 @@ class BatchExecutor:
             return []
         mid = len(plan.tasks) // 2
         return [
-            BatchPlan(model_id=plan.model_id, tasks=plan.tasks[:mid], total_tokens=sum(t.token_estimate for t in plan.tasks[:mid]), reason="Fallback split part A"),
-            BatchPlan(model_id=plan.model_id, tasks=plan.tasks[mid:], total_tokens=sum(t.token_estimate for t in plan.tasks[mid:]), reason="Fallback split part B"),
+            BatchPlan(model_id=plan.model_id, tasks=plan.tasks[:mid], total_tokens=sum(t.token_estimate for t in plan.tasks[:mid]), reason="Fallback split part A", prefix_hash=plan.prefix_hash, token_capacity=plan.token_capacity, gpu_index=plan.gpu_index),
+            BatchPlan(model_id=plan.model_id, tasks=plan.tasks[mid:], total_tokens=sum(t.token_estimate for t in plan.tasks[mid:]), reason="Fallback split part B", prefix_hash=plan.prefix_hash, token_capacity=plan.token_capacity, gpu_index=plan.gpu_index),
         ]
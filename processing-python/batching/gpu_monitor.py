@@ -6,7 +6,7 @@ import json
 import shutil
 import subprocess
 from dataclasses import dataclass
-from typing import List, Optional
+from typing import Callable, List, Optional
 
 
 @dataclass
@@ -24,20 +24,35 @@ class GpuStatus:
     used_memory_mb: int
     free_memory_mb: int
     processes: List[GpuProcess]
+    uuid: Optional[str] = None
 
 
 class GpuMonitor:
-    """Wrap nvidia-smi when available; fallback to empty stats otherwise."""
+    """Wrap nvidia-smi when available; fallback to empty stats otherwise.
 
-    def __init__(self) -> None:
-        self.nvidia_smi = shutil.which("nvidia-smi")
+    `runner` replaces the subprocess call, e.g. to replay recorded
+    nvidia-smi output (see `from_recorded`).
+    """
+
+    def __init__(self, runner: Optional[Callable[[List[str]], str]] = None) -> None:
+        self.nvidia_smi = "nvidia-smi" if runner else shutil.which("nvidia-smi")
+        self._runner = runner
+
+    @classmethod
+    def from_recorded(cls, gpu_output: str, process_output: str = "") -> "GpuMonitor":
+        """Monitor that answers with captured `--query-gpu` and `--query-compute-apps` CSV output."""
+
+        def runner(command: List[str]) -> str:
+            return process_output if any(arg.startswith("--query-compute-apps") for arg in command) else gpu_output
+
+        return cls(runner=runner)
 
     def sample(self) -> List[GpuStatus]:
         if not self.nvidia_smi:
             return []
         query = [
             self.nvidia_smi,
-            "--query-gpu=index,name,memory.total,memory.used,memory.free",
+            "--query-gpu=index,uuid,name,memory.total,memory.used,memory.free",
             "--format=csv,noheader,nounits",
         ]
         gpu_output = self._run(query)
@@ -53,6 +68,8 @@ class GpuMonitor:
         return status
 
     def _run(self, command: List[str]) -> str:
+        if self._runner:
+            return self._runner(command)
         try:
             return subprocess.check_output(command, text=True)
         except (subprocess.CalledProcessError, FileNotFoundError):
@@ -62,9 +79,12 @@ class GpuMonitor:
         status: List[GpuStatus] = []
         for line in output.strip().splitlines():
             parts = [p.strip() for p in line.split(",")]
-            if len(parts) != 5:
+            if len(parts) == 5:
+                # Output recorded before the uuid column was queried.
+                parts.insert(1, "")
+            if len(parts) != 6:
                 continue
-            index, name, total, used, free = parts
+            index, uuid, name, total, used, free = parts
             status.append(
                 GpuStatus(
                     index=int(index),
@@ -73,6 +93,7 @@ class GpuMonitor:
                     used_memory_mb=int(used),
                     free_memory_mb=int(free),
                     processes=[],
+                    uuid=uuid or None,
                 )
             )
         return status
@@ -84,5 +105,6 @@ class GpuMonitor:
                 continue
             gpu_uuid, pid, name, memory = parts
             process = GpuProcess(pid=int(pid), name=name, memory_mb=int(memory))
-            if status:
-                status[0].processes.append(process)
+            owner = next((gpu for gpu in status if gpu.uuid == gpu_uuid), status[0] if status else None)
+            if owner:
+                owner.processes.append(process)
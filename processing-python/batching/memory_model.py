@@ -0,0 +1,153 @@
+"""Per-model GPU memory cost models fitted from batch execution history."""
+
+from __future__ import annotations
+
+import math
+from dataclasses import dataclass
+from typing import Any, Dict, Iterable, Mapping, Optional, Set
+
+from batching.gpu_monitor import GpuStatus
+
+OOM_MARKERS = ("oom", "out of memory")
+
+
+def is_oom(error: Optional[str]) -> bool:
+    return bool(error) and any(marker in error.lower() for marker in OOM_MARKERS)
+
+
+@dataclass
+class MemoryCostModel:
+    """Memory a batch of a model needs: KV cache per token, fixed overhead and, off its home GPUs, weights.
+
+    Free memory in the batch history is read while the model is loaded, so
+    `weights_mb` is only charged on GPUs that do not hold the model. With
+    `server_process` set, a GPU holds the model when nvidia-smi lists a
+    compute process whose name contains it (see `max_tokens_on`);
+    otherwise `resident_gpus` lists them (None means resident everywhere).
+    `safety_margin` is the share of free memory kept in reserve.
+    """
+
+    model_id: str
+    kv_mb_per_token: float
+    weights_mb: float = 0.0
+    overhead_mb: float = 0.0
+    safety_margin: float = 0.1
+    resident_gpus: Optional[Set[int]] = None
+    server_process: Optional[str] = None
+    successes: int = 0
+    failures: int = 0
+
+    def required_mb(self, tokens: int, gpu_index: Optional[int] = None) -> float:
+        return self._fixed_mb(gpu_index) + self.kv_mb_per_token * tokens
+
+    def max_tokens(self, free_memory_mb: float, gpu_index: Optional[int] = None, resident: Optional[bool] = None) -> int:
+        """Largest batch, in tokens, predicted to fit in `free_memory_mb`; 0 if none does."""
+        available = free_memory_mb * (1 - self.safety_margin) - self._fixed_mb(gpu_index, resident)
+        if available <= 0:
+            return 0
+        return int(available / self.kv_mb_per_token)
+
+    def max_tokens_on(self, gpu: GpuStatus) -> int:
+        """`max_tokens` for a sampled GPU, taking residency from its processes when `server_process` is set."""
+        return self.max_tokens(gpu.free_memory_mb, gpu.index, self._resident_on(gpu))
+
+    def _resident_on(self, gpu: GpuStatus) -> Optional[bool]:
+        if self.server_process is None:
+            return None
+        return any(self.server_process in process.name for process in gpu.processes)
+
+    def _fixed_mb(self, gpu_index: Optional[int], resident: Optional[bool] = None) -> float:
+        if resident is None:
+            resident = self.resident_gpus is None or (gpu_index is not None and gpu_index in self.resident_gpus)
+        return self.overhead_mb + (0.0 if resident else self.weights_mb)
+
+    @classmethod
+    def fit(
+        cls,
+        model_id: str,
+        records: Iterable[Mapping[str, Any]],
+        kv_mb_per_token: Optional[float] = None,
+        weights_mb: float = 0.0,
+        overhead_mb: float = 0.0,
+        safety_margin: float = 0.1,
+        server_process: Optional[str] = None,
+    ) -> Optional["MemoryCostModel"]:
+        """Fit the KV cost per token from `BatchLogger` records of one model.
+
+        A success at `t` tokens with `f` MB free shows (f - overhead) / t MB
+        per token was enough; the smallest such ratio is used, as it never
+        predicts more tokens per MB than history has shown to fit. Each OOM
+        proves the cost is above its ratio, and the `kv_mb_per_token` prior
+        is a floor too, so the estimate is the largest of these. Records
+        without free memory or tokens are ignored; None if nothing usable
+        remains.
+        """
+        lower = 0.0
+        upper = math.inf
+        successes = failures = 0
+        for record in records:
+            if record.get("model_id") != model_id:
+                continue
+            free = record.get("gpu_free_memory_mb")
+            tokens = record.get("actual_tokens") or record.get("estimated_tokens")
+            if not free or not tokens:
+                continue
+            ratio = (free - overhead_mb) / tokens
+            if is_oom(record.get("error")):
+                failures += 1
+                lower = max(lower, ratio)
+            elif record.get("success"):
+                successes += 1
+                upper = min(upper, ratio)
+
+        bounds = [kv_mb_per_token or 0.0, lower]
+        if successes:
+            bounds.append(upper)
+        if not successes and not failures and kv_mb_per_token is None:
+            return None
+        estimate = max(bounds)
+        if estimate <= 0:
+            return None
+        return cls(
+            model_id=model_id,
+            kv_mb_per_token=estimate,
+            weights_mb=weights_mb,
+            overhead_mb=overhead_mb,
+            safety_margin=safety_margin,
+            server_process=server_process,
+            successes=successes,
+            failures=failures,
+        )
+
+
+def fit_memory_models(
+    records: Iterable[Mapping[str, Any]],
+    kv_priors: Optional[Mapping[str, float]] = None,
+    weights_mb: Optional[Mapping[str, float]] = None,
+    safety_margin: float = 0.1,
+    server_processes: Optional[Mapping[str, str]] = None,
+) -> Dict[str, MemoryCostModel]:
+    """Fit a cost model for every model in a batch log, e.g. `iter_records(batch_log_path)`.
+
+    `weights_mb` is only charged on GPUs without the model's serving
+    process, named per model in `server_processes`; models without one are
+    taken to be loaded on every GPU.
+    """
+    history = list(records)
+    priors = dict(kv_priors or {})
+    weights = dict(weights_mb or {})
+    servers = dict(server_processes or {})
+    model_ids = {record.get("model_id") for record in history if record.get("model_id")} | set(priors)
+    models: Dict[str, MemoryCostModel] = {}
+    for model_id in sorted(model_ids):
+        model = MemoryCostModel.fit(
+            model_id,
+            history,
+            kv_mb_per_token=priors.get(model_id),
+            weights_mb=weights.get(model_id, 0.0),
+            safety_margin=safety_margin,
+            server_process=servers.get(model_id),
+        )
+        if model is not None:
+            models[model_id] = model
+    return models
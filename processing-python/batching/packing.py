@@ -0,0 +1,184 @@
+"""Bin-packing strategies that split one model's tasks into batches.
+
+Every strategy respects a task-count cap and a token cap per batch. A task
+that alone exceeds the token cap gets a batch of its own, as before.
+"""
+
+from __future__ import annotations
+
+import bisect
+from typing import Callable, Dict, List, Protocol
+
+from batching.task import LlmTask
+
+
+class PackingStrategy(Protocol):
+    name: str
+    # True if the token cap is applied to the padded batch (longest prompt x batch size).
+    pads_batches: bool
+
+    def pack(self, tasks: List[LlmTask], max_batch_size: int, max_tokens: int) -> List[List[LlmTask]]:
+        ...
+
+
+def _by_size(tasks: List[LlmTask]) -> List[LlmTask]:
+    return sorted(tasks, key=lambda task: task.token_estimate, reverse=True)
+
+
+class NextFitPacker:
+    """The original planner: walk tasks largest first and close the batch on the first overflow."""
+
+    name = "next-fit"
+    pads_batches = False
+
+    def pack(self, tasks: List[LlmTask], max_batch_size: int, max_tokens: int) -> List[List[LlmTask]]:
+        batches: List[List[LlmTask]] = []
+        current: List[LlmTask] = []
+        used = 0
+        for task in _by_size(tasks):
+            if current and (len(current) >= max_batch_size or used + task.token_estimate > max_tokens):
+                batches.append(current)
+                current, used = [], 0
+            current.append(task)
+            used += task.token_estimate
+        if current:
+            batches.append(current)
+        return batches
+
+
+class _FirstFitTree:
+    """Max segment tree over remaining batch capacity; finds the leftmost batch a task fits in."""
+
+    def __init__(self, slots: int, capacity: int) -> None:
+        size = 1
+        while size < slots:
+            size *= 2
+        self.size = size
+        # Unopened batches have full capacity, so the first one to the right of
+        # the open batches is where a new batch gets opened.
+        self.tree = [capacity] * (2 * size)
+
+    def first_fit(self, need: int) -> int:
+        if self.tree[1] < need:
+            return -1
+        node = 1
+        while node < self.size:
+            node = 2 * node if self.tree[2 * node] >= need else 2 * node + 1
+        return node - self.size
+
+    def update(self, slot: int, remaining: int) -> None:
+        node = slot + self.size
+        self.tree[node] = remaining
+        node //= 2
+        while node:
+            self.tree[node] = max(self.tree[2 * node], self.tree[2 * node + 1])
+            node //= 2
+
+
+class FirstFitDecreasingPacker:
+    """Largest task first into the earliest batch with room: at most 11/9 OPT + 1 batches."""
+
+    name = "first-fit-decreasing"
+    pads_batches = False
+
+    def pack(self, tasks: List[LlmTask], max_batch_size: int, max_tokens: int) -> List[List[LlmTask]]:
+        batches: List[List[LlmTask]] = []
+        oversized: List[List[LlmTask]] = []
+        tree = _FirstFitTree(max(1, len(tasks)), max_tokens)
+        for task in _by_size(tasks):
+            if task.token_estimate > max_tokens:
+                oversized.append([task])
+                continue
+            slot = tree.first_fit(task.token_estimate)
+            if slot == len(batches):
+                batches.append([])
+            batch = batches[slot]
+            batch.append(task)
+            remaining = tree.tree[slot + tree.size] - task.token_estimate
+            tree.update(slot, remaining if len(batch) < max_batch_size else -1)
+        return oversized + batches
+
+
+class BestFitDecreasingPacker:
+    """Largest task first into the open batch it fills most tightly."""
+
+    name = "best-fit"
+    pads_batches = False
+
+    def pack(self, tasks: List[LlmTask], max_batch_size: int, max_tokens: int) -> List[List[LlmTask]]:
+        batches: List[List[LlmTask]] = []
+        oversized: List[List[LlmTask]] = []
+        # (remaining tokens, batch index) for batches that can still take a task.
+        open_batches: List[tuple] = []
+        for task in _by_size(tasks):
+            need = task.token_estimate
+            if need > max_tokens:
+                oversized.append([task])
+                continue
+            position = bisect.bisect_left(open_batches, (need, -1))
+            if position < len(open_batches):
+                remaining, index = open_batches.pop(position)
+            else:
+                remaining, index = max_tokens, len(batches)
+                batches.append([])
+            batches[index].append(task)
+            if len(batches[index]) < max_batch_size and remaining - need > 0:
+                bisect.insort(open_batches, (remaining - need, index))
+        return oversized + batches
+
+
+class PaddingAwarePacker:
+    """Minimizes padded tokens (longest prompt x batch size) for servers that pad batches.
+
+    Local inference servers pad every sequence to the longest one in the
+    batch, so the token cap is applied to the padded size. With tasks sorted
+    by length an optimal split is contiguous, found by dynamic programming
+    over split points in O(n * max_batch_size). `batch_overhead_tokens`
+    prices each extra batch so the result does not fall apart into
+    singletons, which would trivially have no padding.
+    """
+
+    name = "padding-aware"
+    pads_batches = True
+
+    def __init__(self, batch_overhead_tokens: int = 512) -> None:
+        self.batch_overhead_tokens = batch_overhead_tokens
+
+    def pack(self, tasks: List[LlmTask], max_batch_size: int, max_tokens: int) -> List[List[LlmTask]]:
+        ordered = _by_size(tasks)
+        count = len(ordered)
+        lengths = [task.token_estimate for task in ordered]
+        best = [0.0] + [float("inf")] * count
+        split = [0] * (count + 1)
+        for end in range(1, count + 1):
+            for start in range(end - 1, max(-1, end - 1 - max_batch_size), -1):
+                size = end - start
+                padded = lengths[start] * size
+                if size > 1 and padded > max_tokens:
+                    break
+                cost = best[start] + padded + self.batch_overhead_tokens
+                if cost < best[end]:
+                    best[end] = cost
+                    split[end] = start
+        batches: List[List[LlmTask]] = []
+        end = count
+        while end:
+            batches.append(ordered[split[end] : end])
+            end = split[end]
+        batches.reverse()
+        return batches
+
+
+PACKING_STRATEGIES: Dict[str, Callable[[], PackingStrategy]] = {
+    NextFitPacker.name: NextFitPacker,
+    FirstFitDecreasingPacker.name: FirstFitDecreasingPacker,
+    BestFitDecreasingPacker.name: BestFitDecreasingPacker,
+    PaddingAwarePacker.name: PaddingAwarePacker,
+}
+
+
+def packing_strategy(name: str) -> PackingStrategy:
+    try:
+        return PACKING_STRATEGIES[name]()
+    except KeyError:
+        raise ValueError(f"Unknown packing strategy {name}") from None
@@ -31,6 +31,7 @@ class LlmTask:
     target_model: Optional[str] = field(compare=False, default=None)
     token_estimate: int = field(compare=False, default=0)
     constraints: TaskConstraints = field(compare=False, default_factory=TaskConstraints)
+    prefix_hash: Optional[str] = field(compare=False, default=None)  # static prompt prefix, see PromptRenderer.prefix_hash
 
     def __post_init__(self) -> None:
         if not self.target_model:
@@ -3,53 +3,353 @@
 from __future__ import annotations
 
 import heapq
-from collections import defaultdict
+import itertools
+import math
+import time
+from collections import deque
 from datetime import datetime
-from typing import Dict, List, Optional
+from typing import TYPE_CHECKING, Callable, Deque, Dict, Iterator, List, Mapping, Optional, Tuple
 
 from batching.task import LlmTask
 from router.task_types import TaskType
 
+if TYPE_CHECKING:
+    from benchmarks.model_profile import ModelProfile
 
-class TaskQueue:
-    """Priority-aware task queue with simple batching."""
+BucketKey = Tuple[TaskType, str]
+
+SCHEDULING_MODES = ("priority", "deadline")
+DEADLINE_POLICIES = ("keep", "drop", "escalate")
+
+# Heap entries are [priority class, deadline, sequence, task, bucket key, entered class at].
+# The sequence is unique, so comparisons never reach the task. The deadline slot
+# is 0.0 in priority mode, which leaves ties to arrival order. Entries whose task
+# was popped, cancelled or requeued keep their slot with task set to None and
+# are skipped when they reach the top.
+_CLASS, _DEADLINE, _SEQUENCE, _TASK, _BUCKET, _ENTERED = range(6)
+
+
+def model_key(task: LlmTask) -> str:
+    """Model a task is batched under."""
+    return task.target_model or (task.constraints.preferred_model or "unspecified")
+
+
+def _deadline_ts(task: LlmTask) -> float:
+    if task.deadline is None or task.deadline == datetime.max:
+        return math.inf
+    return task.deadline.timestamp()
+
+
+class _Bucket:
+    """Heap of the queued tasks for one (task_type, model) pair with running totals."""
+
+    __slots__ = ("heap", "tokens", "count")
 
     def __init__(self) -> None:
-        self._heap: List[LlmTask] = []
+        self.heap: List[list] = []
+        self.tokens = 0
+        self.count = 0
+
+    def head(self) -> Optional[list]:
+        heap = self.heap
+        while heap and heap[0][_TASK] is None:
+            heapq.heappop(heap)
+        return heap[0] if heap else None
+
+    def pop(self) -> LlmTask:
+        entry = heapq.heappop(self.heap)
+        task = entry[_TASK]
+        entry[_TASK] = None
+        self.tokens -= task.token_estimate
+        self.count -= 1
+        return task
+
+    def iter_ordered(self) -> Iterator[list]:
+        """Walk live entries in priority order without popping: O(k log k) for the first k."""
+        heap = self.heap
+        frontier = [(heap[0], 0)] if heap else []
+        while frontier:
+            entry, index = heapq.heappop(frontier)
+            for child in (2 * index + 1, 2 * index + 2):
+                if child < len(heap):
+                    heapq.heappush(frontier, (heap[child], child))
+            if entry[_TASK] is not None:
+                yield entry
+
+    def compact(self) -> None:
+        # Tombstones only leave the heap when they surface; rebuild once they dominate.
+        if len(self.heap) > 64 and len(self.heap) > 2 * self.count:
+            self.heap = [entry for entry in self.heap if entry[_TASK] is not None]
+            heapq.heapify(self.heap)
+
+
+class TaskQueue:
+    """Priority-aware task queue with simple batching.
+
+    Tasks are kept in one heap per (task_type, model) bucket with running
+    token totals, so typed pops, model-grouped drains and `cancel` cost
+    O(log n) per task plus a scan over bucket heads, independent of how many
+    tasks of other types are queued.
+
+    `scheduling="priority"` orders by `priority`, then arrival.
+    `scheduling="deadline"` orders by `priority` as a class, then earliest
+    deadline. With `aging_s`, a task that waited that long in its class moves
+    up one class (towards 0) at the next scheduling call, so low-priority work
+    is not starved; aging stops at `aging_floor`, so aged work never outranks
+    tasks queued in a better class. With `latency_profiles`, a task whose estimated
+    completion (now + the profiled latency for its model and task type) is
+    past its deadline when it reaches the front is handled by
+    `deadline_policy`: "keep" schedules it as usual, "drop" removes it and
+    reports it to `on_deadline_miss`, "escalate" moves it to
+    `escalation_priority` so it finishes as little late as possible.
+    """
+
+    def __init__(
+        self,
+        scheduling: str = "priority",
+        aging_s: Optional[float] = None,
+        aging_floor: int = 1,
+        latency_profiles: Optional[Mapping[str, ModelProfile]] = None,
+        deadline_policy: str = "keep",
+        escalation_priority: int = 0,
+        on_deadline_miss: Optional[Callable[[LlmTask, str], None]] = None,
+        clock: Callable[[], float] = time.time,
+    ) -> None:
+        if scheduling not in SCHEDULING_MODES:
+            raise ValueError(f"Unknown scheduling mode {scheduling}")
+        if deadline_policy not in DEADLINE_POLICIES:
+            raise ValueError(f"Unknown deadline policy {deadline_policy}")
+        self.scheduling = scheduling
+        self.aging_s = aging_s
+        self.aging_floor = aging_floor
+        self.latency_profiles = dict(latency_profiles or {})
+        self.deadline_policy = deadline_policy
+        self.escalation_priority = escalation_priority
+        self.on_deadline_miss = on_deadline_miss
+        self.dropped = 0
+        self.escalated = 0
+        self.promoted = 0
+        self._clock = clock
+        self._buckets: Dict[BucketKey, _Bucket] = {}
+        self._entries: Dict[str, list] = {}
+        # Entries per class in the order they entered it, for aging.
+        self._arrivals: Dict[int, Deque[list]] = {}
+        self._sequence = itertools.count()
+        self._size = 0
+
+    def __len__(self) -> int:
+        return self._size
+
+    def __contains__(self, task_id: object) -> bool:
+        return task_id in self._entries
 
     def add_task(self, task: LlmTask) -> None:
         if task.deadline is None:
             task.deadline = datetime.max
-        heapq.heappush(self._heap, task)
+        if task.task_id and task.task_id in self._entries:
+            raise ValueError(f"Task {task.task_id} is already queued")
+        key = (task.task_type, model_key(task))
+        bucket = self._buckets.get(key)
+        if bucket is None:
+            bucket = self._buckets[key] = _Bucket()
+        deadline = _deadline_ts(task) if self.scheduling == "deadline" else 0.0
+        entry = [task.priority, deadline, next(self._sequence), task, key, self._clock() if self.aging_s else 0.0]
+        heapq.heappush(bucket.heap, entry)
+        bucket.tokens += task.token_estimate
+        bucket.count += 1
+        self._size += 1
+        if task.task_id:
+            self._entries[task.task_id] = entry
+        self._track_arrival(entry)
+
+    def cancel(self, task_id: str) -> Optional[LlmTask]:
+        """Remove a queued task by id; returns it, or None if it is not queued."""
+        entry = self._entries.pop(task_id, None)
+        if entry is None:
+            return None
+        bucket = self._buckets[entry[_BUCKET]]
+        task = entry[_TASK]
+        entry[_TASK] = None
+        bucket.tokens -= task.token_estimate
+        bucket.count -= 1
+        self._size -= 1
+        bucket.compact()
+        return task
+
+    def pop_next_batch(
+        self,
+        batch_size: int,
+        task_type: Optional[TaskType] = None,
+        model: Optional[str] = None,
+        max_tokens: Optional[int] = None,
+    ) -> List[LlmTask]:
+        """Pop up to `batch_size` tasks in scheduling order.
 
-    def pop_next_batch(self, batch_size: int, task_type: Optional[TaskType] = None) -> List[LlmTask]:
-        if not self._heap:
-            return []
+        With `max_tokens`, stops before the first task that would push the
+        batch over it; a single task larger than `max_tokens` is still
+        returned on its own so it cannot block the queue.
+        """
         batch: List[LlmTask] = []
-        buffer: List[LlmTask] = []
+        used = 0
+        heads = self._heads(task_type, model)
+        while heads and len(batch) < batch_size:
+            entry, bucket = heads[0]
+            if max_tokens is not None:
+                tokens = entry[_TASK].token_estimate
+                if batch and used + tokens > max_tokens:
+                    break
+                used += tokens
+            batch.append(self._pop(bucket))
+            self._advance(heads, bucket)
+        return batch
 
-        while self._heap and len(batch) < batch_size:
-            candidate = heapq.heappop(self._heap)
-            if task_type and candidate.task_type != task_type:
-                buffer.append(candidate)
-                continue
-            batch.append(candidate)
+    def peek(self, task_type: Optional[TaskType] = None, model: Optional[str] = None) -> Optional[LlmTask]:
+        """The task `pop_next_batch` would return first, without removing it."""
+        heads = self._heads(task_type, model)
+        return heads[0][0][_TASK] if heads else None
 
-        for task in buffer:
-            heapq.heappush(self._heap, task)
+    def drain_model(
+        self,
+        model: str,
+        max_tokens: int,
+        max_tasks: Optional[int] = None,
+        task_type: Optional[TaskType] = None,
+    ) -> List[LlmTask]:
+        """Pop tasks for `model` in priority order until the next one would exceed `max_tokens`.
 
+        Stops at the first task that does not fit rather than skipping it, so
+        a large high-priority task is not overtaken by smaller ones. A head
+        task larger than `max_tokens` is returned on its own, as in
+        `pop_next_batch`, so it cannot block the model's backlog.
+        """
+        batch: List[LlmTask] = []
+        used = 0
+        heads = self._heads(task_type, model)
+        while heads and (max_tasks is None or len(batch) < max_tasks):
+            entry, bucket = heads[0]
+            tokens = entry[_TASK].token_estimate
+            if batch and used + tokens > max_tokens:
+                break
+            used += tokens
+            batch.append(self._pop(bucket))
+            self._advance(heads, bucket)
         return batch
 
     def group_for_batching(self, max_tokens: int) -> Dict[str, List[LlmTask]]:
-        grouped: Dict[str, List[LlmTask]] = defaultdict(list)
-        temp_heap = list(self._heap)
-        heapq.heapify(temp_heap)
+        """Preview, without popping, what `drain_model(model, max_tokens)` returns for each model."""
+        self._age(self._clock())
+        grouped: Dict[str, List[LlmTask]] = {}
+        for model in sorted({model for _, model in self._buckets}):
+            streams = [bucket.iter_ordered() for bucket in self._matching(None, model)]
+            used = 0
+            tasks: List[LlmTask] = []
+            for entry in heapq.merge(*streams):
+                task = entry[_TASK]
+                if tasks and used + task.token_estimate > max_tokens:
+                    break
+                used += task.token_estimate
+                tasks.append(task)
+            if tasks:
+                grouped[model] = tasks
+        return grouped
 
-        while temp_heap:
-            task = heapq.heappop(temp_heap)
-            key = task.target_model or (task.constraints.preferred_model or "unspecified")
-            current_tokens = sum(t.token_estimate for t in grouped[key])
-            if current_tokens + task.token_estimate <= max_tokens:
-                grouped[key].append(task)
+    def pending_tokens(self, task_type: Optional[TaskType] = None, model: Optional[str] = None) -> int:
+        return sum(bucket.tokens for bucket in self._matching(task_type, model))
 
-        return grouped
+    def pending_count(self, task_type: Optional[TaskType] = None, model: Optional[str] = None) -> int:
+        return sum(bucket.count for bucket in self._matching(task_type, model))
+
+    def token_totals(self) -> Dict[BucketKey, int]:
+        return {key: bucket.tokens for key, bucket in self._buckets.items() if bucket.count}
+
+    def estimated_completion(self, task: LlmTask, now: Optional[float] = None) -> float:
+        """Epoch seconds at which `task` would finish if started now, from its model's latency profile."""
+        started = self._clock() if now is None else now
+        profile = self.latency_profiles.get(model_key(task))
+        task_profile = profile.tasks.get(task.task_type.value) if profile else None
+        return started + (task_profile.latency_ms / 1000.0 if task_profile else 0.0)
+
+    def _matching(self, task_type: Optional[TaskType], model: Optional[str]) -> List[_Bucket]:
+        return [
+            bucket
+            for (bucket_type, bucket_model), bucket in self._buckets.items()
+            if bucket.count
+            and (task_type is None or bucket_type == task_type)
+            and (model is None or bucket_model == model)
+        ]
+
+    def _heads(self, task_type: Optional[TaskType], model: Optional[str]) -> List[tuple]:
+        now = self._clock()
+        self._age(now)
+        heads = []
+        for bucket in self._matching(task_type, model):
+            entry = self._schedulable_head(bucket, now)
+            if entry is not None:
+                heads.append((entry, bucket))
+        heapq.heapify(heads)
+        return heads
+
+    def _advance(self, heads: List[tuple], bucket: _Bucket) -> None:
+        entry = self._schedulable_head(bucket, self._clock())
+        if entry is None:
+            heapq.heappop(heads)
+        else:
+            heapq.heapreplace(heads, (entry, bucket))
+
+    def _schedulable_head(self, bucket: _Bucket, now: float) -> Optional[list]:
+        """Bucket head after applying the deadline policy to heads that can no longer make it."""
+        while True:
+            entry = bucket.head()
+            if entry is None or self.deadline_policy == "keep":
+                return entry
+            task = entry[_TASK]
+            if self.estimated_completion(task, now) <= _deadline_ts(task):
+                return entry
+            if self.deadline_policy == "drop":
+                self._pop(bucket)
+                self.dropped += 1
+            elif entry[_CLASS] > self.escalation_priority:
+                self._requeue(entry, self.escalation_priority, now)
+                self.escalated += 1
+            else:
+                return entry
+            if self.on_deadline_miss:
+                self.on_deadline_miss(task, self.deadline_policy)
+
+    def _track_arrival(self, entry: list) -> None:
+        # Classes at or above the floor are never promoted, so their arrivals are not kept.
+        if self.aging_s and entry[_CLASS] > self.aging_floor:
+            self._arrivals.setdefault(entry[_CLASS], deque()).append(entry)
+
+    def _age(self, now: float) -> None:
+        if not self.aging_s:
+            return
+        horizon = now - self.aging_s
+        for level in sorted(self._arrivals):
+            arrivals = self._arrivals[level]
+            while arrivals and (arrivals[0][_TASK] is None or arrivals[0][_ENTERED] <= horizon):
+                entry = arrivals.popleft()
+                if entry[_TASK] is not None and entry[_CLASS] == level:
+                    self._requeue(entry, level - 1, now)
+                    self.promoted += 1
+
+    def _requeue(self, entry: list, new_class: int, now: float) -> None:
+        bucket = self._buckets[entry[_BUCKET]]
+        task = entry[_TASK]
+        entry[_TASK] = None
+        moved = [new_class, entry[_DEADLINE], entry[_SEQUENCE], task, entry[_BUCKET], now]
+        heapq.heappush(bucket.heap, moved)
+        if task.task_id:
+            self._entries[task.task_id] = moved
+        self._track_arrival(moved)
+        bucket.compact()
+
+    def _pop(self, bucket: _Bucket) -> LlmTask:
+        task = bucket.pop()
+        self._size -= 1
+        if task.task_id:
+            del self._entries[task.task_id]
+        if not self._size:
+            # Only tombstones are left to age.
+            self._arrivals.clear()
+        return task
@@ -2,12 +2,21 @@
 
 from __future__ import annotations
 
+import re
+from collections import deque
 from dataclasses import dataclass
-from typing import Iterable, List, Optional
+from typing import Deque, Iterable, Iterator, List, Optional, Tuple
 
 from preprocessing.structure_detector import NormalizedSection  # type: ignore
 from context.token_estimator import estimate_tokens
 
+# A sentence runs up to terminal punctuation followed by whitespace, a line break or the end.
+_SENTENCE = re.compile(r"\S[^\n]*?(?:[.!?]+(?=\s|$)|(?=\n)|$)")
+_WORD = re.compile(r"\S+")
+
+# (start, end, tokens) with offsets relative to the text being chunked.
+Unit = Tuple[int, int, int]
+
 
 @dataclass
 class Chunk:
@@ -19,66 +28,138 @@ class Chunk:
 
 
 class Chunker:
-    """Splits documents into token-aware chunks."""
+    """Splits documents into token-aware chunks on sentence and paragraph boundaries.
 
-    def __init__(self, max_tokens: int = 512, overlap_tokens: int = 64) -> None:
+    Offsets of `chunk_text` refer to the given text. Offsets of
+    `chunk_sections` refer to `document_text(sections)`, the titles and
+    paragraphs joined by newlines, so `document[start:end] == chunk.text`.
+    """
+
+    def __init__(self, max_tokens: int = 512, overlap_tokens: int = 64, token_model: Optional[str] = None) -> None:
         self.max_tokens = max_tokens
-        self.overlap_tokens = overlap_tokens
+        self.overlap_tokens = min(overlap_tokens, max_tokens // 2)
+        self.token_model = token_model
 
     def chunk_text(self, text: str) -> List[Chunk]:
-        chunks: List[Chunk] = []
-        start = 0
-        length = len(text)
-
-        while start < length:
-            end = min(length, start + self.max_tokens * 4)
-            chunk_text = text[start:end]
-            token_estimate = estimate_tokens(chunk_text)
-            chunks.append(
-                Chunk(
-                    text=chunk_text,
-                    start_offset=start,
-                    end_offset=end,
-                    section_title=None,
-                    token_estimate=token_estimate,
-                )
-            )
-            start = end - self.overlap_tokens * 4
-        return chunks
+        return list(self.iter_text_chunks(text))
+
+    def iter_text_chunks(self, text: str, section_title: Optional[str] = None) -> Iterator[Chunk]:
+        yield from self._pack(text, 0, self._units(text), section_title)
 
     def chunk_sections(self, sections: Iterable[NormalizedSection]) -> List[Chunk]:
-        chunks: List[Chunk] = []
+        return list(self.iter_chunks(sections))
+
+    def iter_chunks(self, sections: Iterable[NormalizedSection]) -> Iterator[Chunk]:
+        """Yield chunks while sections are still being produced upstream."""
         offset = 0
         for section in sections:
-            buffer = []
-            for paragraph in section.paragraphs:
-                buffer.append(paragraph)
-                joined = "\n".join(buffer)
-                tokens = estimate_tokens(joined)
-                if tokens >= self.max_tokens:
-                    text = "\n".join(buffer)
-                    chunks.append(
-                        Chunk(
-                            text=text,
-                            start_offset=offset,
-                            end_offset=offset + len(text),
-                            section_title=section.title,
-                            token_estimate=estimate_tokens(text),
-                        )
-                    )
-                    offset += len(text)
-                    buffer = []
-            if buffer:
-                text = "\n".join(buffer)
-                chunks.append(
-                    Chunk(
-                        text=text,
-                        start_offset=offset,
-                        end_offset=offset + len(text),
-                        section_title=section.title,
-                        token_estimate=estimate_tokens(text),
-                    )
-                )
-                offset += len(text)
-
-        return chunks
+            if section.title:
+                offset += len(section.title) + 1
+            if not section.paragraphs:
+                continue
+            body = "\n".join(section.paragraphs)
+            yield from self._pack(body, offset, self._units(body), section.title)
+            offset += len(body) + 1
+
+    @staticmethod
+    def document_text(sections: Iterable[NormalizedSection]) -> str:
+        """The text `chunk_sections` offsets point into."""
+        fragments: List[str] = []
+        for section in sections:
+            if section.title:
+                fragments.append(section.title)
+            if section.paragraphs:
+                fragments.append("\n".join(section.paragraphs))
+        return "\n".join(fragments)
+
+    def _units(self, text: str) -> Iterator[Unit]:
+        for match in _SENTENCE.finditer(text):
+            tokens = estimate_tokens(match.group(0), self.token_model)
+            if tokens <= self.max_tokens:
+                yield (match.start(), match.end(), tokens)
+            else:
+                yield from self._split_oversized(text, match.start(), match.end())
+
+    def _split_oversized(self, text: str, start: int, end: int) -> Iterator[Unit]:
+        # Sentences longer than a chunk fall back to word boundaries, and single
+        # words longer than a chunk to fixed character slices.
+        piece_start: Optional[int] = None
+        piece_end = start
+        piece_tokens = 0
+        for word in _WORD.finditer(text, start, end):
+            tokens = estimate_tokens(word.group(0), self.token_model)
+            if tokens > self.max_tokens:
+                if piece_start is not None:
+                    yield (piece_start, piece_end, piece_tokens)
+                    piece_start, piece_tokens = None, 0
+                step = max(1, len(word.group(0)) * self.max_tokens // tokens)
+                for slice_start in range(word.start(), word.end(), step):
+                    slice_end = min(word.end(), slice_start + step)
+                    yield (slice_start, slice_end, estimate_tokens(text[slice_start:slice_end], self.token_model))
+                continue
+            if piece_start is not None:
+                joined = self._span_tokens(text, piece_start, word.end())
+                if joined > self.max_tokens:
+                    yield (piece_start, piece_end, piece_tokens)
+                    piece_start = None
+                else:
+                    tokens = joined
+            if piece_start is None:
+                piece_start = word.start()
+            piece_end = word.end()
+            piece_tokens = tokens
+        if piece_start is not None:
+            yield (piece_start, piece_end, piece_tokens)
+
+    def _span_tokens(self, text: str, start: int, end: int) -> int:
+        return estimate_tokens(text[start:end], self.token_model)
+
+    def _pack(self, text: str, base: int, units: Iterable[Unit], section_title: Optional[str]) -> Iterator[Chunk]:
+        # The budget is checked against the estimate of the joined window, so the
+        # whitespace between units and per-unit rounding count towards it.
+        window: Deque[Unit] = deque()
+        window_tokens = 0
+        for unit in units:
+            joined = self._span_tokens(text, window[0][0], unit[1]) if window else unit[2]
+            if window and joined > self.max_tokens:
+                yield self._make_chunk(text, base, window, window_tokens, section_title)
+                window = self._overlap(window, unit[2])
+                joined = self._span_tokens(text, window[0][0], unit[1]) if window else unit[2]
+                while window and joined > self.max_tokens:
+                    window.popleft()
+                    joined = self._span_tokens(text, window[0][0], unit[1]) if window else unit[2]
+            window.append(unit)
+            window_tokens = joined
+        if window:
+            yield self._make_chunk(text, base, window, window_tokens, section_title)
+
+    def _overlap(self, window: Deque[Unit], next_tokens: int) -> Deque[Unit]:
+        # Carry whole trailing sentences worth at most overlap_tokens, leaving
+        # room for the next unit and always dropping at least one unit.
+        carried: Deque[Unit] = deque()
+        carried_tokens = 0
+        budget = min(self.overlap_tokens, self.max_tokens - next_tokens)
+        for unit in reversed(window):
+            if len(carried) + 1 >= len(window) or carried_tokens + unit[2] > budget:
+                break
+            carried.appendleft(unit)
+            carried_tokens += unit[2]
+        return carried
+
+    @staticmethod
+    def _make_chunk(
+        text: str,
+        base: int,
+        window: Deque[Unit],
+        window_tokens: int,
+        section_title: Optional[str],
+    ) -> Chunk:
+        start = window[0][0]
+        end = window[-1][1]
+        return Chunk(
+            text=text[start:end],
+            start_offset=base + start,
+            end_offset=base + end,
+            section_title=section_title,
+            token_estimate=window_tokens,
+        )
@@ -2,13 +2,25 @@
 
 from __future__ import annotations
 
+import hashlib
+import os
+import re
 from dataclasses import dataclass
 from pathlib import Path
-from typing import Iterable, List
+from typing import Dict, List, Mapping, Optional, Tuple
 
+from batching.batch_planner import BatchPlan
 from context.section_selector import SelectionResult
+from models.openrouter_client import ChatMessage
 from router.task_types import TaskType
 
+_SLOT = re.compile(r"\{\{(\w+)\}\}")
+
+LAYOUTS = ("inline", "prefix")
+# Stands in for {{context}} in the static instructions of the "prefix" layout.
+CONTEXT_REFERENCE = "(provided in the next message)"
+_BODY_FORMAT = "body"
+
 
 @dataclass
 class PromptContext:
@@ -17,8 +29,69 @@ class PromptContext:
     model_format: str  # "chat" or "instruct"
 
 
+@dataclass
+class CompiledTemplate:
+    """Template split into literal text and named slots, wrapped for one model format.
+
+    `parts` alternates literal text (even indexes) and slot names (odd
+    indexes), so rendering is a single join.
+    """
+
+    parts: Tuple[str, ...]
+    sources: Tuple[Tuple[str, int], ...]  # (path, mtime_ns) the template was built from
+
+    @classmethod
+    def compile(
+        cls, body: str, sources: Tuple[Tuple[str, int], ...], prefix: str = "", suffix: str = ""
+    ) -> "CompiledTemplate":
+        # Only the task template carries slots; prefix and suffix stay literal.
+        parts = _SLOT.split(body)
+        parts[0] = prefix + parts[0]
+        parts[-1] = parts[-1] + suffix
+        return cls(parts=tuple(parts), sources=sources)
+
+    @property
+    def slots(self) -> Tuple[str, ...]:
+        return self.parts[1::2]
+
+    def render(self, values: Mapping[str, str]) -> str:
+        # Unknown slots are kept verbatim, as the previous replace-based renderer did.
+        return "".join(
+            part if index % 2 == 0 else values.get(part, "{{" + part + "}}")
+            for index, part in enumerate(self.parts)
+        )
+
+    def is_stale(self) -> bool:
+        return any(_mtime_ns(path) != mtime for path, mtime in self.sources)
+
+
+@dataclass
+class RenderedPrompt:
+    """Prompt as chat messages; the first `prefix_messages` are identical across tasks sharing `prefix_hash`."""
+
+    messages: List[ChatMessage]
+    prefix_messages: int
+    prefix_hash: str
+
+    def as_text(self, model_format: str) -> str:
+        system, *turns = self.messages
+        body = "\n\n".join(message.content for message in turns)
+        if model_format == "chat":
+            return f"{system.content}\n\nUser:\n{body}\n\nAssistant:"
+        return f"{system.content}\n\n{body}"
+
+
 class PromptRenderer:
-    """Renders prompts based on templates and selected sections."""
+    """Renders prompts based on templates and selected sections.
+
+    Templates are compiled once per (task type, model format) and recompiled
+    when the template or system prompt file changes on disk.
+
+    The "inline" layout places the context inside the task template. The
+    "prefix" layout keeps the system prompt, instructions and schema
+    reference in a stable prefix and moves the context to the end, so
+    providers and local servers with prompt caching can reuse the prefix.
+    """
 
     TEMPLATE_MAP = {
         TaskType.EXTRACTION: "prompts/task_extract_entities.txt",
@@ -26,25 +99,136 @@ class PromptRenderer:
         TaskType.RAG: "prompts/task_rag.txt",
     }
 
-    def __init__(self, system_prompt_path: str = "prompts/base_system_prompt.txt") -> None:
+    def __init__(
+        self,
+        system_prompt_path: str = "prompts/base_system_prompt.txt",
+        auto_reload: bool = True,
+        layout: str = "inline",
+    ) -> None:
+        if layout not in LAYOUTS:
+            raise ValueError(f"Unknown prompt layout {layout}")
+        self.layout = layout
+        self.system_prompt_path = system_prompt_path
+        self.auto_reload = auto_reload
         self.system_prompt = Path(system_prompt_path).read_text(encoding="utf-8")
+        self._system_prompt_mtime = _mtime_ns(system_prompt_path)
+        self._compiled: Dict[Tuple[TaskType, str], CompiledTemplate] = {}
 
     def render(self, task_type: TaskType, context: PromptContext) -> str:
+        return self._render_with(self._template_for(task_type, context.model_format), context)
+
+    def render_messages(self, task_type: TaskType, context: PromptContext) -> RenderedPrompt:
+        """Render as chat messages following the configured layout."""
+        if self.layout == "prefix":
+            return self._prefix_messages(self._template_for(task_type, context.model_format), context)
+        compiled = self.compiled_template(task_type, _BODY_FORMAT)
+        static = self._static_messages(compiled, context.schema_reference)
+        return RenderedPrompt(
+            messages=static + [ChatMessage(role="user", content=compiled.render(self._slot_values(context)))],
+            prefix_messages=len(static),
+            prefix_hash=_prefix_hash(static),
+        )
+
+    def prefix_hash(self, task_type: TaskType, schema_reference: str) -> str:
+        """Hash of the static prefix a task will be rendered with, for grouping tasks before rendering."""
+        compiled = self.compiled_template(task_type, _BODY_FORMAT)
+        return _prefix_hash(self._static_messages(compiled, schema_reference))
+
+    def render_many(self, plan: BatchPlan, contexts: Mapping[str, PromptContext]) -> List[str]:
+        """Render one prompt per task in `plan`, in task order; `contexts` is keyed by task id.
+
+        Templates are resolved (and checked for changes) once per batch rather
+        than once per task.
+        """
+        compiled: Dict[Tuple[TaskType, str], CompiledTemplate] = {}
+        prompts: List[str] = []
+        for task in plan.tasks:
+            context = contexts.get(task.task_id)
+            if context is None:
+                raise KeyError(f"No prompt context for task {task.task_id}")
+            key = (task.task_type, context.model_format)
+            template = compiled.get(key)
+            if template is None:
+                template = compiled[key] = self._template_for(*key)
+            prompts.append(self._render_with(template, context))
+        return prompts
+
+    def compiled_template(self, task_type: TaskType, model_format: str) -> CompiledTemplate:
+        if self.auto_reload:
+            self._reload_system_prompt()
+        key = (task_type, model_format)
+        compiled = self._compiled.get(key)
+        if compiled is not None and not (self.auto_reload and compiled.is_stale()):
+            return compiled
+
         template_path = self.TEMPLATE_MAP.get(task_type)
         if not template_path:
             raise ValueError(f"No template for task {task_type}")
+        # Read the mtime before the contents so a concurrent edit marks the result stale.
+        sources = ((template_path, _mtime_ns(template_path)), (self.system_prompt_path, self._system_prompt_mtime))
         template = Path(template_path).read_text(encoding="utf-8")
-        context_text = "\n\n".join(section.section.title or "untitled" + ":\n" + "\n".join(section.section.paragraphs) for section in context.sections)
+        prefix, suffix = self._wrapping(model_format)
+        compiled = self._compiled[key] = CompiledTemplate.compile(template, sources, prefix, suffix)
+        return compiled
+
+    def _template_for(self, task_type: TaskType, model_format: str) -> CompiledTemplate:
+        # The prefix layout always works from the bare template body.
+        return self.compiled_template(task_type, _BODY_FORMAT if self.layout == "prefix" else model_format)
+
+    def _render_with(self, compiled: CompiledTemplate, context: PromptContext) -> str:
+        if self.layout == "prefix":
+            return self._prefix_messages(compiled, context).as_text(context.model_format)
+        return compiled.render(self._slot_values(context))
+
+    def _prefix_messages(self, compiled: CompiledTemplate, context: PromptContext) -> RenderedPrompt:
+        static = self._static_messages(compiled, context.schema_reference)
+        context_text = self._slot_values(context)["context"]
+        return RenderedPrompt(
+            messages=static + [ChatMessage(role="user", content=context_text)],
+            prefix_messages=len(static),
+            prefix_hash=_prefix_hash(static),
+        )
+
+    def _static_messages(self, compiled: CompiledTemplate, schema_reference: str) -> List[ChatMessage]:
+        """Messages shared by every task with this template and schema reference under the current layout."""
+        system = ChatMessage(role="system", content=self.system_prompt)
+        if self.layout == "inline":
+            # The instructions are rendered around the context, so only the system prompt is shared.
+            return [system]
+        instructions = compiled.render({"context": CONTEXT_REFERENCE, "schema_reference": schema_reference}).strip()
+        return [system, ChatMessage(role="user", content=instructions)]
+
+    def _reload_system_prompt(self) -> None:
+        mtime = _mtime_ns(self.system_prompt_path)
+        if mtime != self._system_prompt_mtime:
+            self._system_prompt_mtime = mtime
+            self.system_prompt = Path(self.system_prompt_path).read_text(encoding="utf-8")
+            self._compiled.clear()
+
+    @staticmethod
+    def _slot_values(context: PromptContext) -> Dict[str, str]:
+        context_text = "\n\n".join(
+            f"{item.section.title or 'untitled'}:\n" + "\n".join(item.section.paragraphs) for item in context.sections
+        )
+        return {"context": context_text, "schema_reference": context.schema_reference}
+
+    def _wrapping(self, model_format: str) -> Tuple[str, str]:
+        if model_format == _BODY_FORMAT:
+            return "", ""
+        if model_format == "chat":
+            return f"{self.system_prompt}\n\nUser:\n", "\n\nAssistant:"
+        return f"{self.system_prompt}\n\n", ""
 
-        prompt_body = template.replace("{{context}}", context_text)
-        prompt_body = prompt_body.replace("{{schema_reference}}", context.schema_reference)
 
-        if context.model_format == "chat":
-            return self._render_chat(prompt_body)
-        return self._render_instruct(prompt_body)
+def _prefix_hash(messages: List[ChatMessage]) -> str:
+    digest = hashlib.sha256()
+    for message in messages:
+        digest.update(f"{message.role}\x00{message.content}\x00".encode("utf-8"))
+    return digest.hexdigest()[:16]
 
-    def _render_chat(self, prompt_body: str) -> str:
-        return f"{self.system_prompt}\n\nUser:\n{prompt_body}\n\nAssistant:"
 
-    def _render_instruct(self, prompt_body: str) -> str:
-        return f"{self.system_prompt}\n\n{prompt_body}"
+def _mtime_ns(path: str) -> Optional[int]:
+    try:
+        return os.stat(path).st_mtime_ns
+    except OSError:
+        return None
@@ -0,0 +1,165 @@
+"""In-process BM25 retrieval over document chunks for RAG context."""
+
+from __future__ import annotations
+
+import json
+import math
+import mmap
+import os
+import re
+import struct
+from collections import Counter
+from dataclasses import asdict
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from context.chunker import Chunk, Chunker
+from context.section_selector import SelectionResult
+from context.token_budget import Budget
+from preprocessing.structure_detector import NormalizedSection  # type: ignore
+
+_TERM = re.compile(r"\w+")
+_POSTING = struct.Struct("<II")  # chunk id, term frequency
+
+POSTINGS_FILE = "postings.bin"
+LEXICON_FILE = "lexicon.json"
+CHUNKS_FILE = "chunks.jsonl"
+
+
+def tokenize(text: str) -> List[str]:
+    return _TERM.findall(text.lower())
+
+
+class Bm25Index:
+    """Inverted index with BM25 scoring, incremental adds and mmap-backed persistence.
+
+    Postings loaded from disk stay in the memory-mapped file; chunks added
+    afterwards live in memory until the next `save`.
+    """
+
+    def __init__(self, chunker: Optional[Chunker] = None, k1: float = 1.5, b: float = 0.75) -> None:
+        self.chunker = chunker or Chunker()
+        self.k1 = k1
+        self.b = b
+        self.chunks: List[Chunk] = []
+        self.doc_ids: List[str] = []
+        self._lengths: List[int] = []
+        self._total_length = 0
+        self._postings: Dict[str, List[Tuple[int, int]]] = {}
+        self._disk_lexicon: Dict[str, Tuple[int, int]] = {}
+        self._disk_handle = None
+        self._disk_map: Optional[mmap.mmap] = None
+
+    def __len__(self) -> int:
+        return len(self.chunks)
+
+    def add_sections(self, sections: Iterable[NormalizedSection], doc_id: str = "") -> int:
+        return self.add_chunks(self.chunker.iter_chunks(sections), doc_id=doc_id)
+
+    def add_chunks(self, chunks: Iterable[Chunk], doc_id: str = "") -> int:
+        added = 0
+        for chunk in chunks:
+            chunk_id = len(self.chunks)
+            terms = Counter(tokenize(chunk.text))
+            self.chunks.append(chunk)
+            self.doc_ids.append(doc_id)
+            length = sum(terms.values())
+            self._lengths.append(length)
+            self._total_length += length
+            for term, frequency in terms.items():
+                self._postings.setdefault(term, []).append((chunk_id, frequency))
+            added += 1
+        return added
+
+    def search(self, query: str, top_k: Optional[int] = None) -> List[Tuple[float, int]]:
+        """Return (score, chunk id) pairs ordered by descending BM25 score."""
+        count = len(self.chunks)
+        if not count:
+            return []
+        average_length = self._total_length / count or 1.0
+        scores: Dict[int, float] = {}
+        for term in set(tokenize(query)):
+            postings = self._term_postings(term)
+            if not postings:
+                continue
+            idf = math.log(1 + (count - len(postings) + 0.5) / (len(postings) + 0.5))
+            for chunk_id, frequency in postings:
+                norm = self.k1 * (1 - self.b + self.b * self._lengths[chunk_id] / average_length)
+                scores[chunk_id] = scores.get(chunk_id, 0.0) + idf * frequency * (self.k1 + 1) / (frequency + norm)
+        ranked = sorted(((score, chunk_id) for chunk_id, score in scores.items()), key=lambda item: (-item[0], item[1]))
+        return ranked[:top_k] if top_k is not None else ranked
+
+    def select_for_query(self, query: str, budget: Budget, used_tokens: int = 0) -> List[SelectionResult]:
+        """Highest-scoring chunks that fit the remaining input budget, best first."""
+        remaining = budget.remaining_input(used_tokens)
+        selected: List[SelectionResult] = []
+        for score, chunk_id in self.search(query):
+            chunk = self.chunks[chunk_id]
+            if chunk.token_estimate > remaining:
+                continue
+            section = NormalizedSection(title=chunk.section_title, paragraphs=[chunk.text])
+            reason = f"Retrieved {chunk.section_title or 'untitled'} for query (bm25 {score:.2f})"
+            selected.append(SelectionResult(section=section, reason=reason, token_estimate=chunk.token_estimate))
+            remaining -= chunk.token_estimate
+            if remaining <= 0:
+                break
+        return selected
+
+    def save(self, directory: str) -> None:
+        # Files are written beside the targets and swapped in, so an index that
+        # is currently mapped from the same directory keeps reading valid data.
+        target = Path(directory)
+        target.mkdir(parents=True, exist_ok=True)
+        lexicon: Dict[str, List[int]] = {}
+        offset = 0
+        with (target / f"{POSTINGS_FILE}.tmp").open("wb") as handle:
+            for term in sorted(set(self._postings) | set(self._disk_lexicon)):
+                postings = self._term_postings(term)
+                handle.write(b"".join(_POSTING.pack(chunk_id, frequency) for chunk_id, frequency in postings))
+                lexicon[term] = [offset, len(postings)]
+                offset += len(postings)
+        (target / f"{LEXICON_FILE}.tmp").write_text(
+            json.dumps({"lengths": self._lengths, "terms": lexicon}, separators=(",", ":")),
+            encoding="utf-8",
+        )
+        with (target / f"{CHUNKS_FILE}.tmp").open("w", encoding="utf-8") as handle:
+            for doc_id, chunk in zip(self.doc_ids, self.chunks):
+                handle.write(json.dumps({"doc_id": doc_id, **asdict(chunk)}, ensure_ascii=False) + "\n")
+        for name in (POSTINGS_FILE, LEXICON_FILE, CHUNKS_FILE):
+            os.replace(target / f"{name}.tmp", target / name)
+
+    @classmethod
+    def load(cls, directory: str, chunker: Optional[Chunker] = None, k1: float = 1.5, b: float = 0.75) -> "Bm25Index":
+        source = Path(directory)
+        index = cls(chunker=chunker, k1=k1, b=b)
+        payload = json.loads((source / LEXICON_FILE).read_text(encoding="utf-8"))
+        index._lengths = list(payload["lengths"])
+        index._total_length = sum(index._lengths)
+        index._disk_lexicon = {term: (entry[0], entry[1]) for term, entry in payload["terms"].items()}
+        with (source / CHUNKS_FILE).open("r", encoding="utf-8") as handle:
+            for line in handle:
+                record = json.loads(line)
+                index.doc_ids.append(record.pop("doc_id", ""))
+                index.chunks.append(Chunk(**record))
+        index._disk_handle = (source / POSTINGS_FILE).open("rb")
+        if (source / POSTINGS_FILE).stat().st_size:
+            index._disk_map = mmap.mmap(index._disk_handle.fileno(), 0, access=mmap.ACCESS_READ)
+        return index
+
+    def close(self) -> None:
+        if self._disk_map is not None:
+            self._disk_map.close()
+            self._disk_map = None
+        if self._disk_handle is not None:
+            self._disk_handle.close()
+            self._disk_handle = None
+
+    def _term_postings(self, term: str) -> List[Tuple[int, int]]:
+        postings: List[Tuple[int, int]] = []
+        entry = self._disk_lexicon.get(term)
+        if entry and self._disk_map is not None:
+            start = entry[0] * _POSTING.size
+            end = start + entry[1] * _POSTING.size
+            postings.extend(_POSTING.iter_unpack(self._disk_map[start:end]))
+        postings.extend(self._postings.get(term, ()))
+        return postings
@@ -2,13 +2,31 @@
 
 from __future__ import annotations
 
-from dataclasses import dataclass
-from typing import Iterable, List
+import math
+from dataclasses import dataclass, field
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
 
+from context.chunker import Chunker
 from context.token_budget import Budget
 from context.token_estimator import estimate_tokens
 from router.task_types import TaskType
-from preprocessing.structure_detector import NormalizedSection  # type: ignore
+from preprocessing.structure_detector import FINANCE_TERMS, NormalizedSection  # type: ignore
+from preprocessing.term_scanner import TermScanner
+
+TITLE_KEYWORDS: Dict[TaskType, Tuple[str, ...]] = {
+    TaskType.EXTRACTION: ("financial", "results", "income", "balance", "revenue", "statement", "cash"),
+    TaskType.CLASSIFICATION: ("overview", "summary", "introduction", "about", "highlights"),
+    TaskType.SUMMARIZATION: ("summary", "overview", "highlights", "outlook", "conclusion", "discussion"),
+    TaskType.RAG: (),
+}
+
+# Relative weight of (term density, title match, position) per task.
+SCORE_WEIGHTS: Dict[TaskType, Tuple[float, float, float]] = {
+    TaskType.EXTRACTION: (1.0, 0.6, 0.1),
+    TaskType.CLASSIFICATION: (0.3, 0.6, 0.6),
+    TaskType.SUMMARIZATION: (0.2, 0.5, 0.8),
+    TaskType.RAG: (0.6, 0.2, 0.1),
+}
 
 
 @dataclass
@@ -18,34 +36,185 @@ class SelectionResult:
     token_estimate: int
 
 
+@dataclass
+class SelectionReport:
+    selected: List[SelectionResult]
+    skipped: List[SelectionResult] = field(default_factory=list)
+    available_tokens: int = 0
+    candidate_tokens: int = 0
+
+    @property
+    def selected_tokens(self) -> int:
+        return sum(item.token_estimate for item in self.selected)
+
+
+@dataclass
+class _Candidate:
+    section: NormalizedSection
+    tokens: int
+    relevance: float
+    part: Optional[str] = None
+
+
 class SectionSelector:
-    """Chooses document sections while respecting token constraints."""
+    """Chooses document sections while respecting token constraints.
+
+    The default "knapsack" strategy scores every section for the task and
+    picks the subset with the highest relevance-weighted token value
+    (relevance x tokens) that fits the budget. Sections scoring below
+    `min_relevance` are never selected, so leftover budget is not filled
+    with filler text. "sequential" keeps the original document-order fill.
+    """
 
-    def __init__(self, budget: Budget) -> None:
+    STRATEGIES = ("knapsack", "sequential")
+
+    def __init__(
+        self,
+        budget: Budget,
+        strategy: str = "knapsack",
+        split_oversized: bool = False,
+        chunk_tokens: int = 512,
+        terms: Optional[Iterable[str]] = None,
+        capacity_buckets: int = 2048,
+        min_relevance: float = 0.15,
+    ) -> None:
+        if strategy not in self.STRATEGIES:
+            raise ValueError(f"Unknown selection strategy {strategy}")
         self.budget = budget
+        self.strategy = strategy
+        self.split_oversized = split_oversized
+        self.chunker = Chunker(max_tokens=chunk_tokens, overlap_tokens=0)
+        self.term_scanner = TermScanner(terms or FINANCE_TERMS, record_offsets=False)
+        self.capacity_buckets = capacity_buckets
+        self.min_relevance = min_relevance
 
     def select(self, sections: Iterable[NormalizedSection], task_type: TaskType) -> List[SelectionResult]:
+        return self.select_with_report(sections, task_type).selected
+
+    def select_with_report(self, sections: Iterable[NormalizedSection], task_type: TaskType) -> SelectionReport:
         remaining = self.budget.remaining_input(0)
-        selected: List[SelectionResult] = []
+        section_list = list(sections)
+        candidates = self._candidates(section_list, task_type, remaining)
+        report = SelectionReport(
+            selected=[],
+            available_tokens=remaining,
+            candidate_tokens=sum(candidate.tokens for candidate in candidates),
+        )
+
+        if self.strategy == "sequential":
+            chosen = self._sequential(candidates, remaining)
+        else:
+            chosen = self._knapsack(candidates, remaining)
 
-        for section in sections:
+        chosen_ids = {id(candidate) for candidate in chosen}
+        for candidate in candidates:
+            if id(candidate) in chosen_ids:
+                reason = self._justify(candidate.section, task_type)
+                if candidate.part:
+                    reason += f" (part {candidate.part})"
+                if self.strategy == "knapsack":
+                    reason += f" (relevance {candidate.relevance:.2f})"
+                report.selected.append(
+                    SelectionResult(section=candidate.section, reason=reason, token_estimate=candidate.tokens)
+                )
+            elif self.strategy == "knapsack" and candidate.relevance < self.min_relevance:
+                reason = (
+                    f"Skipped {candidate.section.title or 'untitled'} due to low relevance "
+                    f"({candidate.relevance:.2f} < {self.min_relevance:.2f})"
+                )
+                report.skipped.append(SelectionResult(section=candidate.section, reason=reason, token_estimate=0))
+            else:
+                reason = f"Skipped {candidate.section.title or 'untitled'} due to token limit"
+                report.skipped.append(SelectionResult(section=candidate.section, reason=reason, token_estimate=0))
+        return report
+
+    def _candidates(self, sections: Sequence[NormalizedSection], task_type: TaskType, remaining: int) -> List[_Candidate]:
+        candidates: List[_Candidate] = []
+        total = max(1, len(sections))
+        for index, section in enumerate(sections):
             text = "\n".join(section.paragraphs)
             tokens = estimate_tokens(text)
             if tokens == 0:
                 continue
+            if tokens > remaining and self.split_oversized:
+                chunks = self.chunker.chunk_text(text)
+                for part, chunk in enumerate(chunks, start=1):
+                    piece = NormalizedSection(title=section.title, paragraphs=[chunk.text])
+                    candidates.append(
+                        _Candidate(
+                            section=piece,
+                            tokens=chunk.token_estimate,
+                            relevance=self._score(piece, chunk.text, index, total, task_type),
+                            part=f"{part}/{len(chunks)}",
+                        )
+                    )
+                continue
+            candidates.append(
+                _Candidate(
+                    section=section,
+                    tokens=tokens,
+                    relevance=self._score(section, text, index, total, task_type),
+                )
+            )
+        return candidates
+
+    def _score(self, section: NormalizedSection, text: str, index: int, total: int, task_type: TaskType) -> float:
+        density_weight, title_weight, position_weight = SCORE_WEIGHTS.get(task_type, (0.5, 0.5, 0.5))
+        # Saturate around 10 term hits per 1000 characters.
+        density = min(1.0, self.term_scanner.scan(text).density() / 10.0)
+        title = (section.title or "").lower()
+        keywords = TITLE_KEYWORDS.get(task_type, ())
+        title_match = 1.0 if title and any(keyword in title for keyword in keywords) else 0.0
+        position = 1.0 - index / total
+        return density_weight * density + title_weight * title_match + position_weight * position
 
-            if tokens > remaining:
-                reason = f"Skipped {section.title or 'untitled'} due to token limit"
-                selected.append(SelectionResult(section=section, reason=reason, token_estimate=0))
+    @staticmethod
+    def _sequential(candidates: List[_Candidate], remaining: int) -> List[_Candidate]:
+        chosen: List[_Candidate] = []
+        for candidate in candidates:
+            if candidate.tokens > remaining:
                 break
+            chosen.append(candidate)
+            remaining -= candidate.tokens
+        return chosen
 
-            justification = self._justify(section, task_type)
-            selected.append(
-                SelectionResult(section=section, reason=justification, token_estimate=tokens)
-            )
-            remaining -= tokens
+    def _knapsack(self, candidates: List[_Candidate], capacity: int) -> List[_Candidate]:
+        items = [
+            candidate
+            for candidate in candidates
+            if candidate.tokens <= capacity and candidate.relevance >= self.min_relevance
+        ]
+        if not items or capacity <= 0:
+            return []
+        if sum(item.tokens for item in items) <= capacity:
+            return items
+
+        # Token weights are scaled into a bounded number of capacity buckets and
+        # rounded up, so any chosen set still fits the real budget.
+        scale = max(1, math.ceil(capacity / self.capacity_buckets))
+        slots = capacity // scale
+        weights = [math.ceil(item.tokens / scale) for item in items]
+        # Value is relevance x tokens, so a relevant section outweighs filler of the same size.
+        values = [item.relevance * item.tokens for item in items]
+
+        best = [0.0] * (slots + 1)
+        keep = [bytearray(slots + 1) for _ in items]
+        for i, (weight, value) in enumerate(zip(weights, values)):
+            row = keep[i]
+            for slot in range(slots, weight - 1, -1):
+                candidate_value = best[slot - weight] + value
+                if candidate_value > best[slot]:
+                    best[slot] = candidate_value
+                    row[slot] = 1
 
-        return selected
+        chosen: List[_Candidate] = []
+        slot = slots
+        for i in range(len(items) - 1, -1, -1):
+            if keep[i][slot]:
+                chosen.append(items[i])
+                slot -= weights[i]
+        chosen.reverse()
+        return chosen
 
     def _justify(self, section: NormalizedSection, task_type: TaskType) -> str:
         title = section.title or "untitled"
@@ -55,4 +224,6 @@ class SectionSelector:
             return f"Included {title} to preserve narrative continuity"
         if task_type == TaskType.RAG:
             return f"Included {title} to ground retrieval-augmented responses"
-        return f"Included {title} based on sequential allocation"
+        if self.strategy == "sequential":
+            return f"Included {title} based on sequential allocation"
+        return f"Included {title} based on relevance-weighted allocation"
@@ -2,10 +2,15 @@
 
 from __future__ import annotations
 
-from dataclasses import dataclass
-from typing import Dict, Optional
+import itertools
+import threading
+import time
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Callable, Deque, Dict, List, Optional
 
 from context.token_estimator import TokenStats, estimate_tokens
+from models.openrouter_client import CompletionUsage
 
 
 @dataclass
@@ -23,11 +28,98 @@ class Budget:
         return max(0, limit - used_tokens)
 
 
+@dataclass
+class RateLimit:
+    """Provider limits for one model over a sliding window (None means unlimited)."""
+
+    tokens_per_minute: Optional[int] = None
+    requests_per_minute: Optional[int] = None
+    window_s: float = 60.0
+
+
+@dataclass
+class Reservation:
+    reservation_id: int
+    model_id: str
+    tokens: int
+    requests: int
+    # Shared with the ledger entry, so commits adjust the window in place.
+    _entry: List[float] = field(repr=False, default_factory=list)
+
+
+@dataclass
+class WindowUsage:
+    tokens: int
+    requests: int
+
+
+class _ModelLedger:
+    """Sliding-window entries of [timestamp, tokens, requests] with running totals."""
+
+    def __init__(self, limit: RateLimit) -> None:
+        self.limit = limit
+        self.entries: Deque[List[float]] = deque()
+        self.tokens = 0
+        self.requests = 0
+
+    def expire(self, now: float) -> None:
+        horizon = now - self.limit.window_s
+        while self.entries and self.entries[0][0] <= horizon:
+            _, tokens, requests = self.entries.popleft()
+            self.tokens -= tokens
+            self.requests -= requests
+
+    def wait_time(self, now: float, tokens: int, requests: int) -> float:
+        """Seconds until `tokens` and `requests` fit the window; 0.0 when they fit now."""
+        self.expire(now)
+        token_limit = self.limit.tokens_per_minute
+        request_limit = self.limit.requests_per_minute
+        over_tokens = self.tokens + tokens - token_limit if token_limit is not None else 0
+        over_requests = self.requests + requests - request_limit if request_limit is not None else 0
+        if over_tokens <= 0 and over_requests <= 0:
+            return 0.0
+        if (token_limit is not None and tokens > token_limit) or (
+            request_limit is not None and requests > request_limit
+        ):
+            return float("inf")
+        for timestamp, entry_tokens, entry_requests in self.entries:
+            over_tokens -= entry_tokens
+            over_requests -= entry_requests
+            if over_tokens <= 0 and over_requests <= 0:
+                return max(0.0, timestamp + self.limit.window_s - now)
+        return self.limit.window_s
+
+    def remove(self, entry: List[float]) -> None:
+        for index, candidate in enumerate(self.entries):
+            if candidate is entry:
+                del self.entries[index]
+                self.tokens -= entry[1]
+                self.requests -= entry[2]
+                return
+
+    def add(self, now: float, tokens: int, requests: int) -> List[float]:
+        entry = [now, tokens, requests]
+        self.entries.append(entry)
+        self.tokens += tokens
+        self.requests += requests
+        return entry
+
+
 class TokenBudgetManager:
-    """Manages budgets for multiple models and tasks."""
+    """Manages budgets for multiple models and tasks.
 
-    def __init__(self) -> None:
+    Besides the per-request `Budget`, each model can have a `RateLimit`. The
+    ledger counts reserved and committed tokens and requests in a sliding
+    window so callers can pace submissions instead of running into 429s.
+    All ledger operations are thread-safe.
+    """
+
+    def __init__(self, clock: Callable[[], float] = time.monotonic) -> None:
         self._budgets: Dict[str, Budget] = {}
+        self._clock = clock
+        self._ledgers: Dict[str, _ModelLedger] = {}
+        self._lock = threading.Lock()
+        self._ids = itertools.count(1)
 
     def register_budget(self, model_id: str, budget: Budget) -> None:
         self._budgets[model_id] = budget
@@ -35,11 +127,28 @@ class TokenBudgetManager:
     def get_budget(self, model_id: str) -> Optional[Budget]:
         return self._budgets.get(model_id)
 
-    def can_accommodate(self, model_id: str, prompt: str, expected_output_tokens: int) -> bool:
+    def register_rate_limit(self, model_id: str, limit: RateLimit) -> None:
+        with self._lock:
+            self._ledgers[model_id] = _ModelLedger(limit)
+
+    def get_rate_limit(self, model_id: str) -> Optional[RateLimit]:
+        ledger = self._ledgers.get(model_id)
+        return ledger.limit if ledger else None
+
+    def can_accommodate(
+        self,
+        model_id: str,
+        prompt: str,
+        expected_output_tokens: int,
+        input_tokens: Optional[int] = None,
+    ) -> bool:
+        """Per-request budget check; pass `input_tokens` when the prompt was already estimated."""
         budget = self.get_budget(model_id)
         if not budget:
             return False
-        stats = TokenStats(input_tokens=estimate_tokens(prompt), output_tokens=expected_output_tokens)
+        if input_tokens is None:
+            input_tokens = estimate_tokens(prompt, model_id)
+        stats = TokenStats(input_tokens=input_tokens, output_tokens=expected_output_tokens)
         return (
             stats.input_tokens <= budget.remaining_input(0)
             and stats.output_tokens <= budget.remaining_output(0)
@@ -54,5 +163,84 @@ class TokenBudgetManager:
             or stats.output_tokens > budget.remaining_output(0)
         ):
             return False
-        # In this heuristic version we do not persist usage per request.
+        with self._lock:
+            ledger = self._ledgers.get(model_id)
+            if ledger:
+                ledger.add(self._clock(), stats.total, 1)
         return True
+
+    def time_until_available(self, model_id: str, tokens: int, requests: int = 1) -> float:
+        """Seconds to wait before `tokens`/`requests` fit the model's window (inf if they never can)."""
+        with self._lock:
+            ledger = self._ledgers.get(model_id)
+            if not ledger:
+                return 0.0
+            return ledger.wait_time(self._clock(), tokens, requests)
+
+    def try_reserve(self, model_id: str, tokens: int, requests: int = 1) -> Optional[Reservation]:
+        """Reserve window capacity if it is available now, otherwise return None."""
+        with self._lock:
+            ledger = self._ledgers.get(model_id)
+            now = self._clock()
+            if ledger and ledger.wait_time(now, tokens, requests) > 0:
+                return None
+            entry = ledger.add(now, tokens, requests) if ledger else []
+            return Reservation(next(self._ids), model_id, tokens, requests, entry)
+
+    def reserve(
+        self,
+        model_id: str,
+        tokens: int,
+        requests: int = 1,
+        timeout_s: Optional[float] = None,
+        sleep: Callable[[float], None] = time.sleep,
+    ) -> Optional[Reservation]:
+        """Block until the reservation fits the window; None if `timeout_s` passes first or it never fits."""
+        deadline = None if timeout_s is None else self._clock() + timeout_s
+        while True:
+            reservation = self.try_reserve(model_id, tokens, requests)
+            if reservation is not None:
+                return reservation
+            wait = self.time_until_available(model_id, tokens, requests)
+            if wait == float("inf"):
+                return None
+            if deadline is not None:
+                remaining = deadline - self._clock()
+                if remaining <= 0:
+                    return None
+                wait = min(wait, remaining)
+            sleep(max(wait, 0.001))
+
+    def commit(self, reservation: Reservation, usage: Optional[CompletionUsage] = None) -> None:
+        """Replace the reserved token count with the actual usage reported by the provider."""
+        if usage is None or not reservation._entry:
+            return
+        actual = usage.total_tokens or usage.input_tokens + usage.output_tokens
+        with self._lock:
+            ledger = self._ledgers.get(reservation.model_id)
+            if ledger is None:
+                return
+            now = self._clock()
+            ledger.expire(now)
+            # Entries that already left the window no longer count towards the totals.
+            if reservation._entry[0] > now - ledger.limit.window_s:
+                ledger.tokens += actual - reservation._entry[1]
+            reservation._entry[1] = actual
+            reservation.tokens = actual
+
+    def release(self, reservation: Reservation) -> None:
+        """Return capacity for a reservation whose request was never sent."""
+        with self._lock:
+            ledger = self._ledgers.get(reservation.model_id)
+            if ledger is None or not reservation._entry:
+                return
+            ledger.expire(self._clock())
+            ledger.remove(reservation._entry)
+
+    def window_usage(self, model_id: str) -> WindowUsage:
+        with self._lock:
+            ledger = self._ledgers.get(model_id)
+            if not ledger:
+                return WindowUsage(tokens=0, requests=0)
+            ledger.expire(self._clock())
+            return WindowUsage(tokens=ledger.tokens, requests=ledger.requests)
@@ -1,25 +1,302 @@
-"""Heuristic token usage estimation for context planning."""
+"""Token usage estimation for context planning.
+
+Estimators are registered per model id. Without registration the original
+4-characters-per-token heuristic is used; local BPE vocabularies and
+heuristics calibrated from observed usage can replace it per model.
+"""
 
 from __future__ import annotations
 
+import base64
+import hashlib
+import logging
+import os
+import re
+import threading
+from collections import OrderedDict
 from dataclasses import dataclass
-from typing import Iterable, Optional
+from functools import lru_cache
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Protocol, Sequence, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Approximation of the cl100k pre-tokenizer using classes the stdlib re module supports.
+DEFAULT_SPLIT_PATTERN = (
+    r"(?i:'s|'t|'re|'ve|'m|'ll|'d)|[^\r\n\w]?[^\W\d_]+|\d{1,3}| ?[^\s\w]+[\r\n]*|\s*[\r\n]+|\s+(?!\S)|\s+"
+)
+_NUMERIC_CHARS = re.compile(r"[0-9!-/:-@\[-`{-~]")
+
+
+class TokenEstimator(Protocol):
+    name: str
+    cacheable: bool
+
+    def count(self, text: str) -> int:
+        ...
+
+
+class HeuristicEstimator:
+    """Assumes a fixed number of characters per token."""
+
+    cacheable = False
+
+    def __init__(self, chars_per_token: float = 4.0) -> None:
+        self.chars_per_token = chars_per_token
+        self.name = f"heuristic-{chars_per_token:g}"
+
+    def count(self, text: str) -> int:
+        return max(1, int(len(text.strip()) // self.chars_per_token))
+
+
+class CalibratedHeuristicEstimator:
+    """Linear character-class model fitted from observed prompt token counts.
+
+    Prose, numeric/punctuation and non-ASCII characters each get their own
+    tokens-per-character weight, which captures why financial tables and
+    non-English text tokenize denser than plain English. The fit shrinks
+    towards the prior weights with a strength of `ridge` times an average
+    sample, so a class that never occurs in the samples (e.g. non-ASCII
+    text in English traffic) keeps its prior weight.
+    """
+
+    cacheable = False
+    PRIOR_WEIGHTS: Tuple[float, float, float] = (0.25, 0.25, 0.25)
+
+    def __init__(self, name: str = "calibrated", min_samples: int = 20, ridge: float = 1e-3) -> None:
+        self.name = name
+        self.min_samples = min_samples
+        self.ridge = ridge
+        self.weights: Tuple[float, float, float] = self.PRIOR_WEIGHTS
+        self.samples = 0
+        self._xtx = [[0.0] * 3 for _ in range(3)]
+        self._xty = [0.0] * 3
+
+    def count(self, text: str) -> int:
+        features = self._features(text)
+        return max(1, int(round(sum(w * x for w, x in zip(self.weights, features)))))
+
+    def observe(self, text: str, actual_tokens: int) -> None:
+        if actual_tokens <= 0 or not text.strip():
+            return
+        features = self._features(text)
+        for i in range(3):
+            self._xty[i] += features[i] * actual_tokens
+            for j in range(3):
+                self._xtx[i][j] += features[i] * features[j]
+        self.samples += 1
+
+    @property
+    def fitted(self) -> bool:
+        return self.samples >= self.min_samples
+
+    def fit(self) -> Tuple[float, float, float]:
+        if not self.samples:
+            return self.weights
+        # Same absolute penalty for every class, relative to the size of an average sample.
+        penalty = self.ridge * (sum(self._xtx[i][i] for i in range(3)) / self.samples or 1.0)
+        matrix = [
+            [self._xtx[i][j] + (penalty if i == j else 0.0) for j in range(3)]
+            + [self._xty[i] + penalty * self.PRIOR_WEIGHTS[i]]
+            for i in range(3)
+        ]
+        solution = _solve_linear_system(matrix)
+        if solution and all(weight > 0 for weight in solution):
+            self.weights = (solution[0], solution[1], solution[2])
+        else:
+            logger.debug("Calibration for %s produced unusable weights; keeping %s", self.name, self.weights)
+        return self.weights
+
+    @staticmethod
+    def _features(text: str) -> Tuple[int, int, int]:
+        stripped = text.strip()
+        length = len(stripped)
+        non_ascii = length - len(stripped.encode("ascii", "ignore"))
+        numeric = _NUMERIC_CHARS.subn("", stripped)[1]
+        return (length - non_ascii - numeric, numeric, non_ascii)
+
+
+class BpeEstimator:
+    """Counts tokens with a byte-level BPE vocabulary loaded from a local rank file.
+
+    The file uses the tiktoken layout: one base64-encoded token and its merge
+    rank per line.
+    """
+
+    cacheable = True
+
+    def __init__(self, name: str, ranks: Dict[bytes, int], split_pattern: str = DEFAULT_SPLIT_PATTERN) -> None:
+        self.name = name
+        self.ranks = ranks
+        self.splitter = re.compile(split_pattern)
+        self._piece_tokens = lru_cache(maxsize=65536)(self._count_piece)
 
+    @classmethod
+    def from_file(cls, path: str, name: Optional[str] = None, split_pattern: str = DEFAULT_SPLIT_PATTERN) -> "BpeEstimator":
+        ranks: Dict[bytes, int] = {}
+        with open(path, "rb") as handle:
+            for line in handle:
+                parts = line.split()
+                if len(parts) != 2:
+                    continue
+                ranks[base64.b64decode(parts[0])] = int(parts[1])
+        return cls(name or Path(path).stem, ranks, split_pattern)
 
-def estimate_tokens(text: str) -> int:
-    """Estimate tokens assuming 4 characters per token."""
-    cleaned = text.strip()
-    if not cleaned:
+    def count(self, text: str) -> int:
+        return sum(self._piece_tokens(piece) for piece in self.splitter.findall(text))
+
+    def _count_piece(self, piece: str) -> int:
+        encoded = piece.encode("utf-8")
+        if encoded in self.ranks:
+            return 1
+        parts = [encoded[i : i + 1] for i in range(len(encoded))]
+        while len(parts) > 1:
+            best_rank = None
+            best_index = -1
+            for index in range(len(parts) - 1):
+                rank = self.ranks.get(parts[index] + parts[index + 1])
+                if rank is not None and (best_rank is None or rank < best_rank):
+                    best_rank = rank
+                    best_index = index
+            if best_rank is None:
+                break
+            parts[best_index : best_index + 2] = [parts[best_index] + parts[best_index + 1]]
+        return len(parts)
+
+
+class _CountCache:
+    """Thread-safe LRU of token counts keyed by estimator and text digest."""
+
+    def __init__(self, maxsize: int = 32768) -> None:
+        self.maxsize = maxsize
+        self._entries: "OrderedDict[Tuple[str, bytes], int]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get_or_count(self, estimator: TokenEstimator, text: str) -> int:
+        key = (estimator.name, hashlib.blake2b(text.encode("utf-8"), digest_size=16).digest())
+        with self._lock:
+            cached = self._entries.get(key)
+            if cached is not None:
+                self._entries.move_to_end(key)
+                return cached
+        tokens = estimator.count(text)
+        with self._lock:
+            self._entries[key] = tokens
+            if len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+        return tokens
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+
+_DEFAULT_ESTIMATOR: TokenEstimator = HeuristicEstimator()
+_ESTIMATORS: Dict[str, TokenEstimator] = {}
+_CALIBRATORS: Dict[str, CalibratedHeuristicEstimator] = {}
+_CALIBRATION_LOCK = threading.Lock()
+_CACHE = _CountCache()
+_VOCAB_DIR_LOADED = False
+
+
+def register_estimator(model_id: str, estimator: TokenEstimator) -> None:
+    """Use `estimator` for every estimate requested for `model_id`."""
+    _ESTIMATORS[model_id] = estimator
+
+
+def get_estimator(model_id: Optional[str] = None) -> TokenEstimator:
+    _load_env_vocab_dir()
+    if model_id is None:
+        return _DEFAULT_ESTIMATOR
+    return _ESTIMATORS.get(model_id, _DEFAULT_ESTIMATOR)
+
+
+def load_vocab_dir(path: str) -> List[str]:
+    """Register a BPE estimator for every `<provider>__<model>.tiktoken` file in `path`."""
+    registered: List[str] = []
+    for vocab_path in sorted(Path(path).glob("*.tiktoken")):
+        model_id = vocab_path.stem.replace("__", "/")
+        register_estimator(model_id, BpeEstimator.from_file(str(vocab_path), name=model_id))
+        registered.append(model_id)
+    return registered
+
+
+def observe_usage(model_id: str, prompt: str, input_tokens: int) -> None:
+    """Feed an observed prompt token count (e.g. CompletionUsage.input_tokens) into calibration.
+
+    Models without a BPE vocabulary switch to their calibrated heuristic once
+    it has seen enough samples. Safe to call from several threads; the
+    OpenRouter clients call it for every completion they receive.
+    """
+    with _CALIBRATION_LOCK:
+        calibrator = _CALIBRATORS.get(model_id)
+        if calibrator is None:
+            calibrator = _CALIBRATORS[model_id] = CalibratedHeuristicEstimator(name=f"calibrated:{model_id}")
+        calibrator.observe(prompt, input_tokens)
+        if calibrator.fitted and calibrator.samples % calibrator.min_samples == 0:
+            calibrator.fit()
+            if not isinstance(_ESTIMATORS.get(model_id), BpeEstimator):
+                register_estimator(model_id, calibrator)
+
+
+def estimate_tokens(text: str, model_id: Optional[str] = None) -> int:
+    """Estimate tokens with the estimator registered for `model_id` (4 chars/token by default)."""
+    if not text.strip():
         return 0
-    return max(1, len(cleaned) // 4)
+    estimator = get_estimator(model_id)
+    if estimator.cacheable:
+        return _CACHE.get_or_count(estimator, text)
+    return estimator.count(text)
 
 
-def estimate_tokens_for_fragments(fragments: Iterable[str]) -> int:
-    """Aggregate token estimates for multiple fragments."""
-    total = 0
+def estimate_tokens_batch(fragments: Sequence[str], model_id: Optional[str] = None) -> List[int]:
+    """Per-fragment estimates; repeated fragments are only counted once."""
+    estimator = get_estimator(model_id)
+    seen: Dict[str, int] = {}
+    counts: List[int] = []
     for fragment in fragments:
-        total += estimate_tokens(fragment)
-    return total
+        tokens = seen.get(fragment)
+        if tokens is None:
+            if not fragment.strip():
+                tokens = 0
+            elif estimator.cacheable:
+                tokens = _CACHE.get_or_count(estimator, fragment)
+            else:
+                tokens = estimator.count(fragment)
+            seen[fragment] = tokens
+        counts.append(tokens)
+    return counts
+
+
+def estimate_tokens_for_fragments(fragments: Iterable[str], model_id: Optional[str] = None) -> int:
+    """Aggregate token estimates for multiple fragments."""
+    return sum(estimate_tokens_batch(list(fragments), model_id))
+
+
+def _load_env_vocab_dir() -> None:
+    global _VOCAB_DIR_LOADED
+    if _VOCAB_DIR_LOADED:
+        return
+    _VOCAB_DIR_LOADED = True
+    vocab_dir = (os.getenv("TOKENIZER_VOCAB_DIR") or "").strip()
+    if vocab_dir and os.path.isdir(vocab_dir):
+        logger.info("Loaded tokenizer vocabularies for %s", ", ".join(load_vocab_dir(vocab_dir)) or "no models")
+
+
+def _solve_linear_system(matrix: List[List[float]]) -> Optional[List[float]]:
+    size = len(matrix)
+    for col in range(size):
+        pivot = max(range(col, size), key=lambda row: abs(matrix[row][col]))
+        if abs(matrix[pivot][col]) < 1e-12:
+            return None
+        matrix[col], matrix[pivot] = matrix[pivot], matrix[col]
+        for row in range(size):
+            if row == col:
+                continue
+            factor = matrix[row][col] / matrix[col][col]
+            for k in range(col, size + 1):
+                matrix[row][k] -= factor * matrix[col][k]
+    return [matrix[i][size] / matrix[i][i] for i in range(size)]
 
 
 @dataclass
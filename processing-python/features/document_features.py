@@ -2,7 +2,7 @@
 
 from __future__ import annotations
 
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 from typing import Dict, Iterable
 
 from preprocessing.cleaner import NormalizedSection
@@ -16,6 +16,8 @@ class DocumentFeatures:
     token_estimate: int
     sections: int
     financial_terms: bool
+    term_density: float = 0.0
+    term_counts: Dict[str, int] = field(default_factory=dict)
 
     def as_dict(self) -> Dict[str, object]:
         return {
@@ -24,20 +26,24 @@ class DocumentFeatures:
             "token_estimate": self.token_estimate,
             "sections": self.sections,
             "financial_terms": self.financial_terms,
+            "term_density": self.term_density,
+            "term_counts": dict(self.term_counts),
         }
 
 class FeatureExtractor:
     """Calculates document features from normalized sections."""
 
-    def __init__(self) -> None:
-        self.detector = StructureDetector()
+    def __init__(self, token_model: str | None = None) -> None:
+        self.detector = StructureDetector(token_model=token_model)
 
     def extract(self, sections: Iterable[NormalizedSection]) -> DocumentFeatures:
-        signals: StructureSignals = self.detector.analyze(list(sections))
+        signals: StructureSignals = self.detector.analyze(sections)
         return DocumentFeatures(
             language=signals.language,
             character_count=signals.character_count,
             token_estimate=signals.token_estimate,
             sections=signals.sections,
             financial_terms=signals.financial_terms,
+            term_density=signals.term_density,
+            term_counts=signals.term_counts,
         )
\ No newline at end of file
@@ -0,0 +1,130 @@
+"""Asyncio OpenRouter client for keeping many completions in flight."""
+
+from __future__ import annotations
+
+import asyncio
+import json
+from typing import Any, Dict, Iterable, List, Mapping, Optional, Sequence, Union
+
+from models.completion_cache import CompletionCache
+from models.http_transport import AsyncHttpTransport
+from models.openrouter_client import ChatMessage, CompletionResult, OpenRouterError, _OpenRouterBase
+
+
+class AsyncOpenRouterClient(_OpenRouterBase):
+    """Coroutine-based OpenRouter client with bounded concurrency.
+
+    At most `max_concurrency` requests are in flight overall and at most
+    `per_model_concurrency[model]` (or `default_model_concurrency`) per model,
+    so one slow model cannot hold every slot. Results are the same
+    `CompletionResult` objects the blocking client returns.
+    """
+
+    def __init__(
+        self,
+        api_key: Optional[str] = None,
+        base_url: Optional[str] = None,
+        timeout_s: float = 60.0,
+        app_url: Optional[str] = None,
+        app_name: Optional[str] = None,
+        max_concurrency: int = 32,
+        default_model_concurrency: int = 8,
+        per_model_concurrency: Optional[Mapping[str, int]] = None,
+        gzip_requests: bool = False,
+        transport: Optional[AsyncHttpTransport] = None,
+        cache: Optional[CompletionCache] = None,
+        cache_nondeterministic: bool = False,
+    ) -> None:
+        super().__init__(api_key, base_url, timeout_s, app_url, app_name, cache, cache_nondeterministic)
+        self.transport = transport or AsyncHttpTransport(
+            self.base_url, pool_size=max_concurrency, gzip_requests=gzip_requests
+        )
+        self.max_concurrency = max_concurrency
+        self.default_model_concurrency = default_model_concurrency
+        self.per_model_concurrency = dict(per_model_concurrency or {})
+        self._global_slots: Optional[asyncio.Semaphore] = None
+        self._model_slots: Dict[str, asyncio.Semaphore] = {}
+
+    async def chat_completion(
+        self,
+        *,
+        model: str,
+        messages: Sequence[Union[ChatMessage, Mapping[str, Any]]],
+        temperature: float = 0.0,
+        max_output_tokens: Optional[int] = None,
+        response_format: Optional[Mapping[str, Any]] = None,
+        metadata: Optional[Mapping[str, Any]] = None,
+        timeout_s: Optional[float] = None,
+        bypass_cache: bool = False,
+        **extra_settings: Any,
+    ) -> CompletionResult:
+        """Time spent waiting for a concurrency slot counts towards `timeout_s`."""
+        payload = self._build_payload(
+            model, messages, temperature, max_output_tokens, response_format, metadata, extra_settings
+        )
+        key = self._cache_key(payload)
+        cached = self._cached_completion(key, model, bypass_cache)
+        if cached is not None:
+            return cached
+        timeout = self.timeout_s if timeout_s is None else timeout_s
+        try:
+            response = await asyncio.wait_for(self._post_limited(model, "/chat/completions", payload), timeout)
+        except asyncio.TimeoutError as exc:
+            raise OpenRouterError(f"OpenRouter request for {model} timed out after {timeout:g}s") from exc
+        result = self._parse_completion(response, model)
+        self._observe_usage(payload, result)
+        self._store_completion(key, model, response)
+        return result
+
+    async def gather_completions(
+        self,
+        requests: Iterable[Mapping[str, Any]],
+        return_exceptions: bool = True,
+    ) -> List[Union[CompletionResult, BaseException]]:
+        """Run `chat_completion(**request)` for every request concurrently, results in request order.
+
+        With `return_exceptions=False` the first failure cancels the requests
+        still in flight and is raised.
+        """
+        tasks = [asyncio.ensure_future(self.chat_completion(**request)) for request in requests]
+        try:
+            return await asyncio.gather(*tasks, return_exceptions=return_exceptions)
+        except BaseException:
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+            raise
+
+    async def close(self) -> None:
+        await self.transport.close()
+
+    async def __aenter__(self) -> "AsyncOpenRouterClient":
+        return self
+
+    async def __aexit__(self, *exc_info: object) -> None:
+        await self.close()
+
+    async def _post_limited(self, model: str, path: str, payload: Mapping[str, Any]) -> Dict[str, Any]:
+        # Model slot first: waiting on a busy model must not hold a global slot.
+        async with self._model_semaphore(model), self._global_semaphore():
+            return await self._post(path, payload)
+
+    async def _post(self, path: str, payload: Mapping[str, Any]) -> Dict[str, Any]:
+        data = json.dumps(payload).encode("utf-8")
+        try:
+            response = await self.transport.request("POST", path, body=data, headers=self._headers)
+        except (OSError, asyncio.IncompleteReadError, ValueError) as exc:  # pragma: no cover - network errors only at runtime
+            raise OpenRouterError(f"Unable to reach OpenRouter: {exc}") from exc
+        return self._decode_response(response)
+
+    def _global_semaphore(self) -> asyncio.Semaphore:
+        if self._global_slots is None:
+            self._global_slots = asyncio.Semaphore(self.max_concurrency)
+        return self._global_slots
+
+    def _model_semaphore(self, model: str) -> asyncio.Semaphore:
+        semaphore = self._model_slots.get(model)
+        if semaphore is None:
+            limit = self.per_model_concurrency.get(model, self.default_model_concurrency)
+            semaphore = self._model_slots[model] = asyncio.Semaphore(limit)
+        return semaphore
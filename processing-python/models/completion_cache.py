@@ -0,0 +1,178 @@
+"""SQLite-backed cache for deterministic chat completions."""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import logging
+import sqlite3
+import threading
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Callable, Dict, Mapping, Optional
+
+logger = logging.getLogger(__name__)
+
+CACHE_FORMAT_VERSION = 1
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS completions (
+    key TEXT PRIMARY KEY,
+    model TEXT NOT NULL,
+    created_at REAL NOT NULL,
+    accessed_at REAL NOT NULL,
+    size INTEGER NOT NULL,
+    payload BLOB NOT NULL
+);
+CREATE INDEX IF NOT EXISTS completions_accessed ON completions (accessed_at);
+"""
+
+
+@dataclass
+class CacheStats:
+    hits: int
+    misses: int
+    expired: int
+    evictions: int
+    entries: int
+    total_bytes: int
+
+    @property
+    def hit_rate(self) -> float:
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.0
+
+
+def completion_cache_key(
+    model: str,
+    messages: Any,
+    temperature: float,
+    max_tokens: Optional[int],
+    response_format: Optional[Mapping[str, Any]],
+    extra_settings: Optional[Mapping[str, Any]] = None,
+) -> str:
+    """SHA-256 over the request fields that determine the completion."""
+    payload = json.dumps(
+        [CACHE_FORMAT_VERSION, model, messages, temperature, max_tokens, response_format, extra_settings or {}],
+        sort_keys=True,
+        separators=(",", ":"),
+        ensure_ascii=False,
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class CompletionCache:
+    """Stores raw completion responses by request key with TTL and LRU size eviction.
+
+    Safe to share across threads; several processes may share one database
+    file (SQLite WAL mode). Expired entries are dropped when looked up and
+    by `purge_expired`.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        ttl_s: Optional[float] = 7 * 24 * 3600,
+        max_bytes: int = 256 * 1024 * 1024,
+        clock: Callable[[], float] = time.time,
+    ) -> None:
+        self.path = path
+        self.ttl_s = ttl_s
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.expired = 0
+        self.evictions = 0
+        self._clock = clock
+        self._lock = threading.Lock()
+        if path != ":memory:":
+            Path(path).parent.mkdir(parents=True, exist_ok=True)
+        self._db = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.executescript(_SCHEMA)
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        now = self._clock()
+        with self._lock:
+            row = self._db.execute("SELECT created_at, payload FROM completions WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+            created_at, payload = row
+            if self.ttl_s is not None and now - created_at > self.ttl_s:
+                self._db.execute("DELETE FROM completions WHERE key = ?", (key,))
+                self.expired += 1
+                self.misses += 1
+                return None
+            self._db.execute("UPDATE completions SET accessed_at = ? WHERE key = ?", (now, key))
+            self.hits += 1
+        try:
+            return json.loads(payload)
+        except json.JSONDecodeError:  # pragma: no cover - corrupted entry
+            logger.warning("Dropping unreadable completion cache entry %s", key)
+            self.delete(key)
+            return None
+
+    def put(self, key: str, model: str, response: Mapping[str, Any]) -> None:
+        payload = json.dumps(response, separators=(",", ":"), ensure_ascii=False).encode("utf-8")
+        if len(payload) > self.max_bytes:
+            return
+        now = self._clock()
+        with self._lock:
+            self._db.execute(
+                "INSERT OR REPLACE INTO completions (key, model, created_at, accessed_at, size, payload) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (key, model, now, now, len(payload), payload),
+            )
+            self._evict()
+
+    def delete(self, key: str) -> None:
+        with self._lock:
+            self._db.execute("DELETE FROM completions WHERE key = ?", (key,))
+
+    def purge_expired(self) -> int:
+        if self.ttl_s is None:
+            return 0
+        with self._lock:
+            cursor = self._db.execute("DELETE FROM completions WHERE created_at < ?", (self._clock() - self.ttl_s,))
+            self.expired += cursor.rowcount
+            return cursor.rowcount
+
+    def total_bytes(self) -> int:
+        with self._lock:
+            return self._total_bytes()
+
+    def stats(self) -> CacheStats:
+        with self._lock:
+            entries = self._db.execute("SELECT COUNT(*) FROM completions").fetchone()[0]
+            return CacheStats(
+                hits=self.hits,
+                misses=self.misses,
+                expired=self.expired,
+                evictions=self.evictions,
+                entries=entries,
+                total_bytes=self._total_bytes(),
+            )
+
+    def close(self) -> None:
+        with self._lock:
+            self._db.close()
+
+    def _total_bytes(self) -> int:
+        return self._db.execute("SELECT COALESCE(SUM(size), 0) FROM completions").fetchone()[0]
+
+    def _evict(self) -> None:
+        excess = self._total_bytes() - self.max_bytes
+        if excess <= 0:
+            return
+        freed = 0
+        doomed = []
+        for key, size in self._db.execute("SELECT key, size FROM completions ORDER BY accessed_at ASC"):
+            doomed.append((key,))
+            freed += size
+            if freed >= excess:
+                break
+        self._db.executemany("DELETE FROM completions WHERE key = ?", doomed)
+        self.evictions += len(doomed)
@@ -2,16 +2,27 @@
 
 from __future__ import annotations
 
+import atexit
 import base64
+import http.client
 import json
 import logging
 import os
+import queue
+import random
+import threading
+import time
 from dataclasses import dataclass
-from typing import Any, Mapping, Optional
-from urllib import error, request
+from pathlib import Path
+from typing import Any, Dict, List, Mapping, Optional, Tuple
+
+from models.http_transport import PooledHttpTransport
 
 logger = logging.getLogger(__name__)
 
+# Item statuses worth retrying in a _bulk response; anything else (e.g. mapping errors) is dropped.
+_RETRYABLE_STATUSES = {429, 502, 503, 504}
+
 
 class ElasticsearchError(RuntimeError):
     """Raised when Elasticsearch interactions fail."""
@@ -26,10 +37,19 @@ class ElasticsearchConfig:
     timeout_s: float = 10.0
 
 
+@dataclass
+class BulkResult:
+    indexed: int
+    # NDJSON action/document line pairs that failed with a retryable status.
+    retryable: List[Tuple[bytes, bytes]]
+    rejected: int
+
+
 class ElasticsearchClient:
     def __init__(self, config: ElasticsearchConfig) -> None:
         self.base_url = config.base_url.rstrip("/")
         self.timeout_s = config.timeout_s
+        self.transport = PooledHttpTransport(self.base_url, pool_size=2, timeout_s=self.timeout_s)
         self._headers = {"Content-Type": "application/json"}
         if config.api_key:
             self._headers["Authorization"] = f"ApiKey {config.api_key}"
@@ -39,22 +59,250 @@ class ElasticsearchClient:
             self._headers["Authorization"] = f"Basic {token}"
 
     def index_document(self, index: str, document: Mapping[str, Any]) -> dict:
-        path = f"/{index}/_doc"
-        url = f"{self.base_url}{path}"
         data = json.dumps(document, ensure_ascii=False).encode("utf-8")
-        req = request.Request(url, data=data, headers=self._headers, method="POST")
+        return self._request(f"/{index}/_doc", data, self._headers)
+
+    def bulk(self, lines: List[Tuple[bytes, bytes]]) -> BulkResult:
+        """Send action/document NDJSON line pairs to the `_bulk` endpoint."""
+        body = b"".join(action + b"\n" + document + b"\n" for action, document in lines)
+        headers = dict(self._headers, **{"Content-Type": "application/x-ndjson"})
+        payload = self._request("/_bulk", body, headers)
+        if not payload.get("errors"):
+            return BulkResult(indexed=len(lines), retryable=[], rejected=0)
+        indexed = 0
+        rejected = 0
+        retryable: List[Tuple[bytes, bytes]] = []
+        for line, item in zip(lines, payload.get("items", [])):
+            outcome = next(iter(item.values()), {})
+            status = int(outcome.get("status", 500))
+            if status < 300:
+                indexed += 1
+            elif status in _RETRYABLE_STATUSES:
+                retryable.append(line)
+            else:
+                rejected += 1
+                logger.warning("Elasticsearch rejected document: %s", outcome.get("error"))
+        return BulkResult(indexed=indexed, retryable=retryable, rejected=rejected)
+
+    def close(self) -> None:
+        self.transport.close()
+
+    def _request(self, path: str, data: bytes, headers: Mapping[str, str]) -> dict:
         try:
-            with request.urlopen(req, timeout=self.timeout_s) as response:
-                body = response.read().decode("utf-8") or "{}"
-                payload = json.loads(body)
-                if getattr(response, "status", 200) >= 400:
-                    raise ElasticsearchError(f"Elasticsearch rejected document: {payload}")
-                return payload
-        except error.HTTPError as exc:
-            detail = exc.read().decode("utf-8", errors="replace")
-            raise ElasticsearchError(f"Elasticsearch HTTP error {exc.code}: {detail}") from exc
-        except error.URLError as exc:  # pragma: no cover - network specific failures
-            raise ElasticsearchError(f"Elasticsearch unreachable: {exc.reason}") from exc
+            response = self.transport.request("POST", path, body=data, headers=headers)
+        except (OSError, http.client.HTTPException) as exc:  # pragma: no cover - network specific failures
+            raise ElasticsearchError(f"Elasticsearch unreachable: {exc}") from exc
+        body = response.body.decode("utf-8", errors="replace")
+        if response.status >= 400:
+            raise ElasticsearchError(f"Elasticsearch HTTP error {response.status}: {body}")
+        try:
+            return json.loads(body or "{}")
+        except json.JSONDecodeError as exc:  # pragma: no cover - unexpected proxy responses
+            raise ElasticsearchError(f"Invalid Elasticsearch response: {body[:200]}") from exc
+
+
+class BulkIndexer:
+    """Indexes documents in the background through the `_bulk` endpoint.
+
+    `submit` only enqueues, so callers pay microseconds instead of a round
+    trip. A worker thread batches documents by count, bytes and age, and
+    retries failed batches with exponential backoff. Batches that still fail
+    are appended to an NDJSON journal in `journal_dir` and replayed once
+    Elasticsearch accepts requests again. Without a journal they are dropped
+    and counted. When the queue is full, new documents go straight to the
+    journal (or are dropped). A journal is removed only once all of it was
+    re-sent or re-journaled, so a crash mid-replay re-sends documents rather
+    than losing them. Documents that cannot be encoded or journaled are
+    dropped and counted; they never stop the worker.
+    """
+
+    def __init__(
+        self,
+        client: ElasticsearchClient,
+        max_queue: int = 10000,
+        batch_size: int = 500,
+        batch_bytes: int = 5 * 1024 * 1024,
+        flush_interval_s: float = 1.0,
+        max_retries: int = 5,
+        backoff_base_s: float = 0.5,
+        backoff_max_s: float = 30.0,
+        journal_dir: Optional[str] = None,
+    ) -> None:
+        self.client = client
+        self.batch_size = batch_size
+        self.batch_bytes = batch_bytes
+        self.flush_interval_s = flush_interval_s
+        self.max_retries = max_retries
+        self.backoff_base_s = backoff_base_s
+        self.backoff_max_s = backoff_max_s
+        self.journal_path = Path(journal_dir) / "bulk-journal.ndjson" if journal_dir else None
+        self.indexed = 0
+        self.rejected = 0
+        self.dropped = 0
+        self.spilled = 0
+        self._queue: "queue.Queue[Optional[Tuple[str, Mapping[str, Any]]]]" = queue.Queue(maxsize=max_queue)
+        self._journal_lock = threading.Lock()
+        self._idle = threading.Condition()
+        self._pending = 0
+        self._stopping = False
+        self._worker = threading.Thread(target=self._run, name="es-bulk-indexer", daemon=True)
+        self._worker.start()
+
+    def submit(self, index: str, document: Mapping[str, Any]) -> None:
+        with self._idle:
+            if self._stopping:
+                self.dropped += 1
+                return
+            self._pending += 1
+        try:
+            self._queue.put_nowait((index, document))
+        except queue.Full:
+            try:
+                line = self._encode_or_drop(index, document)
+                if line is not None:
+                    self._spill([line])
+            finally:
+                self._done(1)
+
+    def flush(self, timeout_s: Optional[float] = None) -> bool:
+        """Block until every submitted document was sent, journaled or dropped."""
+        with self._idle:
+            return self._idle.wait_for(lambda: self._pending == 0, timeout=timeout_s)
+
+    def close(self, timeout_s: Optional[float] = 30.0) -> None:
+        with self._idle:
+            if self._stopping:
+                return
+            self._stopping = True
+        self._queue.put(None)
+        self._worker.join(timeout_s)
+
+    def _run(self) -> None:
+        self._try_replay()
+        while True:
+            batch, stop = self._collect()
+            try:
+                if batch:
+                    self._send(batch)
+            except Exception:
+                # Keep the worker alive: a dead worker would block flush() and push every submit onto the journal.
+                self.dropped += len(batch)
+                logger.exception("Dropped %s documents after an unexpected bulk indexing error", len(batch))
+            finally:
+                self._done(len(batch))
+            if stop:
+                return
+
+    def _collect(self) -> Tuple[List[Tuple[bytes, bytes]], bool]:
+        batch: List[Tuple[bytes, bytes]] = []
+        size = 0
+        deadline: Optional[float] = None
+        while len(batch) < self.batch_size and size < self.batch_bytes:
+            timeout = None if deadline is None else max(0.0, deadline - time.monotonic())
+            try:
+                item = self._queue.get(timeout=timeout)
+            except queue.Empty:
+                break
+            if item is None:
+                return batch, True
+            line = self._encode_or_drop(*item)
+            if line is None:
+                self._done(1)
+                continue
+            batch.append(line)
+            size += len(line[0]) + len(line[1]) + 2
+            if deadline is None:
+                deadline = time.monotonic() + self.flush_interval_s
+        return batch, False
+
+    def _send(self, batch: List[Tuple[bytes, bytes]]) -> bool:
+        for attempt in range(self.max_retries + 1):
+            try:
+                result = self.client.bulk(batch)
+            except ElasticsearchError as exc:
+                logger.debug("Bulk request failed (attempt %s): %s", attempt + 1, exc)
+            else:
+                self.indexed += result.indexed
+                self.rejected += result.rejected
+                if not result.retryable:
+                    self._try_replay()
+                    return True
+                batch = result.retryable
+            if self._stopping or attempt == self.max_retries:
+                break
+            delay = min(self.backoff_max_s, self.backoff_base_s * 2 ** attempt)
+            time.sleep(delay * random.uniform(0.5, 1.0))
+        self._spill(batch)
+        return False
+
+    def _spill(self, lines: List[Tuple[bytes, bytes]]) -> None:
+        if self.journal_path is None:
+            self.dropped += len(lines)
+            logger.warning("Dropped %s documents: Elasticsearch unavailable and no journal configured", len(lines))
+            return
+        try:
+            with self._journal_lock:
+                self.journal_path.parent.mkdir(parents=True, exist_ok=True)
+                with self.journal_path.open("ab") as handle:
+                    handle.write(b"".join(action + b"\n" + document + b"\n" for action, document in lines))
+        except OSError as exc:
+            self.dropped += len(lines)
+            logger.warning("Dropped %s documents: could not write the bulk journal: %s", len(lines), exc)
+            return
+        self.spilled += len(lines)
+
+    def _try_replay(self) -> None:
+        try:
+            self._replay_journal()
+        except Exception:
+            # The replay file stays in place and is picked up by the next replay.
+            logger.exception("Replaying the Elasticsearch bulk journal failed")
+
+    def _replay_journal(self) -> None:
+        if self.journal_path is None:
+            return
+        replay_path = self.journal_path.with_suffix(".replaying")
+        with self._journal_lock:
+            # A replay file left behind by a crash is replayed before the journal is moved over it.
+            if not replay_path.exists():
+                if not self.journal_path.exists():
+                    return
+                self.journal_path.replace(replay_path)
+        with replay_path.open("rb") as handle:
+            raw_lines = handle.read().splitlines()
+        pairs = list(zip(raw_lines[0::2], raw_lines[1::2]))
+        logger.info("Replaying %s journaled documents into Elasticsearch", len(pairs))
+        for start in range(0, len(pairs), self.batch_size):
+            chunk = pairs[start : start + self.batch_size]
+            try:
+                result = self.client.bulk(chunk)
+            except ElasticsearchError:
+                self._spill(pairs[start:])
+                break
+            self.indexed += result.indexed
+            self.rejected += result.rejected
+            if result.retryable:
+                self._spill(result.retryable)
+        replay_path.unlink()
+
+    def _done(self, count: int) -> None:
+        with self._idle:
+            self._pending -= count
+            if self._pending <= 0:
+                self._idle.notify_all()
+
+    def _encode_or_drop(self, index: str, document: Mapping[str, Any]) -> Optional[Tuple[bytes, bytes]]:
+        try:
+            return self._encode(index, document)
+        except (TypeError, ValueError) as exc:
+            self.dropped += 1
+            logger.warning("Dropped a document for index %s that cannot be encoded: %s", index, exc)
+            return None
+
+    @staticmethod
+    def _encode(index: str, document: Mapping[str, Any]) -> Tuple[bytes, bytes]:
+        action = json.dumps({"index": {"_index": index}}).encode("utf-8")
+        return action, json.dumps(document, ensure_ascii=False, default=str).encode("utf-8")
 
 
 _DEFAULT_CLIENT: Optional[ElasticsearchClient] = None
@@ -88,12 +336,40 @@ def get_default_elasticsearch_client() -> Optional[ElasticsearchClient]:
     return _DEFAULT_CLIENT
 
 
+_BULK_INDEXERS: Dict[int, BulkIndexer] = {}
+_BULK_LOCK = threading.Lock()
+
+
+def bulk_indexer_for(client: ElasticsearchClient) -> BulkIndexer:
+    """Shared background indexer per client, configured from ELASTICSEARCH_BULK_* variables."""
+    with _BULK_LOCK:
+        indexer = _BULK_INDEXERS.get(id(client))
+        if indexer is None or indexer.client is not client:
+            indexer = BulkIndexer(
+                client,
+                max_queue=int(os.getenv("ELASTICSEARCH_BULK_QUEUE", "10000")),
+                batch_size=int(os.getenv("ELASTICSEARCH_BULK_SIZE", "500")),
+                flush_interval_s=float(os.getenv("ELASTICSEARCH_BULK_FLUSH_S", "1.0")),
+                journal_dir=(os.getenv("ELASTICSEARCH_JOURNAL_DIR") or "").strip() or None,
+            )
+            _BULK_INDEXERS[id(client)] = indexer
+        return indexer
+
+
+def flush_bulk_indexers(timeout_s: Optional[float] = None) -> None:
+    for indexer in list(_BULK_INDEXERS.values()):
+        indexer.flush(timeout_s)
+
+
+@atexit.register
+def _close_bulk_indexers() -> None:
+    for indexer in list(_BULK_INDEXERS.values()):
+        indexer.close()
+
+
 def index_if_configured(index: str, document: Mapping[str, Any]) -> None:
-    """Helper to index a document when Elasticsearch is configured."""
+    """Helper to queue a document for indexing when Elasticsearch is configured."""
     client = get_default_elasticsearch_client()
     if not client:
         return
-    try:
-        client.index_document(index=index, document=document)
-    except ElasticsearchError as exc:
-        logger.warning("Failed to index document into %s: %s", index, exc)
+    bulk_indexer_for(client).submit(index, document)
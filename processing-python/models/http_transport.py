@@ -0,0 +1,412 @@
+"""Pooled keep-alive HTTP transports shared by the model clients."""
+
+from __future__ import annotations
+
+import asyncio
+import gzip
+import http.client
+import queue
+import socket
+import ssl
+import threading
+from dataclasses import dataclass
+from typing import Dict, Iterator, List, Mapping, Optional, Tuple
+from urllib.parse import urlsplit
+
+# Errors raised when the server closed an idle keep-alive connection. A request
+# is only retried on a fresh connection when the server cannot have received it:
+# none of it was written, or the reused connection closed without a response byte.
+_UNSENT_ERRORS = (http.client.CannotSendRequest, BrokenPipeError, ConnectionResetError)
+
+
+class _NoDelayHTTPConnection(http.client.HTTPConnection):
+    # Whether any part of the current request reached the socket.
+    request_written = False
+
+    # http.client writes headers and body separately; with Nagle enabled the
+    # body waits for the server's delayed ACK on every reused connection.
+    def connect(self) -> None:
+        super().connect()
+        self.sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+
+    def send(self, data: bytes) -> None:
+        super().send(data)
+        self.request_written = True
+
+
+class _NoDelayHTTPSConnection(http.client.HTTPSConnection):
+    request_written = False
+
+    def connect(self) -> None:
+        super().connect()
+        self.sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+
+    def send(self, data: bytes) -> None:
+        super().send(data)
+        self.request_written = True
+
+
+@dataclass
+class HttpResponse:
+    status: int
+    reason: str
+    headers: Dict[str, str]
+    body: bytes
+
+
+class StreamingResponse:
+    """Response whose body is read incrementally, line by line.
+
+    A fully read stream hands its connection back to the pool; closing it
+    early drops the connection, which also tells the server to stop
+    generating.
+    """
+
+    def __init__(self, transport: "PooledHttpTransport", connection: http.client.HTTPConnection, raw: http.client.HTTPResponse) -> None:
+        self.status = raw.status
+        self.reason = raw.reason
+        self.headers = {key.lower(): value for key, value in raw.getheaders()}
+        self._transport = transport
+        self._connection: Optional[http.client.HTTPConnection] = connection
+        self._raw = raw
+
+    def iter_lines(self) -> Iterator[bytes]:
+        while self._connection is not None:
+            line = self._raw.readline()
+            if not line:
+                self.close()
+                return
+            yield line
+
+    def read(self) -> bytes:
+        body = self._raw.read()
+        self.close()
+        return body
+
+    def close(self) -> None:
+        connection, self._connection = self._connection, None
+        if connection is None:
+            return
+        if self._raw.isclosed() and not self._raw.will_close:
+            self._transport._release(connection)
+        else:
+            connection.close()
+
+    def __enter__(self) -> "StreamingResponse":
+        return self
+
+    def __exit__(self, *exc_info: object) -> None:
+        self.close()
+
+
+class PooledHttpTransport:
+    """Thread-safe pool of persistent HTTP/1.1 connections to a single origin.
+
+    Up to `pool_size` idle connections are kept for reuse, so consecutive
+    requests skip the TCP and TLS handshakes. Responses are requested with
+    gzip and decompressed transparently; request bodies of at least
+    `gzip_min_bytes` are gzip-compressed when `gzip_requests` is set.
+    """
+
+    def __init__(
+        self,
+        base_url: str,
+        pool_size: int = 8,
+        timeout_s: float = 60.0,
+        gzip_requests: bool = False,
+        gzip_min_bytes: int = 1024,
+        ssl_context: Optional[ssl.SSLContext] = None,
+    ) -> None:
+        parts = urlsplit(base_url)
+        if parts.scheme not in ("http", "https"):
+            raise ValueError(f"Unsupported URL scheme {parts.scheme!r}")
+        self.scheme = parts.scheme
+        self.host = parts.hostname or ""
+        self.port = parts.port
+        self.base_path = parts.path.rstrip("/")
+        self.pool_size = pool_size
+        self.timeout_s = timeout_s
+        self.gzip_requests = gzip_requests
+        self.gzip_min_bytes = gzip_min_bytes
+        self.ssl_context = ssl_context or (ssl.create_default_context() if self.scheme == "https" else None)
+        self._idle: "queue.LifoQueue[http.client.HTTPConnection]" = queue.LifoQueue(maxsize=pool_size)
+        self._lock = threading.Lock()
+        self.connections_opened = 0
+
+    def request(
+        self,
+        method: str,
+        path: str,
+        body: Optional[bytes] = None,
+        headers: Optional[Mapping[str, str]] = None,
+    ) -> HttpResponse:
+        request_headers = {"Accept-Encoding": "gzip", "Connection": "keep-alive"}
+        request_headers.update(headers or {})
+        if body is not None and self.gzip_requests and len(body) >= self.gzip_min_bytes:
+            body = gzip.compress(body, compresslevel=5)
+            request_headers["Content-Encoding"] = "gzip"
+
+        connection, raw = self._open(method, path, body, request_headers)
+        try:
+            payload = raw.read()
+        except BaseException:
+            connection.close()
+            raise
+        response = HttpResponse(
+            status=raw.status,
+            reason=raw.reason,
+            headers={key.lower(): value for key, value in raw.getheaders()},
+            body=payload,
+        )
+        if raw.will_close:
+            connection.close()
+        else:
+            self._release(connection)
+        if response.headers.get("content-encoding", "").lower() == "gzip":
+            response.body = gzip.decompress(response.body)
+        return response
+
+    def stream(
+        self,
+        method: str,
+        path: str,
+        body: Optional[bytes] = None,
+        headers: Optional[Mapping[str, str]] = None,
+    ) -> StreamingResponse:
+        """Send a request and return before the body is read (e.g. for server-sent events)."""
+        # Streamed bodies are consumed line by line, so they are requested uncompressed.
+        request_headers = {"Accept-Encoding": "identity", "Connection": "keep-alive"}
+        request_headers.update(headers or {})
+        if body is not None and self.gzip_requests and len(body) >= self.gzip_min_bytes:
+            body = gzip.compress(body, compresslevel=5)
+            request_headers["Content-Encoding"] = "gzip"
+        connection, raw = self._open(method, path, body, request_headers)
+        return StreamingResponse(self, connection, raw)
+
+    def close(self) -> None:
+        while True:
+            try:
+                self._idle.get_nowait().close()
+            except queue.Empty:
+                return
+
+    def _open(
+        self,
+        method: str,
+        path: str,
+        body: Optional[bytes],
+        headers: Mapping[str, str],
+    ) -> Tuple[http.client.HTTPConnection, http.client.HTTPResponse]:
+        """Send the request and read the status line and headers on a pooled connection."""
+        connection, reused = self._acquire()
+        try:
+            return connection, self._send(connection, method, path, body, headers)
+        except _UNSENT_ERRORS as exc:
+            connection.close()
+            # Anything else may have reached the server, and resending a POST could bill or index it twice.
+            unsent = not connection.request_written or isinstance(exc, http.client.RemoteDisconnected)
+            if not (reused and unsent):
+                raise
+            connection = self._new_connection()
+            try:
+                return connection, self._send(connection, method, path, body, headers)
+            except BaseException:
+                connection.close()
+                raise
+        except BaseException:
+            connection.close()
+            raise
+
+    def _send(
+        self,
+        connection: http.client.HTTPConnection,
+        method: str,
+        path: str,
+        body: Optional[bytes],
+        headers: Mapping[str, str],
+    ) -> http.client.HTTPResponse:
+        connection.request_written = False
+        connection.request(method, f"{self.base_path}{path}", body=body, headers=dict(headers))
+        return connection.getresponse()
+
+    def _acquire(self) -> Tuple[http.client.HTTPConnection, bool]:
+        try:
+            return self._idle.get_nowait(), True
+        except queue.Empty:
+            return self._new_connection(), False
+
+    def _release(self, connection: http.client.HTTPConnection) -> None:
+        try:
+            self._idle.put_nowait(connection)
+        except queue.Full:
+            connection.close()
+
+    def _new_connection(self) -> http.client.HTTPConnection:
+        with self._lock:
+            self.connections_opened += 1
+        if self.scheme == "https":
+            return _NoDelayHTTPSConnection(self.host, self.port, timeout=self.timeout_s, context=self.ssl_context)
+        return _NoDelayHTTPConnection(self.host, self.port, timeout=self.timeout_s)
+
+
+_Stream = Tuple[asyncio.StreamReader, asyncio.StreamWriter]
+
+
+class _NoResponse(ConnectionResetError):
+    """The connection closed before the first byte of the response."""
+
+
+class AsyncHttpTransport:
+    """Asyncio counterpart of `PooledHttpTransport` built on stdlib streams.
+
+    Connections are opened on demand and up to `pool_size` idle ones are kept
+    for reuse. A request that is cancelled or times out closes its connection
+    instead of returning it to the pool, so a half-read response can never be
+    picked up by the next request.
+    """
+
+    def __init__(
+        self,
+        base_url: str,
+        pool_size: int = 32,
+        gzip_requests: bool = False,
+        gzip_min_bytes: int = 1024,
+        ssl_context: Optional[ssl.SSLContext] = None,
+    ) -> None:
+        parts = urlsplit(base_url)
+        if parts.scheme not in ("http", "https"):
+            raise ValueError(f"Unsupported URL scheme {parts.scheme!r}")
+        self.scheme = parts.scheme
+        self.host = parts.hostname or ""
+        self.port = parts.port or (443 if self.scheme == "https" else 80)
+        self.base_path = parts.path.rstrip("/")
+        self.pool_size = pool_size
+        self.gzip_requests = gzip_requests
+        self.gzip_min_bytes = gzip_min_bytes
+        self.ssl_context = ssl_context or (ssl.create_default_context() if self.scheme == "https" else None)
+        self._idle: List[_Stream] = []
+        self.connections_opened = 0
+
+    async def request(
+        self,
+        method: str,
+        path: str,
+        body: Optional[bytes] = None,
+        headers: Optional[Mapping[str, str]] = None,
+    ) -> HttpResponse:
+        request_headers = {"Host": self._host_header(), "Accept-Encoding": "gzip", "Connection": "keep-alive"}
+        request_headers.update(headers or {})
+        if body is not None and self.gzip_requests and len(body) >= self.gzip_min_bytes:
+            body = gzip.compress(body, compresslevel=5)
+            request_headers["Content-Encoding"] = "gzip"
+        request_headers["Content-Length"] = str(len(body or b""))
+        head = f"{method} {self.base_path}{path} HTTP/1.1\r\n" + "".join(
+            f"{key}: {value}\r\n" for key, value in request_headers.items()
+        )
+        data = head.encode("latin-1") + b"\r\n" + (body or b"")
+
+        stream, reused = await self._acquire()
+        try:
+            try:
+                response, keep_alive = await self._send(stream, data)
+            except _NoResponse:
+                # The server closed the reused connection without answering, so it did not process the request.
+                self._close(stream)
+                if not reused:
+                    raise
+                stream = await self._new_connection()
+                response, keep_alive = await self._send(stream, data)
+        except BaseException:
+            self._close(stream)
+            raise
+
+        if keep_alive:
+            self._release(stream)
+        else:
+            self._close(stream)
+        if response.headers.get("content-encoding", "").lower() == "gzip":
+            response.body = gzip.decompress(response.body)
+        return response
+
+    async def close(self) -> None:
+        idle, self._idle = self._idle, []
+        for stream in idle:
+            self._close(stream)
+
+    async def _send(self, stream: _Stream, data: bytes) -> Tuple[HttpResponse, bool]:
+        reader, writer = stream
+        writer.write(data)
+        await writer.drain()
+        try:
+            status_line = await reader.readline()
+        except ConnectionResetError as exc:
+            raise _NoResponse(str(exc)) from exc
+        if not status_line:
+            raise _NoResponse("Connection closed before a response was received")
+        version, status, reason = (status_line.decode("latin-1").rstrip("\r\n").split(" ", 2) + [""])[:3]
+        headers: Dict[str, str] = {}
+        while True:
+            line = await reader.readline()
+            if line in (b"\r\n", b"\n", b""):
+                break
+            key, _, value = line.decode("latin-1").partition(":")
+            headers[key.strip().lower()] = value.strip()
+
+        keep_alive = version == "HTTP/1.1" and headers.get("connection", "").lower() != "close"
+        if headers.get("transfer-encoding", "").lower() == "chunked":
+            payload = await self._read_chunked(reader)
+        elif "content-length" in headers:
+            payload = await reader.readexactly(int(headers["content-length"]))
+        else:
+            payload = await reader.read()
+            keep_alive = False
+        return HttpResponse(status=int(status), reason=reason, headers=headers, body=payload), keep_alive
+
+    @staticmethod
+    async def _read_chunked(reader: asyncio.StreamReader) -> bytes:
+        chunks: List[bytes] = []
+        while True:
+            size_line = await reader.readline()
+            size = int(size_line.split(b";", 1)[0].strip() or b"0", 16)
+            if size == 0:
+                # Skip trailers up to the terminating blank line.
+                while (await reader.readline()) not in (b"\r\n", b"\n", b""):
+                    pass
+                return b"".join(chunks)
+            chunks.append(await reader.readexactly(size))
+            await reader.readexactly(2)
+
+    async def _acquire(self) -> Tuple[_Stream, bool]:
+        while self._idle:
+            stream = self._idle.pop()
+            if not stream[0].at_eof():
+                return stream, True
+            self._close(stream)
+        return await self._new_connection(), False
+
+    def _release(self, stream: _Stream) -> None:
+        if len(self._idle) < self.pool_size:
+            self._idle.append(stream)
+        else:
+            self._close(stream)
+
+    async def _new_connection(self) -> _Stream:
+        self.connections_opened += 1
+        reader, writer = await asyncio.open_connection(
+            self.host,
+            self.port,
+            ssl=self.ssl_context,
+            server_hostname=self.host if self.ssl_context else None,
+        )
+        sock = writer.get_extra_info("socket")
+        if sock is not None:
+            sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        return reader, writer
+
+    @staticmethod
+    def _close(stream: _Stream) -> None:
+        stream[1].close()
+
+    def _host_header(self) -> str:
+        default_port = 443 if self.scheme == "https" else 80
+        return self.host if self.port == default_port else f"{self.host}:{self.port}"
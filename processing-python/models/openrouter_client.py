@@ -2,11 +2,20 @@
 
 from __future__ import annotations
 
+import http.client
 import json
 import os
+import time
 from dataclasses import dataclass
-from typing import Any, Dict, Mapping, Optional, Sequence, Union
-from urllib import error, request
+from typing import TYPE_CHECKING, Any, Dict, Iterator, List, Mapping, Optional, Sequence, Union
+
+from context.token_estimator import observe_usage
+from models.completion_cache import CompletionCache, completion_cache_key
+from models.http_transport import HttpResponse, PooledHttpTransport, StreamingResponse
+
+if TYPE_CHECKING:
+    from validation.schema_validator import ValidationIssue
+    from validation.streaming_validator import StreamingJsonValidator
 
 
 class OpenRouterError(RuntimeError):
@@ -33,10 +42,129 @@ class CompletionResult:
     finish_reason: Optional[str]
     usage: CompletionUsage
     raw: Dict[str, Any]
+    cached: bool = False  # served from a CompletionCache; usage is that of the original call
 
 
-class OpenRouterClient:
-    """Thin HTTP client around the OpenRouter chat completions API."""
+class CompletionStream:
+    """Iterator over the content deltas of a streamed completion.
+
+    Once iteration ends, `result` holds the assembled `CompletionResult`.
+    When a `validator` reports an issue the stream is closed right away,
+    which stops the generation; `result.finish_reason` is then
+    "validation_abort" and the issues are kept in `issues`.
+    """
+
+    def __init__(
+        self,
+        response: StreamingResponse,
+        model: str,
+        started: float,
+        validator: Optional["StreamingJsonValidator"] = None,
+        prompt: Optional[str] = None,
+    ) -> None:
+        self.model = model
+        self.prompt = prompt
+        self.validator = validator
+        self.time_to_first_token_s: Optional[float] = None
+        self.elapsed_s: Optional[float] = None
+        self.result: Optional[CompletionResult] = None
+        self.issues: List["ValidationIssue"] = []
+        self._response = response
+        self._started = started
+        self._consumed = False
+
+    @property
+    def aborted(self) -> bool:
+        return bool(self.issues)
+
+    def __iter__(self) -> Iterator[str]:
+        if self._consumed:
+            return
+        self._consumed = True
+        fragments: List[str] = []
+        role = "assistant"
+        finish_reason: Optional[str] = None
+        usage_payload: Dict[str, Any] = {}
+        response_model = self.model
+        events = 0
+        try:
+            for data in self._events():
+                if data == "[DONE]":
+                    # Drain the terminating chunk so the connection can be reused.
+                    self._response.read()
+                    break
+                try:
+                    payload = json.loads(data)
+                except json.JSONDecodeError as exc:  # pragma: no cover - unexpected API change
+                    raise OpenRouterError("Invalid JSON event returned by OpenRouter") from exc
+                if payload.get("error"):
+                    raise OpenRouterError(f"OpenRouter stream failed: {payload['error']}")
+                events += 1
+                response_model = payload.get("model", response_model)
+                usage_payload = payload.get("usage") or usage_payload
+                choices = payload.get("choices") or []
+                if not choices:
+                    continue
+                choice = choices[0]
+                finish_reason = choice.get("finish_reason") or finish_reason
+                delta = choice.get("delta") or {}
+                role = delta.get("role") or role
+                content = _OpenRouterBase._extract_content(delta.get("content"))
+                if not content:
+                    continue
+                if self.time_to_first_token_s is None:
+                    self.time_to_first_token_s = time.perf_counter() - self._started
+                fragments.append(content)
+                yield content
+                if self.validator is not None and self.validator.feed(content):
+                    self.issues = list(self.validator.issues)
+                    finish_reason = "validation_abort"
+                    break
+        finally:
+            self._response.close()
+            self.elapsed_s = time.perf_counter() - self._started
+            self.result = CompletionResult(
+                model=response_model,
+                message=ChatMessage(role=role, content="".join(fragments)),
+                finish_reason=finish_reason,
+                usage=_OpenRouterBase._parse_usage(usage_payload),
+                raw={"model": response_model, "stream_events": events, "usage": usage_payload},
+            )
+            if self.prompt is not None and self.result.usage.input_tokens:
+                observe_usage(self.model, self.prompt, self.result.usage.input_tokens)
+
+    def collect(self) -> CompletionResult:
+        """Consume the remaining stream and return the assembled result."""
+        for _ in self:
+            pass
+        assert self.result is not None
+        return self.result
+
+    def close(self) -> None:
+        self._response.close()
+
+    def _events(self) -> Iterator[str]:
+        # Server-sent events: "data:" lines accumulate until a blank line;
+        # lines starting with ":" are keep-alive comments.
+        data_lines: List[str] = []
+        for raw_line in self._response.iter_lines():
+            line = raw_line.decode("utf-8").rstrip("\r\n")
+            if not line:
+                if data_lines:
+                    yield "\n".join(data_lines)
+                    data_lines = []
+                continue
+            if line.startswith(":"):
+                continue
+            name, _, value = line.partition(":")
+            if name == "data":
+                data_lines.append(value[1:] if value.startswith(" ") else value)
+        if data_lines:
+            yield "\n".join(data_lines)
+
+
+class _OpenRouterBase:
+    """Credentials, headers and payload handling shared by the sync and async clients."""
 
     def __init__(
         self,
@@ -45,12 +173,16 @@ class OpenRouterClient:
         timeout_s: float = 60.0,
         app_url: Optional[str] = None,
         app_name: Optional[str] = None,
+        cache: Optional[CompletionCache] = None,
+        cache_nondeterministic: bool = False,
     ) -> None:
         key = (api_key or os.getenv("OPENROUTER_API_KEY", "")).strip()
         if not key:
             raise OpenRouterError("Missing OpenRouter credentials (set OPENROUTER_API_KEY)")
         self.base_url = (base_url or os.getenv("OPENROUTER_BASE_URL") or "https://openrouter.ai/api/v1").rstrip("/")
         self.timeout_s = timeout_s
+        self.cache = cache
+        self.cache_nondeterministic = cache_nondeterministic
         self._headers = {
             "Authorization": f"Bearer {key}",
             "Content-Type": "application/json",
@@ -62,17 +194,16 @@ class OpenRouterClient:
         if title:
             self._headers["X-Title"] = title
 
-    def chat_completion(
+    def _build_payload(
         self,
-        *,
         model: str,
         messages: Sequence[Union[ChatMessage, Mapping[str, Any]]],
-        temperature: float = 0.0,
-        max_output_tokens: Optional[int] = None,
-        response_format: Optional[Mapping[str, Any]] = None,
-        metadata: Optional[Mapping[str, Any]] = None,
-        **extra_settings: Any,
-    ) -> CompletionResult:
+        temperature: float,
+        max_output_tokens: Optional[int],
+        response_format: Optional[Mapping[str, Any]],
+        metadata: Optional[Mapping[str, Any]],
+        extra_settings: Mapping[str, Any],
+    ) -> Dict[str, Any]:
         payload: Dict[str, Any] = {
             "model": model,
             "messages": [self._serialize_message(message) for message in messages],
@@ -86,13 +217,66 @@ class OpenRouterClient:
             payload["metadata"] = dict(metadata)
         if extra_settings:
             payload.update(extra_settings)
+        return payload
 
-        response = self._post("/chat/completions", payload)
+    def _cache_key(self, payload: Mapping[str, Any]) -> Optional[str]:
+        """Cache key for a request payload, or None when the request must not be cached.
+
+        Only temperature 0 requests are cached unless `cache_nondeterministic` is set.
+        """
+        if self.cache is None or (payload["temperature"] != 0 and not self.cache_nondeterministic):
+            return None
+        extra = {
+            name: value
+            for name, value in payload.items()
+            if name not in ("model", "messages", "temperature", "max_tokens", "response_format", "metadata")
+        }
+        return completion_cache_key(
+            payload["model"],
+            payload["messages"],
+            payload["temperature"],
+            payload.get("max_tokens"),
+            payload.get("response_format"),
+            extra,
+        )
+
+    def _cached_completion(self, key: Optional[str], model: str, bypass_cache: bool) -> Optional[CompletionResult]:
+        if key is None or bypass_cache or self.cache is None:
+            return None
+        response = self.cache.get(key)
+        if response is None:
+            return None
+        result = self._parse_completion(response, model)
+        result.cached = True
+        return result
+
+    def _store_completion(self, key: Optional[str], model: str, response: Dict[str, Any]) -> None:
+        if key is not None and self.cache is not None:
+            self.cache.put(key, model, response)
+
+    def _prompt_text(self, payload: Mapping[str, Any]) -> str:
+        return "\n".join(self._extract_content(message.get("content")) for message in payload["messages"])
+
+    def _observe_usage(self, payload: Mapping[str, Any], result: CompletionResult) -> None:
+        # Calibrates the token estimator of the requested model with the prompt size the provider counted.
+        if result.usage.input_tokens:
+            observe_usage(payload["model"], self._prompt_text(payload), result.usage.input_tokens)
+
+    def _parse_completion(self, response: Dict[str, Any], model: str) -> CompletionResult:
         choice = self._first_choice(response)
         message_payload = choice.get("message") or {}
         content = self._extract_content(message_payload.get("content"))
         message = ChatMessage(role=message_payload.get("role", "assistant"), content=content)
-        usage_payload = response.get("usage") or {}
+        return CompletionResult(
+            model=response.get("model", model),
+            message=message,
+            finish_reason=choice.get("finish_reason"),
+            usage=self._parse_usage(response.get("usage") or {}),
+            raw=response,
+        )
+
+    @staticmethod
+    def _parse_usage(usage_payload: Mapping[str, Any]) -> CompletionUsage:
         usage = CompletionUsage(
             input_tokens=int(
                 usage_payload.get("prompt_tokens")
@@ -108,13 +292,7 @@ class OpenRouterClient:
         )
         if usage.total_tokens == 0:
             usage.total_tokens = usage.input_tokens + usage.output_tokens
-        return CompletionResult(
-            model=response.get("model", model),
-            message=message,
-            finish_reason=choice.get("finish_reason"),
-            usage=usage,
-            raw=response,
-        )
+        return usage
 
     def _serialize_message(self, message: Union[ChatMessage, Mapping[str, Any]]) -> Dict[str, Any]:
         if isinstance(message, ChatMessage):
@@ -125,21 +303,13 @@ class OpenRouterClient:
             return {"role": role, "content": content}
         return {"role": role, "content": str(content)}
 
-    def _post(self, path: str, payload: Mapping[str, Any]) -> Dict[str, Any]:
-        url = f"{self.base_url}{path}"
-        data = json.dumps(payload).encode("utf-8")
-        req = request.Request(url, data=data, method="POST", headers=self._headers)
-        try:
-            with request.urlopen(req, timeout=self.timeout_s) as response:
-                body = response.read()
-        except error.HTTPError as exc:
-            detail = exc.read().decode("utf-8", errors="replace")
-            raise OpenRouterError(f"OpenRouter request failed: {exc.code} {detail}") from exc
-        except error.URLError as exc:  # pragma: no cover - network errors only at runtime
-            raise OpenRouterError(f"Unable to reach OpenRouter: {exc.reason}") from exc
-
+    @staticmethod
+    def _decode_response(response: HttpResponse) -> Dict[str, Any]:
+        if response.status >= 400:
+            detail = response.body.decode("utf-8", errors="replace")
+            raise OpenRouterError(f"OpenRouter request failed: {response.status} {detail}")
         try:
-            return json.loads(body.decode("utf-8"))
+            return json.loads(response.body.decode("utf-8"))
         except json.JSONDecodeError as exc:  # pragma: no cover - unexpected API change
             raise OpenRouterError("Invalid JSON payload returned by OpenRouter") from exc
 
@@ -161,3 +331,100 @@ class OpenRouterClient:
                     fragments.append(str(item["text"]))
             return "\n".join(fragments)
         return "" if content is None else str(content)
+
+
+class OpenRouterClient(_OpenRouterBase):
+    """Thin HTTP client around the OpenRouter chat completions API.
+
+    Requests go through a pooled keep-alive transport that is safe to share
+    across threads; pass `transport` to share one pool between clients.
+    """
+
+    def __init__(
+        self,
+        api_key: Optional[str] = None,
+        base_url: Optional[str] = None,
+        timeout_s: float = 60.0,
+        app_url: Optional[str] = None,
+        app_name: Optional[str] = None,
+        pool_size: int = 8,
+        gzip_requests: bool = False,
+        transport: Optional[PooledHttpTransport] = None,
+        cache: Optional[CompletionCache] = None,
+        cache_nondeterministic: bool = False,
+    ) -> None:
+        super().__init__(api_key, base_url, timeout_s, app_url, app_name, cache, cache_nondeterministic)
+        self.transport = transport or PooledHttpTransport(
+            self.base_url, pool_size=pool_size, timeout_s=timeout_s, gzip_requests=gzip_requests
+        )
+
+    def chat_completion(
+        self,
+        *,
+        model: str,
+        messages: Sequence[Union[ChatMessage, Mapping[str, Any]]],
+        temperature: float = 0.0,
+        max_output_tokens: Optional[int] = None,
+        response_format: Optional[Mapping[str, Any]] = None,
+        metadata: Optional[Mapping[str, Any]] = None,
+        bypass_cache: bool = False,
+        **extra_settings: Any,
+    ) -> CompletionResult:
+        """`bypass_cache` forces a fresh call; its result still replaces the cached one."""
+        payload = self._build_payload(
+            model, messages, temperature, max_output_tokens, response_format, metadata, extra_settings
+        )
+        key = self._cache_key(payload)
+        cached = self._cached_completion(key, model, bypass_cache)
+        if cached is not None:
+            return cached
+        response = self._post("/chat/completions", payload)
+        result = self._parse_completion(response, model)
+        self._observe_usage(payload, result)
+        self._store_completion(key, model, response)
+        return result
+
+    def stream_chat_completion(
+        self,
+        *,
+        model: str,
+        messages: Sequence[Union[ChatMessage, Mapping[str, Any]]],
+        temperature: float = 0.0,
+        max_output_tokens: Optional[int] = None,
+        response_format: Optional[Mapping[str, Any]] = None,
+        metadata: Optional[Mapping[str, Any]] = None,
+        validator: Optional["StreamingJsonValidator"] = None,
+        **extra_settings: Any,
+    ) -> CompletionStream:
+        """Start a streamed completion; iterate the returned stream for content deltas.
+
+        Pass a `StreamingJsonValidator` to abort generations whose JSON output
+        breaks or leaves the schema before they finish.
+        """
+        payload = self._build_payload(
+            model, messages, temperature, max_output_tokens, response_format, metadata, extra_settings
+        )
+        payload["stream"] = True
+        payload.setdefault("stream_options", {"include_usage": True})
+        started = time.perf_counter()
+        data = json.dumps(payload).encode("utf-8")
+        headers = dict(self._headers, Accept="text/event-stream")
+        try:
+            response = self.transport.stream("POST", "/chat/completions", body=data, headers=headers)
+        except (OSError, http.client.HTTPException) as exc:  # pragma: no cover - network errors only at runtime
+            raise OpenRouterError(f"Unable to reach OpenRouter: {exc}") from exc
+        if response.status >= 400:
+            body = response.read()
+            self._decode_response(HttpResponse(response.status, response.reason, response.headers, body))
+        return CompletionStream(response, model, started, validator, prompt=self._prompt_text(payload))
+
+    def close(self) -> None:
+        self.transport.close()
+
+    def _post(self, path: str, payload: Mapping[str, Any]) -> Dict[str, Any]:
+        data = json.dumps(payload).encode("utf-8")
+        try:
+            response = self.transport.request("POST", path, body=data, headers=self._headers)
+        except (OSError, http.client.HTTPException) as exc:  # pragma: no cover - network errors only at runtime
+            raise OpenRouterError(f"Unable to reach OpenRouter: {exc}") from exc
+        return self._decode_response(response)
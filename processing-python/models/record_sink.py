@@ -0,0 +1,295 @@
+"""Append-only JSONL files for structured log records."""
+
+from __future__ import annotations
+
+import gzip
+import io
+import json
+import logging
+import os
+import re
+import threading
+import time
+import zlib
+from pathlib import Path
+from typing import Any, BinaryIO, Callable, Dict, Iterable, Iterator, List, Mapping, Optional
+
+logger = logging.getLogger(__name__)
+
+COMPRESSIONS = ("gzip", "zstd")
+FSYNC_POLICIES = ("never", "flush", "always")
+_SUFFIXES = {"gzip": ".gz", "zstd": ".zst"}
+
+
+def _segment_pattern(path: Path) -> "re.Pattern[str]":
+    stem, dot, extension = path.name.partition(".")
+    return re.compile(re.escape(stem) + r"\.(\d+)" + re.escape(dot + extension) + "$")
+
+
+def _rotated_name(path: Path, index: int) -> Path:
+    stem, dot, extension = path.name.partition(".")
+    return path.with_name(f"{stem}.{index:05d}{dot}{extension}")
+
+
+def segment_paths(path: str) -> List[Path]:
+    """Rotated segments of `path` in write order, followed by the active file if present."""
+    active = Path(path)
+    pattern = _segment_pattern(active)
+    rotated = []
+    if active.parent.is_dir():
+        for candidate in active.parent.iterdir():
+            match = pattern.match(candidate.name)
+            if match:
+                rotated.append((int(match.group(1)), candidate))
+    segments = [candidate for _, candidate in sorted(rotated)]
+    if active.exists():
+        segments.append(active)
+    return segments
+
+
+class RecordSink:
+    """Appends records to `path` as compact JSON lines while they arrive.
+
+    Records are buffered and reach the file on `flush`, or immediately with
+    `fsync="always"`, which also fsyncs every record; `"flush"` fsyncs on
+    each flush and rotation, `"never"` leaves that to the OS. With
+    `compression` the active file gets a `.gz`/`.zst` suffix and every
+    flush ends a compressed block, so a crash loses at most the unflushed
+    tail. The active segment is rotated to `<stem>.<n>.<ext>` once it holds
+    `max_bytes` of uncompressed JSONL or is `max_age_s` old. A torn tail
+    left by a crash is repaired when the file is reopened: a plain file is
+    cut back to its last complete line, and a compressed segment that does
+    not decode to the end is rotated away rather than appended to. Safe to
+    share across threads.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        compression: Optional[str] = None,
+        max_bytes: Optional[int] = None,
+        max_age_s: Optional[float] = None,
+        fsync: str = "flush",
+        clock: Callable[[], float] = time.time,
+    ) -> None:
+        if compression is not None and compression not in COMPRESSIONS:
+            raise ValueError(f"Unknown record compression {compression}")
+        if fsync not in FSYNC_POLICIES:
+            raise ValueError(f"Unknown fsync policy {fsync}")
+        suffix = _SUFFIXES.get(compression or "", "")
+        self.path = Path(path if not suffix or str(path).endswith(suffix) else f"{path}{suffix}")
+        self.compression = compression
+        self.max_bytes = max_bytes
+        self.max_age_s = max_age_s
+        self.fsync = fsync
+        self.records_written = 0
+        self.rotations = 0
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._raw: Optional[BinaryIO] = None
+        self._writer: Optional[BinaryIO] = None
+        self._segment_bytes = 0
+        self._segment_opened = 0.0
+
+    def write(self, record: Mapping[str, Any]) -> None:
+        line = json.dumps(record, separators=(",", ":"), ensure_ascii=False).encode("utf-8") + b"\n"
+        with self._lock:
+            if self._writer is None:
+                self._open()
+            elif self._should_rotate():
+                self._rotate()
+            assert self._writer is not None
+            self._writer.write(line)
+            self._segment_bytes += len(line)
+            self.records_written += 1
+            if self.fsync == "always":
+                self._flush(sync=True)
+
+    def write_many(self, records: Iterable[Mapping[str, Any]]) -> None:
+        for record in records:
+            self.write(record)
+
+    def flush(self) -> None:
+        with self._lock:
+            if self._writer is not None:
+                self._flush(sync=self.fsync != "never")
+
+    def rotate(self) -> None:
+        with self._lock:
+            if self._writer is not None:
+                self._rotate()
+
+    def close(self) -> None:
+        with self._lock:
+            self._close()
+
+    def __enter__(self) -> "RecordSink":
+        return self
+
+    def __exit__(self, *exc_info: object) -> None:
+        self.close()
+
+    def _should_rotate(self) -> bool:
+        if self.max_bytes is not None and self._segment_bytes >= self.max_bytes:
+            return True
+        return self.max_age_s is not None and self._clock() - self._segment_opened >= self.max_age_s
+
+    def _open(self) -> None:
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        uncompressed = None
+        if self.path.exists() and self.path.stat().st_size:
+            if not self.compression:
+                _truncate_torn_line(self.path)
+            else:
+                # max_bytes counts uncompressed JSONL, so a resumed segment is measured the same way.
+                uncompressed = _uncompressed_size(self.path)
+                if uncompressed is None:
+                    damaged = self._next_rotated_name()
+                    logger.warning("Rotating %s to %s: it ends in a damaged compressed block", self.path, damaged)
+                    os.replace(self.path, damaged)
+                    self.rotations += 1
+        raw = self.path.open("ab")
+        self._raw = raw
+        self._segment_bytes = raw.tell() if uncompressed is None else uncompressed
+        self._segment_opened = self._clock()
+        if self.compression == "gzip":
+            # Appending starts a new gzip member; readers treat members as one stream.
+            self._writer = gzip.GzipFile(fileobj=raw, mode="ab")
+        elif self.compression == "zstd":
+            import zstandard  # type: ignore
+
+            self._writer = zstandard.ZstdCompressor().stream_writer(raw, closefd=False)
+        else:
+            self._writer = raw
+
+    def _flush(self, sync: bool) -> None:
+        assert self._writer is not None and self._raw is not None
+        self._writer.flush()
+        if self._writer is not self._raw:
+            self._raw.flush()
+        if sync:
+            os.fsync(self._raw.fileno())
+
+    def _rotate(self) -> None:
+        self._close()
+        os.replace(self.path, self._next_rotated_name())
+        self.rotations += 1
+        self._open()
+
+    def _next_rotated_name(self) -> Path:
+        index = 1
+        pattern = _segment_pattern(self.path)
+        for segment in segment_paths(str(self.path)):
+            match = pattern.match(segment.name)
+            if match:
+                index = max(index, int(match.group(1)) + 1)
+        return _rotated_name(self.path, index)
+
+    def _close(self) -> None:
+        if self._writer is None:
+            return
+        assert self._raw is not None
+        if self._writer is not self._raw:
+            self._writer.close()
+        self._raw.flush()
+        if self.fsync != "never":
+            os.fsync(self._raw.fileno())
+        self._raw.close()
+        self._writer = None
+        self._raw = None
+
+
+def record_sink_for(path: str) -> RecordSink:
+    """Sink for `path` configured from RECORD_SINK_* environment variables.
+
+    Sinks append across runs, so a `.json` path, which used to hold one
+    JSON array rewritten per run, is redirected to `.jsonl`.
+    """
+    if path.endswith(".json"):
+        logger.info("Appending records to %sl as JSONL instead of %s", path, path)
+        path += "l"
+    max_bytes = os.getenv("RECORD_SINK_MAX_BYTES")
+    max_age_s = os.getenv("RECORD_SINK_MAX_AGE_S")
+    return RecordSink(
+        path,
+        compression=os.getenv("RECORD_SINK_COMPRESSION") or None,
+        max_bytes=int(max_bytes) if max_bytes else None,
+        max_age_s=float(max_age_s) if max_age_s else None,
+        fsync=os.getenv("RECORD_SINK_FSYNC", "flush"),
+    )
+
+
+def _open_segment(path: Path) -> BinaryIO:
+    if path.suffix == ".gz":
+        return gzip.open(path, "rb")  # type: ignore[return-value]
+    if path.suffix == ".zst":
+        import zstandard  # type: ignore
+
+        return io.BufferedReader(
+            zstandard.ZstdDecompressor().stream_reader(path.open("rb"), read_across_frames=True, closefd=True)
+        )
+    return path.open("rb")
+
+
+def _decode_errors(path: Path) -> tuple:
+    """Exceptions raised while reading a segment whose compressed stream is truncated or corrupt."""
+    if path.suffix == ".zst":
+        import zstandard  # type: ignore
+
+        return (EOFError, OSError, zstandard.ZstdError)
+    # gzip.BadGzipFile is an OSError.
+    return (EOFError, OSError, zlib.error)
+
+
+def _uncompressed_size(path: Path) -> Optional[int]:
+    """Decoded size of a compressed segment, or None if it does not decode to the end."""
+    size = 0
+    try:
+        with _open_segment(path) as handle:
+            for block in iter(lambda: handle.read(1 << 20), b""):
+                size += len(block)
+    except _decode_errors(path):
+        return None
+    return size
+
+
+def _truncate_torn_line(path: Path) -> None:
+    """Cut a plain segment back to its last newline, dropping a partial record left by a crash."""
+    with path.open("r+b") as handle:
+        end = handle.seek(0, os.SEEK_END)
+        position = end
+        while position > 0:
+            start = max(0, position - (1 << 16))
+            handle.seek(start)
+            block = handle.read(position - start)
+            newline = block.rfind(b"\n")
+            if newline != -1:
+                position = start + newline + 1
+                break
+            position = start
+        if position < end:
+            logger.warning("Dropping %d bytes of torn record at the end of %s", end - position, path)
+            handle.truncate(position)
+
+
+def iter_records(path: str, include_rotated: bool = True) -> Iterator[Dict[str, Any]]:
+    """Stream records back from a sink's files, oldest segment first.
+
+    `path` is the sink path (with its compression suffix). Damage left by
+    a crash does not fail the whole read: undecodable lines are skipped,
+    and a truncated or corrupt compressed stream ends that segment, each
+    with a warning.
+    """
+    segments = segment_paths(path) if include_rotated else [Path(path)]
+    for segment in segments:
+        try:
+            with _open_segment(segment) as handle:
+                for line in handle:
+                    if not line.strip():
+                        continue
+                    try:
+                        yield json.loads(line)
+                    except ValueError:
+                        logger.warning("Skipping undecodable record in %s", segment)
+        except _decode_errors(segment):
+            logger.warning("Record segment %s ends in a truncated or corrupt compressed block", segment)
@@ -2,14 +2,18 @@
 
 from __future__ import annotations
 
-import json
 import logging
 import os
 from dataclasses import dataclass, field, asdict
-from pathlib import Path
 from typing import List, Optional
 
-from models.elasticsearch_client import ElasticsearchClient, ElasticsearchError, get_default_elasticsearch_client
+from models.elasticsearch_client import (
+    BulkIndexer,
+    ElasticsearchClient,
+    bulk_indexer_for,
+    get_default_elasticsearch_client,
+)
+from models.record_sink import RecordSink, record_sink_for
 
 logger = logging.getLogger(__name__)
 
@@ -26,13 +30,27 @@ class RunSummaryEntry:
 
 @dataclass
 class RunSummary:
+    """Run summary entries, appended to a JSONL sink across runs.
+
+    Entries added before a sink exists (no `output_path` yet) wait in
+    `entries` until the first `flush(output_path)`; after that they are
+    written as they arrive.
+    """
+
     entries: List[RunSummaryEntry] = field(default_factory=list)
     es_client: Optional[ElasticsearchClient] = field(default=None, repr=False)
     index_name: str = field(default_factory=lambda: os.getenv("ELASTICSEARCH_INDEX_RUNS", "pipeline-run-summary"))
+    es_indexer: Optional[BulkIndexer] = field(default=None, repr=False)
+    output_path: Optional[str] = None
+    sink: Optional[RecordSink] = field(default=None, repr=False)
 
     def __post_init__(self) -> None:
         if self.es_client is None:
             self.es_client = get_default_elasticsearch_client()
+        if self.es_indexer is None and self.es_client is not None:
+            self.es_indexer = bulk_indexer_for(self.es_client)
+        if self.sink is None and self.output_path is not None:
+            self.sink = record_sink_for(self.output_path)
 
     def add_entry(
         self,
@@ -51,19 +69,26 @@ class RunSummary:
             fallback_events=fallback_events,
             validation_status=validation_status,
         )
-        self.entries.append(entry)
+        if self.sink is not None:
+            self.sink.write(asdict(entry))
+        else:
+            self.entries.append(entry)
         self._index_entry(entry)
 
-    def flush(self, output_path: str) -> None:
-        path = Path(output_path)
-        path.parent.mkdir(parents=True, exist_ok=True)
-        payload = [asdict(entry) for entry in self.entries]
-        path.write_text(json.dumps(payload, indent=2), encoding="utf-8")
+    def flush(self, output_path: Optional[str] = None) -> None:
+        if self.sink is None:
+            if output_path is None:
+                raise ValueError("RunSummary has no output path to flush to")
+            self.output_path = output_path
+            self.sink = record_sink_for(output_path)
+        self.sink.write_many(asdict(entry) for entry in self.entries)
+        self.entries.clear()
+        self.sink.flush()
+
+    def close(self) -> None:
+        if self.sink is not None:
+            self.sink.close()
 
     def _index_entry(self, entry: RunSummaryEntry) -> None:
-        if not self.es_client:
-            return
-        try:
-            self.es_client.index_document(self.index_name, asdict(entry))
-        except ElasticsearchError as exc:
-            logger.warning("Failed to index run summary entry: %s", exc)
+        if self.es_indexer:
+            self.es_indexer.submit(self.index_name, asdict(entry))
@@ -4,7 +4,10 @@ from __future__ import annotations
 
 from dataclasses import dataclass, field
 import re
-from typing import Iterable, List, Optional, Protocol
+from typing import Dict, Iterable, Iterator, List, Optional, Pattern, Protocol, Sequence
+
+# Joins paragraphs for batch cleaning; banned phrases never span it.
+_BATCH_SEPARATOR = "\x00"
 
 
 class SectionLike(Protocol):
@@ -18,25 +21,107 @@ class NormalizedSection:
     paragraphs: List[str] = field(default_factory=list)
 
 
+def compile_phrase_pattern(phrases: Iterable[str]) -> Optional[Pattern[str]]:
+    """Compile phrases into one case-insensitive trie-shaped alternation.
+
+    Shared prefixes are factored out, so the regex engine walks the phrase set
+    like an automaton instead of retrying every phrase at each position, and the
+    longest phrase wins when several start at the same offset.
+    """
+    trie: Dict[str, dict] = {}
+    for phrase in phrases:
+        normalized = " ".join(phrase.split()).lower()
+        if not normalized:
+            continue
+        node = trie
+        for char in normalized:
+            node = node.setdefault(char, {})
+        node[""] = {}
+    if not trie:
+        return None
+    return re.compile(_trie_pattern(trie), re.IGNORECASE)
+
+
+def _trie_pattern(node: Dict[str, dict]) -> str:
+    terminal = "" in node
+    branches = [re.escape(char) + _trie_pattern(child) for char, child in sorted(node.items()) if char]
+    if not branches:
+        return ""
+    if len(branches) == 1 and not terminal:
+        return branches[0]
+    body = "(?:" + "|".join(branches) + ")"
+    return body + "?" if terminal else body
+
+
+class CleaningEngine:
+    """Collapses whitespace and strips banned phrases with a single compiled matcher."""
+
+    def __init__(self, banned_phrases: Optional[Iterable[str]] = None) -> None:
+        self.pattern = compile_phrase_pattern(banned_phrases or [])
+
+    def clean(self, paragraph: str) -> str:
+        collapsed = " ".join(paragraph.split())
+        if self.pattern is None:
+            return collapsed
+        removed, count = self.pattern.subn("", collapsed)
+        if not count:
+            return collapsed
+        return " ".join(removed.split())
+
+    def clean_many(self, paragraphs: Sequence[str]) -> List[str]:
+        """Clean a whole document's paragraphs with one matcher scan over the joined text."""
+        collapsed = [" ".join(paragraph.split()) for paragraph in paragraphs]
+        if self.pattern is None or not collapsed:
+            return collapsed
+        joined = _BATCH_SEPARATOR.join(collapsed)
+        if joined.count(_BATCH_SEPARATOR) != len(collapsed) - 1:
+            # The separator occurs in the input itself; fall back to per-paragraph cleaning.
+            return [self.clean(paragraph) for paragraph in paragraphs]
+        removed, count = self.pattern.subn("", joined)
+        if not count:
+            return collapsed
+        cleaned = removed.split(_BATCH_SEPARATOR)
+        return [
+            " ".join(after.split()) if len(after) != len(before) else after
+            for before, after in zip(collapsed, cleaned)
+        ]
+
+
 class TextCleaner:
     """Cleans extracted text to keep LLM context windows efficient."""
 
     def __init__(self, min_paragraph_length: int = 25, banned_phrases: Optional[Iterable[str]] = None) -> None:
         self.min_paragraph_length = min_paragraph_length
-        self.banned_patterns = [re.compile(re.escape(p), re.IGNORECASE) for p in (banned_phrases or [])]
+        self.engine = CleaningEngine(banned_phrases)
 
     def normalize_sections(self, sections: Iterable[SectionLike]) -> List[NormalizedSection]:
-        normalized: List[NormalizedSection] = []
+        return list(self.iter_normalized_sections(sections))
+
+    def iter_normalized_sections(self, sections: Iterable[SectionLike]) -> Iterator[NormalizedSection]:
+        """Clean sections one at a time so extractor generators can stream through."""
         for section in sections:
-            clean_paragraphs = [self._clean_paragraph(p) for p in section.paragraphs]
-            clean_paragraphs = [p for p in clean_paragraphs if len(p) >= self.min_paragraph_length]
-            if not clean_paragraphs:
-                continue
-            normalized.append(NormalizedSection(title=section.title, paragraphs=clean_paragraphs))
-        return normalized
+            normalized = self._normalize_section(section.title, self.engine.clean_many(section.paragraphs))
+            if normalized:
+                yield normalized
+
+    def normalize_documents(self, documents: Iterable[Iterable[SectionLike]]) -> List[List[NormalizedSection]]:
+        """Batch variant that cleans every paragraph of a document in one engine call."""
+        results: List[List[NormalizedSection]] = []
+        for sections in documents:
+            section_list = list(sections)
+            flat = [paragraph for section in section_list for paragraph in section.paragraphs]
+            cleaned = iter(self.engine.clean_many(flat))
+            normalized: List[NormalizedSection] = []
+            for section in section_list:
+                paragraphs = [next(cleaned) for _ in section.paragraphs]
+                entry = self._normalize_section(section.title, paragraphs)
+                if entry:
+                    normalized.append(entry)
+            results.append(normalized)
+        return results
 
     def as_llm_ready_text(self, sections: Iterable[SectionLike]) -> str:
-        normalized = self.normalize_sections(sections)
+        normalized = self.iter_normalized_sections(sections)
         chunks: List[str] = []
         for section in normalized:
             if section.title:
@@ -44,9 +129,11 @@ class TextCleaner:
             chunks.extend(section.paragraphs)
         return "\n\n".join(chunks)
 
+    def _normalize_section(self, title: Optional[str], paragraphs: List[str]) -> Optional[NormalizedSection]:
+        clean_paragraphs = [p for p in paragraphs if len(p) >= self.min_paragraph_length]
+        if not clean_paragraphs:
+            return None
+        return NormalizedSection(title=title, paragraphs=clean_paragraphs)
+
     def _clean_paragraph(self, paragraph: str) -> str:
-        collapsed = " ".join(paragraph.split())
-        for pattern in self.banned_patterns:
-            collapsed = pattern.sub("", collapsed)
-        collapsed = re.sub(r"\s{2,}", " ", collapsed)
-        return collapsed.strip()
+        return self.engine.clean(paragraph)
@@ -2,11 +2,28 @@
 
 from __future__ import annotations
 
+import re
 from dataclasses import dataclass, field
-from typing import Iterable, List, Optional
+from itertools import islice
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
 
 from bs4 import BeautifulSoup, Tag  # type: ignore
 
+BOILERPLATE_TAGS = ("script", "style", "nav", "footer", "header", "aside", "noscript")
+BOILERPLATE_TOKENS = ("sidebar", "navigation", "cookie", "share", "advertisement")
+
+# Markup the lxml backend checks its parse against: comments and declarations are
+# skipped, and group 1/2/3 are the end-tag slash, the tag name and the attributes.
+_MARKUP = re.compile(r"""<!--.*?-->|<![^>]*>|<\?[^>]*>|<(/?)([A-Za-z][^\s/>]*)((?:[^>"']|"[^"]*"|'[^']*')*)>""", re.S)
+_VOID_TAGS = frozenset(
+    ("area", "base", "br", "col", "embed", "hr", "img", "input", "link", "meta", "param", "source", "track", "wbr")
+)
+_RAW_TEXT_TAGS = ("script", "style")
+# Implied by lxml when missing, so they are left out of the comparison.
+_DOCUMENT_TAGS = frozenset(("html", "head", "body"))
+_HEAD_TAGS = frozenset(("html", "head", "title", "meta", "link", "base", "script", "style", "noscript", "template"))
+TagEvent = Tuple[bool, str]  # (is start tag, lowercased name)
+
 
 @dataclass
 class HtmlSection:
@@ -15,16 +32,77 @@ class HtmlSection:
 
 
 class HtmlExtractor:
-    """Converts HTML documents into structured text without UI boilerplate."""
+    """Converts HTML documents into structured text without UI boilerplate.
+
+    The "lxml" backend streams sections and yields the same sections as
+    "bs4". Where markup relies on implied end tags or misplaced elements
+    (unclosed <p>, a <p> inside a heading, content outside <body>), lxml
+    restructures the tree the way browsers do while bs4's html.parser keeps
+    the source nesting. lxml's tag events are therefore checked against the
+    page's explicit tags, and at the first disagreement the rest of the page
+    comes from bs4. `last_backend` records which backend finished the last
+    page.
+    """
+
+    BACKENDS = ("bs4", "lxml")
+    # Only sizes the reads of the streaming parser.
+    FINGERPRINT_EXCLUDE = ("feed_chunk_chars",)
 
-    def __init__(self, allowed_headings: Optional[Iterable[str]] = None) -> None:
+    def __init__(
+        self,
+        allowed_headings: Optional[Iterable[str]] = None,
+        backend: str = "bs4",
+        feed_chunk_chars: int = 64 * 1024,
+    ) -> None:
+        if backend not in self.BACKENDS:
+            raise ValueError(f"Unknown HTML backend {backend}")
         self.allowed_headings = {name.lower() for name in (allowed_headings or ["h1", "h2", "h3"])}
+        self.backend = backend
+        self.feed_chunk_chars = feed_chunk_chars
+        self.last_backend: Optional[str] = None
 
     def extract(self, html: str) -> List[HtmlSection]:
+        return list(self.iter_sections(html))
+
+    def iter_sections(self, html: str) -> Iterator[HtmlSection]:
+        """Yield sections as soon as the next heading (or the end of the page) closes them."""
+        if self.backend == "lxml":
+            return self._iter_sections_lxml(html)
+        self.last_backend = "bs4"
+        return self._iter_sections_bs4(html)
+
+    def _iter_sections_lxml(self, html: str) -> Iterator[HtmlSection]:
+        from lxml import etree  # type: ignore
+
+        self.last_backend = "lxml"
+        expected = _explicit_tag_events(html)
+        if expected is None:
+            self.last_backend = "bs4"
+            yield from self._iter_sections_bs4(html)
+            return
+        target = _StreamingSectionTarget(self.allowed_headings, expected)
+        parser = etree.HTMLParser(target=target)
+        yielded = 0
+        for start in range(0, len(html), self.feed_chunk_chars):
+            parser.feed(html[start : start + self.feed_chunk_chars])
+            if target.diverged:
+                break
+            for section in target.drain():
+                yielded += 1
+                yield section
+        else:
+            parser.close()
+            if not target.diverged:
+                yield from target.drain()
+                return
+        # Sections already yielded were closed before the parses disagreed, so bs4 has them too.
+        self.last_backend = "bs4"
+        yield from islice(self._iter_sections_bs4(html), yielded, None)
+
+    def _iter_sections_bs4(self, html: str) -> Iterator[HtmlSection]:
         soup = BeautifulSoup(html, "html.parser")
         self._drop_boilerplate(soup)
 
-        sections: List[HtmlSection] = []
         current = HtmlSection()
 
         for node in soup.body.descendants if soup.body else soup.descendants:
@@ -33,7 +111,7 @@ class HtmlExtractor:
                 if not text:
                     continue
                 if current.title or current.paragraphs:
-                    sections.append(current)
+                    yield current
                 current = HtmlSection(title=text)
                 continue
 
@@ -43,17 +121,17 @@ class HtmlExtractor:
                     current.paragraphs.append(text)
 
         if current.title or current.paragraphs:
-            sections.append(current)
-
-        return sections
+            yield current
 
     def _drop_boilerplate(self, soup: BeautifulSoup) -> None:
-        for tag_name in ["script", "style", "nav", "footer", "header", "aside", "noscript"]:
+        for tag_name in BOILERPLATE_TAGS:
             for tag in soup.find_all(tag_name):
                 tag.decompose()
 
-        boilerplate_tokens = {"sidebar", "navigation", "cookie", "share", "advertisement"}
         for tag in list(soup.find_all(True)):
+            if tag.decomposed:
+                # Already removed together with a boilerplate ancestor.
+                continue
             bucket = []
             for attr in ("class", "id"):
                 value = tag.get(attr)
@@ -61,7 +139,7 @@ class HtmlExtractor:
                     bucket.append(value.lower())
                 elif isinstance(value, list):
                     bucket.extend(v.lower() for v in value if isinstance(v, str))
-            if any(token in " ".join(bucket) for token in boilerplate_tokens):
+            if any(token in " ".join(bucket) for token in BOILERPLATE_TOKENS):
                 tag.decompose()
 
     @staticmethod
@@ -70,3 +148,153 @@ class HtmlExtractor:
             return ""
         collapsed = " ".join(value.split())
         return collapsed
+
+
+class _StreamingSectionTarget:
+    """lxml parser target that prunes boilerplate subtrees and folds sections in one walk.
+
+    Headings and paragraphs are ordered by their start tag, like the bs4
+    descendant walk; their text is only known at the end tag, so records are
+    held until no capture is open and then folded into sections.
+    """
+
+    def __init__(self, allowed_headings: Iterable[str], expected: Optional[List[TagEvent]] = None) -> None:
+        self.allowed_headings = set(allowed_headings)
+        # Set at the first tag event that differs from `expected`; later events are ignored.
+        self.diverged = False
+        self._expected = iter(expected) if expected is not None else None
+        self._skip_depth = 0
+        self._open: List[Optional[List[str]]] = []
+        self._captures: List[List[str]] = []
+        self._pending: List[List[object]] = []
+        self._current = HtmlSection()
+        self._ready: List[HtmlSection] = []
+
+    def start(self, tag: str, attrib: Dict[str, str]) -> None:
+        if not self._matches(True, tag):
+            return
+        if self._skip_depth:
+            self._skip_depth += 1
+            return
+        name = tag.lower()
+        if name == "head" or self._is_boilerplate(name, attrib):
+            self._skip_depth = 1
+            return
+
+        if name in self.allowed_headings or name == "p":
+            parts: List[str] = []
+            self._pending.append(["heading" if name in self.allowed_headings else "paragraph", parts])
+            self._captures.append(parts)
+            self._open.append(parts)
+        else:
+            self._open.append(None)
+
+    def end(self, tag: str) -> None:
+        if not self._matches(False, tag):
+            return
+        if self._skip_depth:
+            self._skip_depth -= 1
+            return
+        if not self._open:
+            return
+        parts = self._open.pop()
+        if parts is None:
+            return
+        self._captures.pop()
+        if not self._captures:
+            self._fold_pending()
+
+    def data(self, text: str) -> None:
+        if self._skip_depth or self.diverged:
+            return
+        for parts in self._captures:
+            parts.append(text)
+
+    def close(self) -> None:
+        if self._expected is not None and next(self._expected, None) is not None:
+            self.diverged = True
+        if self.diverged:
+            return
+        self._fold_pending()
+        if self._current.title or self._current.paragraphs:
+            self._ready.append(self._current)
+            self._current = HtmlSection()
+
+    def drain(self) -> List[HtmlSection]:
+        ready, self._ready = self._ready, []
+        return ready
+
+    def _matches(self, is_start: bool, tag: str) -> bool:
+        if self.diverged:
+            return False
+        name = tag.lower()
+        if self._expected is not None and name not in _DOCUMENT_TAGS:
+            if next(self._expected, None) != (is_start, name):
+                self.diverged = True
+                return False
+        return True
+
+    def _fold_pending(self) -> None:
+        for kind, parts in self._pending:
+            text = HtmlExtractor._clean_text("".join(parts))  # type: ignore[arg-type]
+            if not text:
+                continue
+            if kind == "heading":
+                if self._current.title or self._current.paragraphs:
+                    self._ready.append(self._current)
+                self._current = HtmlSection(title=text)
+            else:
+                self._current.paragraphs.append(text)
+        self._pending = []
+
+    @staticmethod
+    def _is_boilerplate(name: str, attrib: Dict[str, str]) -> bool:
+        if name in BOILERPLATE_TAGS:
+            return True
+        bucket = [" ".join(attrib[attr].lower().split()) for attr in ("class", "id") if attrib.get(attr)]
+        if not bucket:
+            return False
+        joined = " ".join(bucket)
+        return any(token in joined for token in BOILERPLATE_TOKENS)
+
+
+def _explicit_tag_events(html: str) -> Optional[List[TagEvent]]:
+    """Start and end tags as written in `html`, without html/head/body, for checking lxml's parse.
+
+    Void elements and self-closing tags count as a start and an end, as in
+    bs4. Returns None when the page has elements outside an explicit <body>,
+    which bs4 skips but lxml moves into the body.
+    """
+    events: List[TagEvent] = []
+    lowered = html.lower()
+    has_body = "<body" in lowered
+    in_body: Optional[bool] = None  # None until an explicit <body>, False after </body>
+    position = 0
+    while True:
+        match = _MARKUP.search(html, position)
+        if match is None:
+            return events
+        position = match.end()
+        name = match.group(2)
+        if name is None:
+            continue
+        name = name.lower()
+        if match.group(1):
+            if name == "body":
+                in_body = False
+            elif name not in _DOCUMENT_TAGS and name not in _VOID_TAGS:
+                events.append((False, name))
+            continue
+        if name == "body":
+            in_body = True
+            continue
+        if in_body is False or (in_body is None and has_body and name not in _HEAD_TAGS):
+            return None
+        if name in _DOCUMENT_TAGS:
+            continue
+        events.append((True, name))
+        if name in _VOID_TAGS or match.group(3).rstrip().endswith("/"):
+            events.append((False, name))
+        elif name in _RAW_TEXT_TAGS:
+            close = lowered.find(f"</{name}", position)
+            position = len(html) if close == -1 else close
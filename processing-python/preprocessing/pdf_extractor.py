@@ -2,11 +2,22 @@
 
 from __future__ import annotations
 
+import logging
+import time
+from concurrent.futures import ProcessPoolExecutor
+from itertools import chain, repeat
 from dataclasses import dataclass, field
-from typing import List, Optional
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
 
 from pdfminer.high_level import extract_pages  # type: ignore
 from pdfminer.layout import LAParams, LTChar, LTTextContainer  # type: ignore
+from pdfminer.pdfpage import PDFPage  # type: ignore
+
+logger = logging.getLogger(__name__)
+
+# Page elements are exchanged between worker processes as plain tuples so they
+# pickle cheaply: ("heading" | "paragraph", text).
+PageElement = Tuple[str, str]
 
 
 @dataclass
@@ -15,49 +26,174 @@ class Section:
     paragraphs: List[str] = field(default_factory=list)
 
 
+@dataclass
+class ExtractionStats:
+    documents: int
+    pages: int
+    elapsed_s: float
+
+    @property
+    def pages_per_second(self) -> float:
+        if self.elapsed_s <= 0:
+            return 0.0
+        return self.pages / self.elapsed_s
+
+
+@dataclass
+class CorpusExtraction:
+    sections: Dict[str, List[Section]]
+    stats: ExtractionStats
+
+
 class PdfExtractor:
     """Extracts structured text from PDFs while removing boilerplate segments."""
 
-    def __init__(self, header_footer_margin: float = 40.0, laparams: Optional[LAParams] = None) -> None:
+    # Parallelism settings; the output does not depend on them.
+    FINGERPRINT_EXCLUDE = ("workers", "pages_per_shard")
+
+    def __init__(
+        self,
+        header_footer_margin: float = 40.0,
+        laparams: Optional[LAParams] = None,
+        workers: int = 1,
+        pages_per_shard: int = 16,
+    ) -> None:
         self.header_footer_margin = header_footer_margin
         self.laparams = laparams or LAParams(line_overlap=0.5, char_margin=2.0, line_margin=0.5)
+        self.workers = max(1, workers)
+        self.pages_per_shard = max(1, pages_per_shard)
+        self.last_stats: Optional[ExtractionStats] = None
 
     def extract(self, pdf_path: str) -> List[Section]:
-        sections: List[Section] = []
-        current = Section()
+        started = time.perf_counter()
+        page_count = self.count_pages(pdf_path)
+        sections = list(self._fold_sections(self._iter_elements(pdf_path, page_count)))
+        self.last_stats = ExtractionStats(documents=1, pages=page_count, elapsed_s=time.perf_counter() - started)
+        logger.info(
+            "Extracted %s pages from %s at %.1f pages/s",
+            page_count,
+            pdf_path,
+            self.last_stats.pages_per_second,
+        )
+        return sections
 
-        for page_layout in extract_pages(pdf_path, laparams=self.laparams):
-            height = getattr(page_layout, "height", None)
-            for element in page_layout:
-                if not isinstance(element, LTTextContainer):
-                    continue
+    def iter_sections(self, pdf_path: str) -> Iterator[Section]:
+        """Yield sections as soon as the next heading (or the end of the file) closes them."""
+        page_count = self.count_pages(pdf_path) if self.workers > 1 else 0
+        yield from self._fold_sections(self._iter_elements(pdf_path, page_count))
+
+    def extract_many(self, pdf_paths: Iterable[str]) -> CorpusExtraction:
+        """Extract a corpus, scheduling page shards of all documents on one pool."""
+        started = time.perf_counter()
+        paths = list(pdf_paths)
+        page_counts = {path: self.count_pages(path) for path in paths}
+        shards_by_path = {path: self._shard_pages(count) for path, count in page_counts.items()}
+
+        with ProcessPoolExecutor(max_workers=self.workers) as pool:
+            futures = {
+                path: [
+                    pool.submit(_extract_page_elements, path, shard, self.header_footer_margin, self.laparams)
+                    for shard in shards
+                ]
+                for path, shards in shards_by_path.items()
+            }
+            sections = {
+                path: list(
+                    self._fold_sections(
+                        chain.from_iterable(future.result() for future in path_futures)
+                    )
+                )
+                for path, path_futures in futures.items()
+            }
+
+        stats = ExtractionStats(
+            documents=len(paths),
+            pages=sum(page_counts.values()),
+            elapsed_s=time.perf_counter() - started,
+        )
+        self.last_stats = stats
+        logger.info(
+            "Extracted %s documents (%s pages) at %.1f pages/s",
+            stats.documents,
+            stats.pages,
+            stats.pages_per_second,
+        )
+        return CorpusExtraction(sections=sections, stats=stats)
 
-                if height is not None and (
-                    element.y1 > height - self.header_footer_margin or element.y0 < self.header_footer_margin
+    @staticmethod
+    def count_pages(pdf_path: str) -> int:
+        with open(pdf_path, "rb") as handle:
+            return sum(1 for _ in PDFPage.get_pages(handle))
+
+    def _shard_pages(self, page_count: int) -> List[List[int]]:
+        return [
+            list(range(start, min(page_count, start + self.pages_per_shard)))
+            for start in range(0, page_count, self.pages_per_shard)
+        ]
+
+    def _iter_elements(self, pdf_path: str, page_count: int) -> Iterator[PageElement]:
+        shards = self._shard_pages(page_count)
+        if self.workers > 1 and len(shards) > 1:
+            with ProcessPoolExecutor(max_workers=min(self.workers, len(shards))) as pool:
+                # map() hands results back in shard order while later shards are still running.
+                for elements in pool.map(
+                    _extract_page_elements,
+                    repeat(pdf_path),
+                    shards,
+                    repeat(self.header_footer_margin),
+                    repeat(self.laparams),
                 ):
-                    continue
-
-                text = element.get_text().strip()
-                if not text:
-                    continue
+                    yield from elements
+            return
 
-                if self._looks_like_heading(element):
-                    if current.title or current.paragraphs:
-                        sections.append(current)
-                    current = Section(title=" ".join(text.split()))
-                    continue
+        for page_layout in extract_pages(pdf_path, laparams=self.laparams):
+            yield from self._page_elements(page_layout, self.header_footer_margin)
 
-                normalized = self._normalize_paragraph(text)
-                if not normalized:
-                    continue
-                current.paragraphs.append(normalized)
+    @staticmethod
+    def _fold_sections(elements: Iterable[PageElement]) -> Iterator[Section]:
+        # Elements arrive in page order, so a section left open at the end of
+        # one shard keeps collecting paragraphs from the next one.
+        current = Section()
+        for kind, text in elements:
+            if kind == "heading":
+                if current.title or current.paragraphs:
+                    yield current
+                current = Section(title=text)
+                continue
+            current.paragraphs.append(text)
 
         if current.title or current.paragraphs:
-            sections.append(current)
-
-        return sections
-
-    def _looks_like_heading(self, container: LTTextContainer) -> bool:
+            yield current
+
+    @classmethod
+    def _page_elements(cls, page_layout, header_footer_margin: float) -> List[PageElement]:
+        elements: List[PageElement] = []
+        height = getattr(page_layout, "height", None)
+        for element in page_layout:
+            if not isinstance(element, LTTextContainer):
+                continue
+
+            if height is not None and (
+                element.y1 > height - header_footer_margin or element.y0 < header_footer_margin
+            ):
+                continue
+
+            text = element.get_text().strip()
+            if not text:
+                continue
+
+            if cls._looks_like_heading(element):
+                elements.append(("heading", " ".join(text.split())))
+                continue
+
+            normalized = cls._normalize_paragraph(text)
+            if not normalized:
+                continue
+            elements.append(("paragraph", normalized))
+        return elements
+
+    @classmethod
+    def _looks_like_heading(cls, container: LTTextContainer) -> bool:
         text = container.get_text().strip()
         if len(text) > 160 or len(text) < 3:
             return False
@@ -73,7 +209,7 @@ class PdfExtractor:
 
         avg_size = sum(chars) / len(chars)
         median_line_size = sorted(chars)[len(chars) // 2]
-        uppercase_ratio = self._uppercase_ratio(text)
+        uppercase_ratio = cls._uppercase_ratio(text)
 
         return uppercase_ratio > 0.6 or avg_size > median_line_size * 1.1
 
@@ -91,3 +227,17 @@ class PdfExtractor:
         if len(collapsed) < 10:
             return ""
         return collapsed
+
+
+def _extract_page_elements(
+    pdf_path: str,
+    page_numbers: Optional[List[int]],
+    header_footer_margin: float,
+    laparams: LAParams,
+) -> List[PageElement]:
+    """Run layout analysis for a page range; module-level so process pools can pickle it."""
+    elements: List[PageElement] = []
+    pages = set(page_numbers) if page_numbers is not None else None
+    for page_layout in extract_pages(pdf_path, page_numbers=pages, laparams=laparams):
+        elements.extend(PdfExtractor._page_elements(page_layout, header_footer_margin))
+    return elements
@@ -0,0 +1,230 @@
+"""On-disk cache for preprocessing output keyed by raw content hash."""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import logging
+import mmap
+import os
+import re
+import struct
+import tempfile
+from collections import OrderedDict
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Callable, List, Optional, Tuple
+
+from features.document_features import DocumentFeatures
+from preprocessing.cleaner import NormalizedSection
+
+logger = logging.getLogger(__name__)
+
+CACHE_MAGIC = b"PPC1"
+CACHE_FORMAT_VERSION = 1
+CACHE_SUFFIX = ".ppc"
+
+_HEADER = struct.Struct("<4sHI")  # magic, format version, section count
+_LENGTH = struct.Struct("<I")
+_NONE_MARKER = 0xFFFFFFFF
+
+
+@dataclass
+class CachedPreprocessing:
+    sections: List[NormalizedSection]
+    features: DocumentFeatures
+
+
+def content_hash(data: bytes) -> str:
+    """SHA-256 hex digest, identical to collector-go's dedup.ComputeHash."""
+    return hashlib.sha256(data).hexdigest()
+
+
+def hash_for_raw_path(path: str) -> str:
+    """Recover the content hash from a collector raw store path (raw/<hash>.bin)."""
+    return Path(path).stem
+
+
+def config_fingerprint(*components: Any) -> str:
+    """Fingerprint the public settings of extractors and cleaners that shape the output.
+
+    Settings a class lists in `FINGERPRINT_EXCLUDE` (parallelism and buffer
+    sizes that do not change the output) are left out, so changing them
+    keeps the cache warm.
+    """
+    payload = json.dumps(
+        [CACHE_FORMAT_VERSION, *(_canonical(component) for component in components)],
+        sort_keys=True,
+        separators=(",", ":"),
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()[:16]
+
+
+class PreprocessCache:
+    """Stores normalized sections and document features per content hash with an LRU size cap."""
+
+    def __init__(self, cache_dir: str, fingerprint: str, max_bytes: int = 512 * 1024 * 1024) -> None:
+        self.cache_dir = Path(cache_dir)
+        self.fingerprint = fingerprint
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        self._entries: "OrderedDict[Path, int]" = self._load_index()
+        self._total_bytes = sum(self._entries.values())
+
+    def get(self, digest: str) -> Optional[CachedPreprocessing]:
+        path = self._entry_path(digest)
+        if path not in self._entries:
+            # Entries written by other workers sharing the directory are adopted lazily.
+            if not path.exists():
+                self.misses += 1
+                return None
+            self._entries[path] = path.stat().st_size
+            self._total_bytes += self._entries[path]
+        try:
+            cached = self._read(path)
+        except (OSError, ValueError, struct.error) as exc:
+            logger.warning("Dropping unreadable preprocess cache entry %s: %s", path.name, exc)
+            self._remove(path)
+            self.misses += 1
+            return None
+        self._entries.move_to_end(path)
+        try:
+            os.utime(path)
+        except FileNotFoundError:
+            # Evicted by another worker after the read; the entry read is still valid.
+            self._total_bytes -= self._entries.pop(path, 0)
+        self.hits += 1
+        return cached
+
+    def put(self, digest: str, sections: List[NormalizedSection], features: DocumentFeatures) -> None:
+        path = self._entry_path(digest)
+        payload = self._encode(sections, features)
+        # A private temp file per writer, as several workers may share the directory.
+        fd, tmp_name = tempfile.mkstemp(dir=self.cache_dir, prefix=f".{path.stem}.", suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as handle:
+                handle.write(payload)
+            os.replace(tmp_name, path)
+        except BaseException:
+            try:
+                os.unlink(tmp_name)
+            except FileNotFoundError:
+                pass
+            raise
+
+        self._total_bytes -= self._entries.pop(path, 0)
+        self._entries[path] = len(payload)
+        self._total_bytes += len(payload)
+        self._evict()
+
+    def get_or_compute(
+        self,
+        digest: str,
+        compute: Callable[[], Tuple[List[NormalizedSection], DocumentFeatures]],
+    ) -> CachedPreprocessing:
+        cached = self.get(digest)
+        if cached is not None:
+            return cached
+        sections, features = compute()
+        sections = list(sections)
+        self.put(digest, sections, features)
+        return CachedPreprocessing(sections=sections, features=features)
+
+    @property
+    def total_bytes(self) -> int:
+        return self._total_bytes
+
+    def _entry_path(self, digest: str) -> Path:
+        return self.cache_dir / f"{digest}-{self.fingerprint}{CACHE_SUFFIX}"
+
+    def _load_index(self) -> "OrderedDict[Path, int]":
+        entries = []
+        for entry in os.scandir(self.cache_dir):
+            if entry.is_file() and entry.name.endswith(CACHE_SUFFIX):
+                stat = entry.stat()
+                entries.append((stat.st_mtime, Path(entry.path), stat.st_size))
+        entries.sort()
+        return OrderedDict((path, size) for _, path, size in entries)
+
+    def _evict(self) -> None:
+        while self._total_bytes > self.max_bytes and len(self._entries) > 1:
+            path = next(iter(self._entries))
+            self._remove(path)
+
+    def _remove(self, path: Path) -> None:
+        self._total_bytes -= self._entries.pop(path, 0)
+        try:
+            path.unlink()
+        except FileNotFoundError:
+            pass
+
+    @staticmethod
+    def _encode(sections: List[NormalizedSection], features: DocumentFeatures) -> bytes:
+        parts = [_HEADER.pack(CACHE_MAGIC, CACHE_FORMAT_VERSION, len(sections))]
+        parts.append(_pack_text(json.dumps(features.as_dict(), separators=(",", ":"))))
+        for section in sections:
+            parts.append(_pack_text(section.title) if section.title is not None else _LENGTH.pack(_NONE_MARKER))
+            parts.append(_LENGTH.pack(len(section.paragraphs)))
+            parts.extend(_pack_text(paragraph) for paragraph in section.paragraphs)
+        return b"".join(parts)
+
+    @staticmethod
+    def _read(path: Path) -> CachedPreprocessing:
+        with path.open("rb") as handle, mmap.mmap(handle.fileno(), 0, access=mmap.ACCESS_READ) as view:
+            magic, version, section_count = _HEADER.unpack_from(view, 0)
+            if magic != CACHE_MAGIC or version != CACHE_FORMAT_VERSION:
+                raise ValueError("unexpected cache header")
+            offset = _HEADER.size
+            features_json, offset = _unpack_text(view, offset)
+            sections: List[NormalizedSection] = []
+            for _ in range(section_count):
+                title, offset = _unpack_text(view, offset)
+                (paragraph_count,) = _LENGTH.unpack_from(view, offset)
+                offset += _LENGTH.size
+                paragraphs: List[str] = []
+                for _ in range(paragraph_count):
+                    paragraph, offset = _unpack_text(view, offset)
+                    paragraphs.append(paragraph or "")
+                sections.append(NormalizedSection(title=title, paragraphs=paragraphs))
+        features = DocumentFeatures(**json.loads(features_json or "{}"))
+        return CachedPreprocessing(sections=sections, features=features)
+
+
+def _pack_text(value: str) -> bytes:
+    encoded = value.encode("utf-8")
+    return _LENGTH.pack(len(encoded)) + encoded
+
+
+def _unpack_text(view: mmap.mmap, offset: int) -> Tuple[Optional[str], int]:
+    (length,) = _LENGTH.unpack_from(view, offset)
+    offset += _LENGTH.size
+    if length == _NONE_MARKER:
+        return None, offset
+    end = offset + length
+    if end > len(view):
+        raise ValueError("truncated cache entry")
+    return view[offset:end].decode("utf-8"), end
+
+
+def _canonical(value: Any) -> Any:
+    if value is None or isinstance(value, (bool, int, float, str)):
+        return value
+    if isinstance(value, re.Pattern):
+        return [value.pattern, value.flags]
+    if isinstance(value, (list, tuple)):
+        return [_canonical(item) for item in value]
+    if isinstance(value, (set, frozenset)):
+        return sorted(_canonical(item) for item in value)
+    if isinstance(value, dict):
+        return {str(key): _canonical(item) for key, item in value.items()}
+    if hasattr(value, "__dict__"):
+        excluded = set(getattr(value, "FINGERPRINT_EXCLUDE", ()))
+        state = {
+            key: _canonical(item)
+            for key, item in vars(value).items()
+            if not key.startswith(("_", "last_")) and key not in excluded
+        }
+        return {"type": type(value).__name__, "state": state}
+    return repr(value)
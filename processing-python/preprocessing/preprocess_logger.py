@@ -1,15 +1,19 @@
 from __future__ import annotations
 
-import json
 import logging
 import os
 from dataclasses import asdict, dataclass
-from pathlib import Path
 from typing import Iterable, List, Optional
 
 from preprocessing.cleaner import NormalizedSection
 from features.document_features import DocumentFeatures
-from models.elasticsearch_client import ElasticsearchClient, ElasticsearchError, get_default_elasticsearch_client
+from models.elasticsearch_client import (
+    BulkIndexer,
+    ElasticsearchClient,
+    bulk_indexer_for,
+    get_default_elasticsearch_client,
+)
+from models.record_sink import RecordSink, record_sink_for
 
 logger = logging.getLogger(__name__)
 
@@ -27,17 +31,19 @@ class PreprocessRecord:
 
 
 class PreprocessLogger:
-    """Collects preprocessing metrics and writes them as machine-readable JSON."""
+    """Appends preprocessing metrics to a machine-readable JSONL file, across runs."""
 
     def __init__(
         self,
         output_path: str,
         es_client: Optional[ElasticsearchClient] = None,
         index_name: Optional[str] = None,
+        sink: Optional[RecordSink] = None,
     ) -> None:
-        self.output_path = Path(output_path)
-        self.records: List[PreprocessRecord] = []
+        self.sink = sink or record_sink_for(output_path)
+        self.output_path = self.sink.path
         self.es_client = es_client or get_default_elasticsearch_client()
+        self.es_indexer: Optional[BulkIndexer] = bulk_indexer_for(self.es_client) if self.es_client else None
         self.index_name = index_name or os.getenv("ELASTICSEARCH_INDEX_PREPROCESS", "preprocess-records")
 
     def log_result(
@@ -59,14 +65,14 @@ class PreprocessLogger:
             financial_terms=features.financial_terms,
             errors=list(errors or []),
         )
-        self.records.append(record)
+        self.sink.write(asdict(record))
         self._index_record(record)
 
     def flush(self) -> None:
-        self.output_path.parent.mkdir(parents=True, exist_ok=True)
-        payload = [asdict(record) for record in self.records]
-        with self.output_path.open("w", encoding="utf-8") as handle:
-            json.dump(payload, handle, indent=2, ensure_ascii=False)
+        self.sink.flush()
+
+    def close(self) -> None:
+        self.sink.close()
 
     @staticmethod
     def _sections_to_text(sections: Iterable[NormalizedSection]) -> str:
@@ -78,9 +84,5 @@ class PreprocessLogger:
         return "\n".join(chunks)
 
     def _index_record(self, record: PreprocessRecord) -> None:
-        if not self.es_client:
-            return
-        try:
-            self.es_client.index_document(self.index_name, asdict(record))
-        except ElasticsearchError as exc:
-            logger.warning("Failed to index preprocess record: %s", exc)
+        if self.es_indexer:
+            self.es_indexer.submit(self.index_name, asdict(record))
@@ -2,12 +2,13 @@
 
 from __future__ import annotations
 
-from dataclasses import dataclass
-from typing import Iterable, Optional
-
-import langdetect  # type: ignore
+from dataclasses import dataclass, field
+from typing import Dict, Iterable, List, Optional
 
+from context.token_estimator import estimate_tokens_for_fragments
 from preprocessing.cleaner import NormalizedSection
+from preprocessing.language_detector import LanguageDetector, SectionSampler
+from preprocessing.term_scanner import TermMatches, TermScanner
 
 FINANCE_TERMS = {
     "revenue",
@@ -30,55 +31,94 @@ class StructureSignals:
     token_estimate: int
     sections: int
     financial_terms: bool
+    term_counts: Dict[str, int] = field(default_factory=dict)
+    term_offsets: Dict[str, List[int]] = field(default_factory=dict)
+    term_density: float = 0.0
+    section_languages: List[Optional[str]] = field(default_factory=list)
 
 
 class StructureDetector:
     """Derives structural metadata from normalized sections."""
 
-    def __init__(self, finance_terms: Optional[Iterable[str]] = None) -> None:
+    def __init__(
+        self,
+        finance_terms: Optional[Iterable[str]] = None,
+        language_sample_chars: int = 4_000,
+        language_sample_sections: int = 8,
+        per_section_language: bool = False,
+        section_sample_chars: int = 500,
+        language_seed: int = 0,
+        token_model: Optional[str] = None,
+    ) -> None:
         if finance_terms:
             self.finance_terms = {term.lower() for term in finance_terms}
         else:
             self.finance_terms = FINANCE_TERMS
+        self.language_sample_chars = language_sample_chars
+        self.language_sample_sections = language_sample_sections
+        self.per_section_language = per_section_language
+        self.section_sample_chars = section_sample_chars
+        self.language_seed = language_seed
+        self.token_model = token_model
+        self.term_scanner = TermScanner(self.finance_terms)
+        self.language_detector = LanguageDetector(seed=language_seed)
 
     def analyze(self, sections: Iterable[NormalizedSection]) -> StructureSignals:
-        aggregated_text = []
+        # Sections are consumed one at a time; only running counts and a bounded
+        # language sample are kept, so memory does not grow with document size.
+        sampler = SectionSampler(
+            max_chars=self.language_sample_chars,
+            max_sections=self.language_sample_sections,
+            seed=self.language_seed,
+        )
+        section_languages: List[Optional[str]] = []
+        character_count = 0
+        fragment_count = 0
+        token_estimate = 0
         section_count = 0
-        contains_finance = False
+        term_matches = TermMatches()
 
         for section in sections:
             section_count += 1
-            if section.title:
-                aggregated_text.append(section.title)
-            aggregated_text.extend(section.paragraphs)
-            if not contains_finance and self._has_financial_terms(section):
-                contains_finance = True
-
-        joined = "\n".join(aggregated_text)
-        language = self._detect_language(joined) if joined else None
-        character_count = len(joined)
-        token_estimate = self._estimate_tokens(joined)
+            fragments = [fragment for fragment in [section.title, *section.paragraphs] if fragment]
+            token_estimate += estimate_tokens_for_fragments(fragments, self.token_model)
+            for fragment in fragments:
+                # Offsets refer to the fragments joined by newlines.
+                self.term_scanner.update(term_matches, fragment, base_offset=character_count + fragment_count)
+                fragment_count += 1
+                character_count += len(fragment)
+            snippet = self._section_snippet(section, max(sampler.chars_per_section, self.section_sample_chars))
+            sampler.offer(snippet)
+            if self.per_section_language:
+                section_languages.append(self.language_detector.detect(snippet[: self.section_sample_chars]))
+
+        # Account for the newline separators of the previously joined text.
+        character_count += max(0, fragment_count - 1)
+        if self.per_section_language:
+            language = self.language_detector.dominant(section_languages)
+        else:
+            language = self.language_detector.detect(sampler.sample())
+        token_estimate = max(1, token_estimate)
 
         return StructureSignals(
             language=language,
             character_count=character_count,
             token_estimate=token_estimate,
             sections=section_count,
-            financial_terms=contains_finance,
+            financial_terms=term_matches.total > 0,
+            term_counts=term_matches.counts,
+            term_offsets=term_matches.offsets,
+            term_density=term_matches.density(),
+            section_languages=section_languages,
         )
 
-    def _has_financial_terms(self, section: NormalizedSection) -> bool:
-        haystack = " ".join(filter(None, [section.title, *section.paragraphs])).lower()
-        return any(term in haystack for term in self.finance_terms)
-
-    @staticmethod
-    def _detect_language(text: str) -> Optional[str]:
-        try:
-            return langdetect.detect(text)
-        except (langdetect.lang_detect_exception.LangDetectException, ValueError):  # type: ignore
-            return None
-
     @staticmethod
-    def _estimate_tokens(text: str) -> int:
-        # Rough heuristic aligned with 4 characters per token to keep compute light.
-        return max(1, len(text) // 4)
+    def _section_snippet(section: NormalizedSection, max_chars: int) -> str:
+        parts: List[str] = []
+        length = 0
+        for fragment in filter(None, [section.title, *section.paragraphs]):
+            if length >= max_chars:
+                break
+            parts.append(fragment)
+            length += len(fragment) + 1
+        return "\n".join(parts)[:max_chars]
@@ -0,0 +1,57 @@
+"""Single-pass multi-term scanning for domain vocabularies."""
+
+from __future__ import annotations
+
+from dataclasses import dataclass, field
+from typing import Dict, Iterable, List
+
+from preprocessing.cleaner import compile_phrase_pattern
+
+
+@dataclass
+class TermMatches:
+    counts: Dict[str, int] = field(default_factory=dict)
+    offsets: Dict[str, List[int]] = field(default_factory=dict)
+    scanned_chars: int = 0
+
+    @property
+    def total(self) -> int:
+        return sum(self.counts.values())
+
+    def density(self, per_chars: int = 1000) -> float:
+        """Matches per `per_chars` characters of scanned text."""
+        if self.scanned_chars <= 0:
+            return 0.0
+        return self.total * per_chars / self.scanned_chars
+
+
+class TermScanner:
+    """Finds every configured term in one pass using a compiled trie matcher.
+
+    Matching is case-insensitive and substring-based like the former `term in
+    text` checks; where terms overlap, the longest term starting at a position
+    is counted.
+    """
+
+    def __init__(self, terms: Iterable[str], record_offsets: bool = True) -> None:
+        self._canonical = {" ".join(term.split()).lower(): term for term in terms}
+        self._canonical.pop("", None)
+        self.pattern = compile_phrase_pattern(self._canonical)
+        self.record_offsets = record_offsets
+
+    def scan(self, text: str) -> TermMatches:
+        matches = TermMatches()
+        self.update(matches, text, base_offset=0)
+        return matches
+
+    def update(self, matches: TermMatches, text: str, base_offset: int) -> None:
+        """Accumulate matches for `text`, recording offsets relative to `base_offset`."""
+        matches.scanned_chars += len(text)
+        if self.pattern is None:
+            return
+        for match in self.pattern.finditer(text):
+            found = match.group(0).lower()
+            term = self._canonical.get(found, found)
+            matches.counts[term] = matches.counts.get(term, 0) + 1
+            if self.record_offsets:
+                matches.offsets.setdefault(term, []).append(base_offset + match.start())
@@ -2,16 +2,20 @@
 
 from __future__ import annotations
 
-import json
 import logging
 import os
 from dataclasses import asdict, dataclass, field
-from pathlib import Path
 from typing import Iterable, List, Optional
 
 from router.router_inputs import CandidateModel, RouterInputs
 from router.heuristic_router import RoutingDecision
-from models.elasticsearch_client import ElasticsearchClient, ElasticsearchError, get_default_elasticsearch_client
+from models.elasticsearch_client import (
+    BulkIndexer,
+    ElasticsearchClient,
+    bulk_indexer_for,
+    get_default_elasticsearch_client,
+)
+from models.record_sink import RecordSink, record_sink_for
 
 logger = logging.getLogger(__name__)
 
@@ -41,17 +45,19 @@ class DecisionLog:
 
 
 class RouterLogger:
-    """Collects routing decisions for auditability."""
+    """Collects routing decisions for auditability, appended to `output_path` as JSONL across runs."""
 
     def __init__(
         self,
         output_path: str,
         es_client: Optional[ElasticsearchClient] = None,
         index_name: Optional[str] = None,
+        sink: Optional[RecordSink] = None,
     ) -> None:
-        self.output_path = Path(output_path)
-        self.records: List[DecisionLog] = []
+        self.sink = sink or record_sink_for(output_path)
+        self.output_path = self.sink.path
         self.es_client = es_client or get_default_elasticsearch_client()
+        self.es_indexer: Optional[BulkIndexer] = bulk_indexer_for(self.es_client) if self.es_client else None
         self.index_name = index_name or os.getenv("ELASTICSEARCH_INDEX_ROUTER", "router-decisions")
 
     def record(self, inputs: RouterInputs, decision: RoutingDecision) -> None:
@@ -63,19 +69,15 @@ class RouterLogger:
             chosen_model=decision.model_id,
             candidates=candidate_logs,
         )
-        self.records.append(log_entry)
+        self.sink.write(log_entry.as_dict())
         self._index_record(log_entry)
 
     def flush(self) -> None:
-        self.output_path.parent.mkdir(parents=True, exist_ok=True)
-        payload = [record.as_dict() for record in self.records]
-        with self.output_path.open("w", encoding="utf-8") as handle:
-            json.dump(payload, handle, indent=2, ensure_ascii=False)
+        self.sink.flush()
+
+    def close(self) -> None:
+        self.sink.close()
 
     def _index_record(self, record: DecisionLog) -> None:
-        if not self.es_client:
-            return
-        try:
-            self.es_client.index_document(self.index_name, record.as_dict())
-        except ElasticsearchError as exc:
-            logger.warning("Failed to index router decision: %s", exc)
+        if self.es_indexer:
+            self.es_indexer.submit(self.index_name, record.as_dict())
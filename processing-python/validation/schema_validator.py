@@ -26,6 +26,7 @@ class SchemaValidator:
     def __init__(self, schema_path: str) -> None:
         with open(schema_path, "r", encoding="utf-8") as handle:
             schema = json.load(handle)
+        self.schema = schema
         self.validator = Draft7Validator(schema)
 
     def validate(self, payload: Any) -> ValidationResult:
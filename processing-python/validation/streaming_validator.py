@@ -0,0 +1,311 @@
+"""Incremental JSON parsing and schema checks for streamed LLM output."""
+
+from __future__ import annotations
+
+import re
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional, Union
+
+from validation.schema_validator import ValidationIssue
+
+_WHITESPACE = " \t\r\n"
+_SCALAR_CHARS = set("0123456789+-.eEtruefalsn")
+_LITERALS = ("true", "false", "null")
+_NUMBER = re.compile(r"-?(?:0|[1-9]\d*)(?:\.\d+)?(?:[eE][+-]?\d+)?")
+
+
+@dataclass
+class _Frame:
+    kind: str  # "object" or "array"
+    schema: Optional[Dict[str, Any]]
+    path: List[Union[str, int]]
+    state: str  # object: key|colon|value|comma ; array: value|comma
+    keys: List[str] = field(default_factory=list)
+    index: int = 0
+    pending_key: Optional[str] = None
+
+
+class StreamingJsonValidator:
+    """Consumes generated text chunk by chunk and reports problems as soon as they are certain.
+
+    Mirrors `JsonExtractor`: text before the root "{" (prose, code fences)
+    is skipped and text after the root object closes is ignored. A root
+    that opens inside a code fence, or at the very start of the output, is
+    the payload; one that opens in prose may just be a brace in the text,
+    so problems in it do not abort the generation but make the validator
+    look for the next "{" instead. Syntax errors are reported as `decode_error:<reason>`, schema problems with
+    the `SchemaValidator` issue types, checked against the Draft 7 keywords
+    that can be decided while streaming: `type` when a value starts,
+    `additionalProperties: false` and `enum` when a key or string ends,
+    and `required` when an object closes. The final payload should still go
+    through `JsonExtractor` and `SchemaValidator`.
+    """
+
+    def __init__(self, schema: Optional[Dict[str, Any]] = None) -> None:
+        self.schema = schema
+        self.issues: List[ValidationIssue] = []
+        self.started = False
+        self.complete = False
+        self.consumed_chars = 0
+        self._stack: List[_Frame] = []
+        self._string: Optional[List[str]] = None
+        self._string_is_key = False
+        self._string_schema: Optional[Dict[str, Any]] = None
+        self._string_path: List[Union[str, int]] = []
+        self._escape = False
+        self._scalar: Optional[List[str]] = None
+        # Scanning state before the root opens: backtick run, fence and prose seen.
+        self._backticks = 0
+        self._in_fence = False
+        self._seen_text = False
+        self._tentative = False
+        self._abandoned = False
+
+    @property
+    def failed(self) -> bool:
+        return bool(self.issues)
+
+    def feed(self, text: str) -> List[ValidationIssue]:
+        """Consume the next chunk of output and return the issues it revealed."""
+        before = len(self.issues)
+        for char in text:
+            if self.complete or self.failed:
+                break
+            self.consumed_chars += 1
+            self._consume(char)
+            if self._abandoned:
+                self._restart(char)
+        return self.issues[before:]
+
+    def _scan(self, char: str) -> None:
+        if char == "`":
+            self._backticks += 1
+            self._seen_text = True
+            return
+        if self._backticks >= 3:
+            self._in_fence = not self._in_fence
+        self._backticks = 0
+        if char == "{":
+            self.started = True
+            self._tentative = self._seen_text and not self._in_fence
+            self._open("object", self.schema, [])
+        elif char not in _WHITESPACE:
+            self._seen_text = True
+
+    def _restart(self, char: str) -> None:
+        # The prose brace was not the payload; scan on from the character that gave it away.
+        self.started = self.complete = self._tentative = self._abandoned = False
+        self._stack = []
+        self._string = None
+        self._scalar = None
+        self._escape = False
+        self._seen_text = True
+        self._scan(char)
+
+    def _consume(self, char: str) -> None:
+        if not self.started:
+            self._scan(char)
+            return
+
+        if self._string is not None:
+            self._consume_string(char)
+            return
+        if self._scalar is not None:
+            if char in _SCALAR_CHARS:
+                self._scalar.append(char)
+                return
+            self._finish_scalar()
+            if self.failed or self._abandoned:
+                return
+
+        if char in _WHITESPACE:
+            return
+        frame = self._stack[-1]
+        if frame.kind == "object":
+            self._consume_object(frame, char)
+        else:
+            self._consume_array(frame, char)
+
+    def _consume_object(self, frame: _Frame, char: str) -> None:
+        if frame.state == "key":
+            if char == '"':
+                self._begin_string(is_key=True)
+            elif char == "}" and not frame.keys:
+                self._close()
+            else:
+                self._syntax_error(f"expected property name, got {char!r}", frame.path)
+        elif frame.state == "colon":
+            if char == ":":
+                frame.state = "value"
+            else:
+                self._syntax_error(f"expected ':', got {char!r}", frame.path)
+        elif frame.state == "value":
+            key = frame.pending_key or ""
+            self._begin_value(char, self._property_schema(frame.schema, key), frame.path + [key])
+            frame.state = "comma"
+        elif frame.state == "comma":
+            if char == ",":
+                frame.state = "key"
+            elif char == "}":
+                self._close()
+            else:
+                self._syntax_error(f"expected ',' or '}}', got {char!r}", frame.path)
+
+    def _consume_array(self, frame: _Frame, char: str) -> None:
+        if frame.state == "value":
+            if char == "]" and frame.index == 0:
+                self._close()
+                return
+            self._begin_value(char, self._items_schema(frame.schema), frame.path + [frame.index])
+            frame.index += 1
+            frame.state = "comma"
+        elif frame.state == "comma":
+            if char == ",":
+                frame.state = "value"
+            elif char == "]":
+                self._close()
+            else:
+                self._syntax_error(f"expected ',' or ']', got {char!r}", frame.path)
+
+    def _begin_value(self, char: str, schema: Optional[Dict[str, Any]], path: List[Union[str, int]]) -> None:
+        if char == "{":
+            self._check_type("object", schema, path)
+            self._open("object", schema, path)
+        elif char == "[":
+            self._check_type("array", schema, path)
+            self._open("array", schema, path)
+        elif char == '"':
+            self._check_type("string", schema, path)
+            self._begin_string(is_key=False, schema=schema, path=path)
+        elif char in "-0123456789tfn":
+            # The first character already decides the type, except integer vs number.
+            if char == "t" or char == "f":
+                self._check_type("boolean", schema, path)
+            elif char == "n":
+                self._check_type("null", schema, path)
+            else:
+                self._check_type("number", schema, path, allow_integer=True)
+            self._scalar = [char]
+            self._string_schema = schema
+            self._string_path = path
+        else:
+            self._syntax_error(f"unexpected character {char!r}", path)
+
+    def _begin_string(
+        self,
+        is_key: bool,
+        schema: Optional[Dict[str, Any]] = None,
+        path: Optional[List[Union[str, int]]] = None,
+    ) -> None:
+        self._string = []
+        self._string_is_key = is_key
+        self._string_schema = schema
+        self._string_path = path or []
+        self._escape = False
+
+    def _consume_string(self, char: str) -> None:
+        assert self._string is not None
+        if self._escape:
+            self._escape = False
+            self._string.append(char)
+            return
+        if char == "\\":
+            self._escape = True
+            self._string.append(char)
+            return
+        if char in "\r\n":
+            self._syntax_error("unescaped line break in string", self._string_path)
+            return
+        if char != '"':
+            self._string.append(char)
+            return
+
+        value = "".join(self._string)
+        self._string = None
+        if self._string_is_key:
+            frame = self._stack[-1]
+            frame.pending_key = value
+            frame.keys.append(value)
+            frame.state = "colon"
+            self._check_property_allowed(frame, value)
+        else:
+            self._check_enum(value, self._string_schema, self._string_path)
+
+    def _finish_scalar(self) -> None:
+        assert self._scalar is not None
+        token = "".join(self._scalar)
+        self._scalar = None
+        path = self._string_path
+        if token in _LITERALS:
+            return
+        if not _NUMBER.fullmatch(token):
+            self._syntax_error(f"invalid literal {token!r}", path)
+            return
+        # Like Draft 7, 1.0 still counts as an integer.
+        if not float(token).is_integer():
+            self._check_type("number", self._string_schema, path)
+
+    def _open(self, kind: str, schema: Optional[Dict[str, Any]], path: List[Union[str, int]]) -> None:
+        self._stack.append(_Frame(kind=kind, schema=schema, path=path, state="key" if kind == "object" else "value"))
+
+    def _close(self) -> None:
+        frame = self._stack.pop()
+        if frame.kind == "object" and frame.schema:
+            for name in frame.schema.get("required", []):
+                if name not in frame.keys:
+                    self._issue(f"'{name}' is a required property", frame.path, "missing_field")
+        if not self._stack:
+            self.complete = True
+
+    def _check_type(
+        self,
+        kind: str,
+        schema: Optional[Dict[str, Any]],
+        path: List[Union[str, int]],
+        allow_integer: bool = False,
+    ) -> None:
+        if not schema or "type" not in schema:
+            return
+        allowed = schema["type"] if isinstance(schema["type"], list) else [schema["type"]]
+        if kind in allowed or (allow_integer and "integer" in allowed):
+            return
+        self._issue(f"{kind} is not of type {', '.join(repr(t) for t in allowed)}", path, "type_mismatch")
+
+    def _check_enum(self, raw_value: str, schema: Optional[Dict[str, Any]], path: List[Union[str, int]]) -> None:
+        if not schema or "enum" not in schema or "\\" in raw_value:
+            return
+        if raw_value not in schema["enum"]:
+            self._issue(f"{raw_value!r} is not one of {schema['enum']!r}", path, "enum_mismatch")
+
+    def _check_property_allowed(self, frame: _Frame, key: str) -> None:
+        schema = frame.schema
+        if not schema or schema.get("additionalProperties", True) is not False:
+            return
+        if key not in schema.get("properties", {}):
+            self._issue(f"Additional properties are not allowed ({key!r} was unexpected)", frame.path, "validation_error")
+
+    @staticmethod
+    def _property_schema(schema: Optional[Dict[str, Any]], key: str) -> Optional[Dict[str, Any]]:
+        if not schema:
+            return None
+        properties = schema.get("properties", {})
+        if key in properties:
+            return properties[key]
+        additional = schema.get("additionalProperties")
+        return additional if isinstance(additional, dict) else None
+
+    @staticmethod
+    def _items_schema(schema: Optional[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+        if not schema:
+            return None
+        items = schema.get("items")
+        return items if isinstance(items, dict) else None
+
+    def _syntax_error(self, reason: str, path: List[Union[str, int]]) -> None:
+        self._issue(reason, path, f"decode_error:{reason}")
+
+    def _issue(self, message: str, path: List[Union[str, int]], issue_type: str) -> None:
+        if self._tentative:
+            self._abandoned = True
+            return
+        self.issues.append(ValidationIssue(message=message, path=".".join(str(p) for p in path), issue_type=issue_type))